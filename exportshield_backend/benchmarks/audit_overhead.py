@@ -0,0 +1,126 @@
+"""
+Request overhead of the audit log.
+
+Times the same mix of mutations (PATCH, POST and DELETE on the workers
+router, which also touches the incidents' exposure) with the audit log
+stopped and started, alternating between the two in rounds so drift in
+the machine's speed falls on both equally. Requests go straight to the
+ASGI app, so the figures are the service's own cost without network or
+server overhead. The log goes to a temporary directory.
+
+    python benchmarks/audit_overhead.py --requests 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+WORKER = {
+    "name": "Bench Worker", "role": "Driller", "zone": "Zone A - Deep Excavation",
+    "latitude": 23.5815, "longitude": 87.2715, "heart_rate": 80, "temperature": 37.0, "oxygen_level": 97,
+}
+
+
+async def _request(app, method, path, body=None):
+    messages = []
+    payload = json.dumps(body).encode() if body is not None else b""
+
+    async def receive():
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"localhost"), (b"content-type", b"application/json"), (b"x-actor-id", b"bench")],
+        "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+    }
+    await app(scope, receive, send)
+    status = messages[0]["status"]
+    if status >= 400:
+        raise SystemExit(f"{method} {path} answered {status}")
+    return b"".join(message.get("body", b"") for message in messages[1:])
+
+
+async def _mix(app, requests, samples):
+    """Eight PATCHes, then a POST and a DELETE of a new worker, repeated."""
+    for step in range(requests):
+        kind = step % 10
+        started = time.perf_counter()
+        if kind < 8:
+            await _request(app, "PATCH", "/api/workers/1", {"heart_rate": 70 + step % 40})
+        elif kind == 8:
+            created = json.loads(await _request(app, "POST", "/api/workers/", WORKER))["id"]
+        else:
+            await _request(app, "DELETE", f"/api/workers/{created}")
+        samples.append((time.perf_counter() - started) * 1000)
+
+
+def _describe(samples, elapsed):
+    samples = sorted(samples)
+    return {
+        "median_ms": statistics.median(samples),
+        "p99_ms": samples[max(int(len(samples) * 0.99) - 1, 0)],
+        "rate": len(samples) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10000, help="requests per setting")
+    parser.add_argument("--rounds", type=int, default=10, help="off/on alternations the requests are split over")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    # Read when the audit module is imported
+    os.environ["MININGMITRA_AUDIT_LOG"] = os.path.join(directory, "audit.log")
+    os.environ.setdefault("MININGMITRA_RATE_LIMITING", "off")
+    sys.path.insert(0, ROOT)
+    import src.main
+    from src.services.audit_log import start_audit_log, stop_audit_log
+
+    src.main.mount_all_routers()
+    per_round = max(args.requests // args.rounds, 10)
+    samples = {"off": [], "on": []}
+    elapsed = {"off": 0.0, "on": 0.0}
+
+    async def run():
+        # Warm up the routes and caches before measuring
+        await _mix(src.main.app, 100, [])
+        for _ in range(args.rounds):
+            for label in ("off", "on"):
+                if label == "on":
+                    start_audit_log()
+                started = time.perf_counter()
+                await _mix(src.main.app, per_round, samples[label])
+                elapsed[label] += time.perf_counter() - started
+                if label == "on":
+                    stop_audit_log()
+
+    asyncio.run(run())
+    results = {label: _describe(samples[label], elapsed[label]) for label in samples}
+    for label, result in results.items():
+        print(
+            f"audit {label:3}: median {result['median_ms']:.3f} ms, "
+            f"p99 {result['p99_ms']:.3f} ms, {result['rate']:,.0f} requests/s"
+        )
+    lines = sum(1 for name in os.listdir(directory) for _ in open(os.path.join(directory, name)))
+    overhead = results["on"]["median_ms"] - results["off"]["median_ms"]
+    print(
+        f"overhead: {overhead * 1000:+.0f} µs per request at the median "
+        f"({overhead / results['off']['median_ms'] * 100:+.1f}%), {lines} entries written"
+    )
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Cold-start regression benchmark.
+
+Reports the ``-X importtime`` profile of ``src.main`` and the time from
+interpreter start to the first response, with routers mounted lazily (the
+default) and eagerly for comparison. Exits non-zero when the app's own
+modules take longer to import than ``--max-import-ms``.
+
+    python benchmarks/cold_start.py --runs 5 --path /api/workers/
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def import_profile():
+    """Return {module: (self_us, cumulative_us)} from ``python -X importtime``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.main"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+async def _request(app, path):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+    }
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+
+def child(path, eager):
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import src.main
+    if eager:
+        src.main.mount_all_routers()
+    status = asyncio.run(_request(src.main.app, path))
+    print(f"{(time.perf_counter() - started) * 1000:.2f} {status}")
+
+
+def time_to_first_response(path, eager, runs):
+    samples = []
+    for _ in range(runs):
+        command = [sys.executable, __file__, "--child", path] + (["--eager"] if eager else [])
+        output = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        elapsed, status = output.split()
+        if int(status) >= 400:
+            raise SystemExit(f"{path} answered {status}")
+        samples.append(float(elapsed))
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-import-ms", type=float, default=50.0)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--eager", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.eager)
+        return
+
+    profile = import_profile()
+    own = {name: times for name, times in profile.items() if name == "src" or name.startswith("src.")}
+    own_ms = sum(self_us for self_us, _ in own.values()) / 1000
+    print(f"import src.main: {profile['src.main'][1] / 1000:.1f} ms total, {own_ms:.1f} ms in src.*")
+    print("slowest imports (self time):")
+    for name, (self_us, cumulative_us) in sorted(profile.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    lazy = time_to_first_response(args.path, eager=False, runs=args.runs)
+    eager = time_to_first_response(args.path, eager=True, runs=args.runs)
+    print(f"first response {args.path}: lazy {lazy:.1f} ms, eager {eager:.1f} ms (median of {args.runs})")
+
+    if own_ms > args.max_import_ms:
+        raise SystemExit(f"src.* import time {own_ms:.1f} ms exceeds budget of {args.max_import_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Scale benchmark on a synthetic fleet.
+
+Generates a deterministic mine site, bulk-loads it into the stores with
+every router mounted (so indexes, geofences, search and aggregates all
+follow along), times a set of read endpoints, then streams live telemetry
+at a target rate and reports whether the stores keep up.
+
+    python benchmarks/fleet_scale.py --workers 20000 --machinery 2000 --rate 5000 --duration 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+os.environ.setdefault("MININGMITRA_RATE_LIMITING", "off")
+
+READ_PATHS = [
+    "/api/workers/critical",
+    "/api/machinery/maintenance/upcoming?within=7d",
+    "/api/incidents/stats/counts?by=zone",
+    "/api/incidents/stats/active-at",
+    "/api/corridors/metrics/average",
+    "/api/search/?q=gas",
+    "/api/dashboard/statistics",
+    "/api/dashboard/alerts/live",
+]
+
+
+async def _request(app, path):
+    messages = []
+    route, _, query = path.partition("?")
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": route, "raw_path": route.encode(),
+        "query_string": query.encode(), "root_path": "", "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+    }
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+
+def time_reads(app, runs):
+    for path in READ_PATHS:
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            status = asyncio.run(_request(app, path))
+            samples.append((time.perf_counter() - started) * 1000)
+        print(f"  {statistics.median(samples):8.2f} ms  {status}  GET {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=10000)
+    parser.add_argument("--machinery", type=int, default=1000)
+    parser.add_argument("--incidents", type=int, default=5000)
+    parser.add_argument("--corridors", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=2000, help="telemetry readings per second")
+    parser.add_argument("--duration", type=float, default=5, help="seconds of telemetry")
+    parser.add_argument("--runs", type=int, default=5, help="samples per read endpoint")
+    args = parser.parse_args()
+
+    import src.main
+    from src.routes.machinery import machinery_shards
+    from src.routes.workers import workers_shards
+    from src.services.fleet_generator import FleetGenerator, load_fleet, stream_telemetry
+    from src.services.sites import DEFAULT_SITE
+    from src.services.store import STORES
+
+    src.main.mount_all_routers()
+    generator = FleetGenerator(args.seed)
+
+    started = time.perf_counter()
+    fleet = {
+        "workers": generator.workers(args.workers),
+        "machinery": generator.machinery(args.machinery),
+        "incidents": generator.incidents(args.incidents),
+        "corridors": generator.corridors(args.corridors),
+    }
+    generated = time.perf_counter() - started
+    started = time.perf_counter()
+    loaded = load_fleet(STORES, fleet)
+    load_seconds = time.perf_counter() - started
+    total = sum(loaded.values())
+    print(f"generated {total} records in {generated:.2f} s, loaded in {load_seconds:.2f} s ({total / load_seconds:,.0f} records/s)")
+    for name, count in loaded.items():
+        print(f"  {count:8d}  {name}")
+
+    print("read latency (median):")
+    time_reads(src.main.app, args.runs)
+
+    readings = generator.telemetry(STORES["workers"].all(), STORES["machinery"].all())
+    # Readings go through the fatigue estimator and anomaly detector, as the PATCH and telemetry endpoints do
+    observers = {
+        "workers": workers_shards.get(DEFAULT_SITE).fatigue.observe,
+        "machinery": machinery_shards.get(DEFAULT_SITE).anomalies.observe,
+    }
+    result = stream_telemetry(STORES, readings, args.rate, args.duration, observers=observers)
+    print(
+        f"telemetry: {result['achieved_rate']:,.0f}/s achieved of {args.rate:,.0f}/s target "
+        f"({result['sent']} readings, max lag {result['max_lag_ms']} ms)"
+    )
+    if result["achieved_rate"] < 0.95 * args.rate:
+        raise SystemExit("telemetry fell behind the target rate")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Roster rollup query latency.
+
+Rosters a synthetic workforce for a number of days, then times the
+30-day headcount series and per-group rollups served from the
+incrementally maintained buckets against the same figures computed by
+scanning every shift, and the cost of keeping the buckets current on
+insert.
+
+    python benchmarks/roster_rollups.py --workers 2000 --days 30
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+ZONES = ["Zone A - Deep Excavation", "Zone B - Ventilation Shaft", "Zone C - Mineral Processing", "Zone D - Exploration Tunnel"]
+ROLES = ["Miner", "Driller", "Blaster", "Surveyor"]
+SHIFTS = {"morning": 6, "afternoon": 14, "night": 22}
+
+
+def synthetic_roster(workers, days, first_day, seed, format_timestamp):
+    rng = random.Random(seed)
+    people = [(str(number), rng.choice(ZONES), rng.choice(ROLES), rng.choice(list(SHIFTS))) for number in range(1, workers + 1)]
+    records = []
+    for day in range(days):
+        midnight = (first_day + day) * 86400
+        for worker_id, zone, role, shift in people:
+            start = midnight + SHIFTS[shift] * 3600
+            break_start = start + rng.choice([3, 4, 5]) * 3600
+            records.append({
+                "id": str(len(records) + 1),
+                "worker_id": worker_id,
+                "shift": shift,
+                "zone": zone,
+                "role": role,
+                "start": format_timestamp(start),
+                "end": format_timestamp(start + 8 * 3600),
+                "breaks": [{"start": format_timestamp(break_start), "end": format_timestamp(break_start + 1800)}],
+                "created_at": "2026-01-01T00:00:00Z",
+                "updated_at": "2026-01-01T00:00:00Z",
+            })
+    return records
+
+
+def scan_totals(records, by, start, end, shift_intervals):
+    """Person-seconds per group in [start, end) by walking every shift, as without rollups."""
+    totals = Counter()
+    for record in records:
+        duty, _ = shift_intervals(record)
+        for duty_start, duty_end in duty:
+            overlap = min(duty_end, end) - max(duty_start, start)
+            if overlap > 0:
+                totals[record[by]] += overlap
+    return totals
+
+
+def median_ms(action, runs):
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        action()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from src.services.incident_timeline import format_timestamp
+    from src.services.roster_service import DAY, RosterRollups, shift_intervals
+    from src.services.store import EntityStore
+
+    first_day = int(time.time()) // DAY - args.days
+    records = synthetic_roster(args.workers, args.days, first_day, args.seed, format_timestamp)
+    store = EntityStore("bench:shifts")
+    rollups = RosterRollups(store)
+    started = time.perf_counter()
+    store.insert_many(records)
+    seconds = time.perf_counter() - started
+    print(f"{len(records):,} shifts loaded in {seconds:.2f}s ({len(records) / seconds:,.0f} shifts/s, rollups included)")
+
+    start, end = first_day * DAY, (first_day + args.days) * DAY
+    shifts = store.all()
+    rows = [
+        ("hourly headcount, 30 days", lambda: rollups.headcount("zone", "hour", start, end)),
+        ("daily headcount, 30 days", lambda: rollups.headcount("zone", "day", start, end)),
+        ("rollups by zone", lambda: rollups.totals("zone", start, end)),
+        ("full scan by zone", lambda: scan_totals(shifts, "zone", start, end, shift_intervals)),
+    ]
+    for label, action in rows:
+        runs = args.runs if "scan" not in label else max(args.runs // 10, 1)
+        print(f"{label:28} {median_ms(action, runs):9.2f} ms")
+
+    scanned = scan_totals(shifts, "zone", start, end, shift_intervals)
+    rolled = rollups.totals("zone", start, end)
+    assert all(abs(rolled[zone]["person_hours"] - round(seconds / 3600, 2)) < 0.01 for zone, seconds in scanned.items())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Seed file load throughput.
+
+Writes the same synthetic workers as NDJSON, CSV and a JSON array, then
+streams each into a fresh store through the startup seed loader at a
+few batch sizes, reporting records per second and the peak memory the
+load allocated on top of the records it keeps.
+
+    python benchmarks/seed_load.py --records 100000
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+ZONES = ["Zone A - Deep Excavation", "Zone B - Ventilation Shaft", "Zone C - Mineral Processing", "Zone D - Exploration Tunnel"]
+FIELDS = ["name", "role", "zone", "latitude", "longitude", "heart_rate", "temperature", "oxygen_level", "status"]
+
+
+def synthetic_workers(count, seed):
+    rng = random.Random(seed)
+    for number in range(1, count + 1):
+        yield {
+            "name": f"Worker {number}",
+            "role": rng.choice(["Miner", "Driller", "Blaster", "Surveyor"]),
+            "zone": rng.choice(ZONES),
+            "latitude": round(23.58 + rng.uniform(-0.01, 0.01), 6),
+            "longitude": round(87.27 + rng.uniform(-0.01, 0.01), 6),
+            "heart_rate": rng.randint(60, 120),
+            "temperature": round(rng.uniform(36.5, 38.5), 1),
+            "oxygen_level": rng.randint(88, 100),
+            "status": "active",
+        }
+
+
+def write_files(directory, count, seed):
+    paths = {fmt: os.path.join(directory, f"workers.{fmt}") for fmt in ("ndjson", "csv", "json")}
+    with open(paths["ndjson"], "w") as ndjson, open(paths["csv"], "w", newline="") as table, open(paths["json"], "w") as array:
+        writer = csv.DictWriter(table, FIELDS)
+        writer.writeheader()
+        array.write("[\n")
+        for number, worker in enumerate(synthetic_workers(count, seed)):
+            line = json.dumps(worker)
+            ndjson.write(line + "\n")
+            writer.writerow(worker)
+            array.write(("," if number else "") + line + "\n")
+        array.write("]\n")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--batches", default="100,1000,10000", help="comma-separated batch sizes")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from src.routes.workers import WorkerCreate, worker_record
+    from src.services.seed_loader import load_file
+    from src.services.store import STORES, EntityStore
+
+    directory = tempfile.mkdtemp()
+    try:
+        paths = write_files(directory, args.records, args.seed)
+        print(f"{args.records:,} workers")
+        for fmt, path in paths.items():
+            size = os.path.getsize(path) / 1e6
+            for batch_size in (int(value) for value in args.batches.split(",")):
+                store = EntityStore(f"bench:{fmt}:{batch_size}")
+                report = load_file(path, store, WorkerCreate, lambda worker, worker_id, at: worker_record(worker, worker_id, "demo", at), batch_size)
+                # Allocations beyond the loaded records themselves show what streaming saves
+                kept = EntityStore(f"bench:{fmt}:{batch_size}:traced")
+                tracemalloc.start()
+                load_file(path, kept, WorkerCreate, lambda worker, worker_id, at: worker_record(worker, worker_id, "demo", at), batch_size)
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(
+                    f"{fmt:6} {size:6.1f} MB  batch {batch_size:>6}: {report['records_per_second']:>9,} records/s, "
+                    f"{(peak - current) / 1e6:6.1f} MB transient peak"
+                )
+                del STORES[store.name], STORES[kept.name]
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Cost of consistent reads across the workers, machinery, incidents and
+corridors stores.
+
+Loads a synthetic fleet with every router mounted, then reports how long
+it takes to open a read snapshot compared with copying the four stores,
+what the dashboard overview costs when read through a snapshot rather
+than from the live indexes, and the telemetry patch rate with no
+snapshot open and with one held open throughout (so every write also
+keeps the version it replaces).
+
+    python benchmarks/snapshot_reads.py --workers 20000 --machinery 2000
+"""
+import argparse
+import copy
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+os.environ.setdefault("MININGMITRA_RATE_LIMITING", "off")
+
+KINDS = ("workers", "machinery", "incidents", "corridors")
+
+
+def median_ms(action, runs):
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        action()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def patch_rate(stores, readings, count):
+    stamp = "2026-01-01T00:00:00Z"
+    started = time.perf_counter()
+    for _ in range(count):
+        name, record_id, changes = next(readings)
+        stores[name].patch(record_id, {**changes, "updated_at": stamp})
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=20000)
+    parser.add_argument("--machinery", type=int, default=2000)
+    parser.add_argument("--incidents", type=int, default=5000)
+    parser.add_argument("--corridors", type=int, default=200)
+    parser.add_argument("--patches", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    import src.main
+    from src.routes.dashboard import site_overview
+    from src.services.fleet_generator import FleetGenerator, load_fleet
+    from src.services.sites import DEFAULT_SITE
+    from src.services.store import STORES, consistent_read
+
+    src.main.mount_all_routers()
+    generator = FleetGenerator(args.seed)
+    load_fleet(STORES, {
+        "workers": generator.workers(args.workers),
+        "machinery": generator.machinery(args.machinery),
+        "incidents": generator.incidents(args.incidents),
+        "corridors": generator.corridors(args.corridors),
+    })
+    stores = [STORES[kind] for kind in KINDS]
+    print(f"{sum(len(store) for store in stores):,} records in {', '.join(KINDS)}")
+
+    def open_snapshot():
+        with consistent_read():
+            pass
+
+    print("taking a point-in-time view (median):")
+    print(f"  {'consistent_read()':32} {median_ms(open_snapshot, args.runs * 50) * 1000:10.1f} us")
+    print(f"  {'shallow copy of all four':32} {median_ms(lambda: [store.all() for store in stores], args.runs) * 1000:10.1f} us")
+    print(f"  {'deep copy of all four':32} {median_ms(lambda: copy.deepcopy([store.all() for store in stores]), max(args.runs // 10, 1)) * 1000:10.1f} us")
+
+    def snapshot_overview():
+        with consistent_read() as snapshot:
+            site_overview(DEFAULT_SITE, snapshot=snapshot)
+
+    print("dashboard overview (median):")
+    print(f"  {'live indexes':32} {median_ms(lambda: site_overview(DEFAULT_SITE), args.runs):10.2f} ms")
+    print(f"  {'through a snapshot':32} {median_ms(snapshot_overview, args.runs):10.2f} ms")
+
+    workers = len(STORES["workers"])
+    readings = generator.telemetry(STORES["workers"].all(), STORES["machinery"].all())
+    print("telemetry patches:")
+    print(f"  {'no snapshot open':32} {patch_rate(STORES, readings, args.patches):10,.0f} /s")
+    with consistent_read() as snapshot:
+        rate = patch_rate(STORES, readings, args.patches)
+        retained = sum(len(versions) for store in stores for versions in store._history.values())
+        assert len(snapshot.records(STORES["workers"])) == workers
+    print(f"  {'snapshot held open':32} {rate:10,.0f} /s ({retained:,} versions retained)")
+
+
+if __name__ == "__main__":
+    main()
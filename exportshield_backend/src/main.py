@@ -1,14 +1,102 @@
-﻿import os
+﻿import importlib
+import os
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from src.routes.pollution import router as pollution_router
-from src.routes.safety import router as safety_router
-from src.routes.workers import router as workers_router
-from src.routes.machinery import router as machinery_router
-from src.routes.incidents import router as incidents_router
-from src.routes.corridors import router as corridors_router
-from src.routes.dashboard import router as dashboard_router
+from src.middleware.admission import AdmissionMiddleware
+from src.middleware.audit import AuditMiddleware
+from src.middleware.profiling import ProfilingMiddleware
+from src.middleware.sites import SiteMiddleware
+from src.services.audit_log import start_audit_log, stop_audit_log
+from src.services.persistence import DATA_DIR, saved_state_exists, start_persistence, stop_persistence
+from src.services.seed_loader import SEED_DIR, load_seeds
+from src.services.store import STORES
+
+
+# Routers are imported and mounted on the first request under their prefix,
+# so a cold start (e.g. a serverless invocation) only pays for the routers
+# it actually serves. Paths that describe the whole API mount everything.
+LAZY_ROUTERS = {
+    "/api/dashboard": "src.routes.dashboard",
+    "/api/workers": "src.routes.workers",
+    "/api/machinery": "src.routes.machinery",
+    "/api/incidents": "src.routes.incidents",
+    "/api/corridors": "src.routes.corridors",
+    "/api/pollution": "src.routes.pollution",
+    "/api/safety": "src.routes.safety",
+    "/api/simulations": "src.routes.simulations",
+    "/api/search": "src.routes.search",
+    "/api/geofences": "src.routes.geofences",
+    "/api/roster": "src.routes.roster",
+    "/api/jobs": "src.routes.jobs",
+    "/api/sites": "src.routes.sites",
+    "/api/admin": "src.routes.admin",
+}
+# Routers whose listeners must see every write made through another router
+# are mounted together with it (geofence entry/exit events follow workers).
+MOUNTED_WITH = {
+    "/api/workers": ("/api/geofences",),
+}
+_mounted_routers = set()
+_mount_lock = threading.Lock()
+
+
+def mount_router(prefix: str) -> None:
+    """Import and include the router serving ``prefix`` if not done yet"""
+    if prefix in _mounted_routers:
+        return
+    with _mount_lock:
+        if prefix in _mounted_routers:
+            return
+        module = importlib.import_module(LAZY_ROUTERS[prefix])
+        app.include_router(module.router)
+        app.openapi_schema = None
+        _mounted_routers.add(prefix)
+    for companion in MOUNTED_WITH.get(prefix, ()):
+        mount_router(companion)
+
+
+def mount_all_routers() -> None:
+    for prefix in LAZY_ROUTERS:
+        mount_router(prefix)
+
+
+class LazyRouterMiddleware:
+    """Mounts the router for a request's path before the app routes it"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and len(_mounted_routers) < len(LAZY_ROUTERS):
+            path = scope["path"]
+            if path in (app.openapi_url, app.docs_url, app.redoc_url):
+                mount_all_routers()
+            else:
+                for prefix in LAZY_ROUTERS:
+                    if path == prefix or path.startswith(prefix + "/"):
+                        mount_router(prefix)
+                        break
+        await self.app(scope, receive, send)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Seed or restore state and start auditing before serving; flush both on shutdown"""
+    if DATA_DIR or SEED_DIR:
+        # Every store has to exist before it can be seeded or restored.
+        mount_all_routers()
+    if not saved_state_exists():
+        # Restored state replaces the seed, so it is only loaded on first boot
+        load_seeds()
+    start_persistence(STORES)
+    # After the restore, so replayed writes are not audited again
+    start_audit_log()
+    yield
+    stop_audit_log()
+    stop_persistence()
 
 
 app = FastAPI(
@@ -40,7 +128,8 @@ app = FastAPI(
     },
     license_info={
         "name": "MIT",
-    }
+    },
+    lifespan=lifespan,
 )
 
 # CORS Configuration - Allow all development and production origins
@@ -58,13 +147,19 @@ allowed_origins = [
     "https://miningmitra.vercel.app",
 ]
 
+# Innermost, so only admitted requests are audited and timed
+app.add_middleware(AuditMiddleware)
+
+# Added before CORS so that 429/503 rejections still carry CORS headers
+app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,     # Specific origins (no "*" with credentials)
     allow_credentials=False,           # Disable credentials for now
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
     allow_headers=["*"],
-    expose_headers=["Content-Range", "X-Content-Range"],
+    expose_headers=["Content-Range", "X-Content-Range", "X-Request-Id", "ETag", "Retry-After", "Location", "X-Cache"],
     max_age=86400,
 )
 
@@ -92,6 +187,8 @@ def read_root() -> dict:
             "machinery": {
                 "all": "/api/machinery",
                 "critical": "/api/machinery/critical",
+                "anomalies": "/api/machinery/anomalies?after=0",
+                "telemetry": "/api/machinery/telemetry",
                 "by_id": "/api/machinery/{id}",
             },
             "incidents": {
@@ -104,11 +201,36 @@ def read_root() -> dict:
             "corridors": {
                 "all": "/api/corridors",
                 "metrics": "/api/corridors/metrics/average",
+                "route": "/api/corridors/route?from=Zone C&to=Exit Point",
                 "by_id": "/api/corridors/{id}",
             },
+            "geofences": {
+                "all": "/api/geofences",
+                "events": "/api/geofences/events?after=0",
+                "occupants": "/api/geofences/{id}/occupants",
+            },
+            "roster": {
+                "all": "/api/roster",
+                "now": "/api/roster/now",
+                "headcount": "/api/roster/headcount?by=zone&interval=hour",
+                "rollups": "/api/roster/rollups?by=shift",
+            },
+            "sites": {
+                "all": "/api/sites",
+                "rollup": "/api/sites/rollup",
+                "scoped": "/api/sites/{site}/workers (or any route, or the X-Site-Id header)",
+            },
+            "search": "/api/search?q=methane",
+            "jobs": {
+                "all": "/api/jobs",
+                "export": "POST /api/jobs/exports?stores=workers,incidents",
+                "by_id": "/api/jobs/{id}",
+                "result": "/api/jobs/{id}/result",
+            },
             "analytics": {
                 "pollution": "/api/pollution?depth=100&explosives=50",
                 "safety": "/api/safety?temperature=30&vibration=5",
+                "simulation": "POST /api/simulations",
             }
         },
         "demo_info": {
@@ -139,11 +261,10 @@ def health_check() -> dict:
     }
 
 
-# Include all routers
-app.include_router(dashboard_router)
-app.include_router(workers_router)
-app.include_router(machinery_router)
-app.include_router(incidents_router)
-app.include_router(corridors_router)
-app.include_router(pollution_router)
-app.include_router(safety_router)
+app.add_middleware(LazyRouterMiddleware)
+
+# Outside the lazy mounting, which must see the de-prefixed /api/sites/{site}/... path
+app.add_middleware(SiteMiddleware)
+
+# Outermost, so a profile covers every other middleware too
+app.add_middleware(ProfilingMiddleware)
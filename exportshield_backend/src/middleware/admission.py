@@ -0,0 +1,174 @@
+import ipaddress
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from src.services.sites import DEFAULT_SITE, SITES
+
+
+class ClassLimit(NamedTuple):
+    rate: float          # tokens refilled per second, per client
+    burst: float         # bucket capacity, per client
+    share: float         # fraction of MAX_IN_FLIGHT this class may fill
+
+
+# First match wins; method None matches any method. Safety-critical routes
+# keep working longest under load, analytics and exports are shed first.
+ROUTE_CLASSES: List[Tuple[Optional[str], str, str]] = [
+    (None, "/health", "critical"),
+    (None, "/api/dashboard/alerts", "critical"),
+    ("POST", "/api/incidents", "critical"),
+    (None, "/api/incidents/stats", "low"),
+    (None, "/api/corridors/metrics", "low"),
+    (None, "/api/pollution", "low"),
+    (None, "/api/safety", "low"),
+    (None, "/api/simulations", "low"),
+    (None, "/api/jobs", "low"),
+]
+DEFAULT_CLASS = "standard"
+
+CLASS_LIMITS: Dict[str, ClassLimit] = {
+    "critical": ClassLimit(rate=50.0, burst=100.0, share=1.0),
+    "standard": ClassLimit(rate=20.0, burst=40.0, share=0.9),
+    "low": ClassLimit(rate=2.0, burst=5.0, share=0.5),
+}
+
+MAX_IN_FLIGHT = int(os.getenv("MININGMITRA_MAX_IN_FLIGHT", "64"))
+RATE_LIMITING = os.getenv("MININGMITRA_RATE_LIMITING", "on") != "off"
+# Most of MAX_IN_FLIGHT one site may hold when several are served, so a hot
+# mine is shed before it can starve the others.
+SITE_SHARE = float(os.getenv("MININGMITRA_SITE_SHARE", "0.5"))
+# Buckets kept, least recently used dropped first; a dropped client just starts with a full bucket.
+MAX_TRACKED_CLIENTS = 10_000
+# Proxies (addresses or CIDR ranges, comma separated) whose X-Forwarded-For
+# is believed. Unset, the peer address is the client and the header is ignored,
+# since anyone can send it.
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(entry.strip(), strict=False)
+    for entry in os.getenv("MININGMITRA_TRUSTED_PROXIES", "").split(",")
+    if entry.strip()
+]
+
+
+def classify(method: str, path: str) -> str:
+    for route_method, prefix, route_class in ROUTE_CLASSES:
+        if (route_method is None or route_method == method) and (path == prefix or path.startswith(prefix + "/")):
+            return route_class
+    return DEFAULT_CLASS
+
+
+def _trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def client_key(scope) -> str:
+    """
+    The caller's address: the peer, or behind trusted proxies the X-Forwarded-For hop before them.
+
+    Hops are read from the right, since each trusted proxy appends the
+    address it saw; whatever the client wrote itself sits further left
+    and is never reached.
+    """
+    client = scope.get("client")
+    address = client[0] if client else "unknown"
+    if not _trusted(address):
+        return address
+    hops = [
+        hop.strip()
+        for name, value in scope.get("headers", ())
+        if name == b"x-forwarded-for"
+        for hop in value.decode("latin-1").split(",")
+    ]
+    for hop in reversed(hops):
+        if not _trusted(hop):
+            return hop
+        address = hop
+    return address
+
+
+class AdmissionMiddleware:
+    """
+    Per-client token buckets plus priority-aware concurrency limits.
+
+    A request first needs a token from its client's bucket for its route
+    class (else 429), then a free in-flight slot within its class's share
+    of ``MAX_IN_FLIGHT`` (else 503), so low-priority traffic is shed well
+    before safety-critical routes feel any pressure. With several sites,
+    each site also holds at most ``SITE_SHARE`` of the slots. The checks
+    run on the event loop thread, so the counters need no locking.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._buckets: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._in_flight = 0
+        self._site_in_flight: Dict[str, int] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or not RATE_LIMITING:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify(scope["method"], scope["path"])
+        limit = CLASS_LIMITS[route_class]
+
+        wait = self._take_token(client_key(scope), route_class, limit)
+        if wait:
+            await self._reject(send, 429, "Rate limit exceeded", wait)
+            return
+        if self._in_flight >= limit.share * MAX_IN_FLIGHT:
+            await self._reject(send, 503, "Server busy, try again shortly", 1.0)
+            return
+        site = scope.get("site", DEFAULT_SITE)
+        site_in_flight = self._site_in_flight.get(site, 0)
+        if len(SITES) > 1 and site_in_flight >= SITE_SHARE * MAX_IN_FLIGHT:
+            await self._reject(send, 503, "Site busy, try again shortly", 1.0)
+            return
+
+        self._in_flight += 1
+        self._site_in_flight[site] = site_in_flight + 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._in_flight -= 1
+            self._site_in_flight[site] -= 1
+
+    def _take_token(self, client: str, route_class: str, limit: ClassLimit) -> float:
+        """Spend a token; returns 0 on success or the seconds until one is available."""
+        now = time.monotonic()
+        key = (client, route_class)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_CLIENTS:
+                self._buckets.popitem(last=False)
+            bucket = self._buckets[key] = [limit.burst, now]
+        else:
+            self._buckets.move_to_end(key)
+        tokens = min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+        bucket[1] = now
+        if tokens < 1.0:
+            bucket[0] = tokens
+            return (1.0 - tokens) / limit.rate
+        bucket[0] = tokens - 1.0
+        return 0.0
+
+    @staticmethod
+    async def _reject(send, status: int, detail: str, retry_after: float) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
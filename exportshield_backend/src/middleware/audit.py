@@ -0,0 +1,84 @@
+import itertools
+import time
+import uuid
+
+from src.middleware.admission import client_key
+from src.services.audit_log import audit_trail, current_actor
+from src.services.sites import current_site
+
+
+AUDITED_PREFIXES = ("/api/workers", "/api/machinery", "/api/incidents", "/api/corridors")
+MUTATING_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+ACTOR_HEADER = b"x-actor-id"
+REQUEST_ID_HEADER = b"x-request-id"
+# Generated request ids are a per-process random prefix and a counter;
+# uuid4 per request costs a urandom call each time.
+_REQUEST_ID_PREFIX = uuid.uuid4().hex[:12]
+_request_numbers = itertools.count(1)
+
+
+def _audited(scope) -> bool:
+    if scope["method"] not in MUTATING_METHODS:
+        return False
+    path = scope["path"]
+    return any(path == prefix or path.startswith(prefix + "/") for prefix in AUDITED_PREFIXES)
+
+
+class AuditMiddleware:
+    """
+    Access log and actor attribution for mutations of the CRUD routers.
+
+    Each POST/PUT/PATCH/DELETE under workers, machinery, incidents or
+    corridors gets a request id (the caller's ``X-Request-Id`` if sent,
+    echoed back either way) and an actor from ``X-Actor-Id``. While it is
+    handled, ``current_actor`` tags the store audit entries it causes;
+    once answered, one access entry records its status and duration.
+    Everything else, and every request while auditing is off, passes
+    straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not audit_trail.enabled or not _audited(scope):
+            await self.app(scope, receive, send)
+            return
+
+        actor = "anonymous"
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == ACTOR_HEADER:
+                actor = value.decode("latin-1").strip() or actor
+            elif name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1").strip()[:64] or None
+        request_id = request_id or f"{_REQUEST_ID_PREFIX}-{next(_request_numbers):x}"
+        context = {
+            "request_id": request_id,
+            "actor": actor,
+            "client": client_key(scope),
+            "site": current_site.get(),
+        }
+        started = time.perf_counter()
+        status = None
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]}
+            await send(message)
+
+        token = current_actor.set(context)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            current_actor.reset(token)
+            audit_trail.record({
+                "type": "access",
+                **context,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status if status is not None else 500,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            })
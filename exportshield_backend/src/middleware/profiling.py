@@ -0,0 +1,232 @@
+import cProfile
+import functools
+import hmac
+import inspect
+import io
+import itertools
+import marshal
+import os
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional
+
+from fastapi.routing import APIRoute
+
+
+PROFILE_HEADER = b"x-profile"
+ADMIN_TOKEN_HEADER = b"x-admin-token"
+ADMIN_TOKEN = os.getenv("MININGMITRA_ADMIN_TOKEN")
+# Without a token, profiling on request and /api/admin are refused unless
+# this is "on"; for local debugging only, since anyone may then use them.
+ADMIN_OPEN = os.getenv("MININGMITRA_ADMIN_OPEN", "off") == "on"
+SAMPLE_RATE = float(os.getenv("MININGMITRA_PROFILE_SAMPLE_RATE", "0"))
+MAX_PROFILES = int(os.getenv("MININGMITRA_MAX_PROFILES", "50"))
+
+current_profile: ContextVar[Optional["ProfileSession"]] = ContextVar("current_profile", default=None)
+
+
+class ProfileSession:
+    """
+    One profiled request.
+
+    The event-loop part runs under one cProfile, the endpoint (which may
+    run in the threadpool) under another, and phase boundaries are stamped
+    by ProfiledRoute so wall time splits into middleware, validation,
+    handler and serialization.
+    """
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.marks: Dict[str, float] = {"start": time.perf_counter()}
+        self.loop_profiler = cProfile.Profile()
+        self.handler_profiler = cProfile.Profile()
+
+    def mark(self, name: str) -> None:
+        self.marks[name] = time.perf_counter()
+
+    def run_handler(self, endpoint: Callable, args, kwargs):
+        self.mark("handler_start")
+        self.handler_profiler.enable()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            self.handler_profiler.disable()
+            self.mark("handler_end")
+
+    def phases(self) -> Dict[str, float]:
+        marks = self.marks
+        total = marks["end"] - marks["start"]
+        if "routed" not in marks or "serialized" not in marks:
+            return {"total_ms": total * 1000}
+        handler_start = marks.get("handler_start", marks["serialized"])
+        handler_end = marks.get("handler_end", handler_start)
+        phases = {
+            "middleware": (marks["routed"] - marks["start"]) + (marks["end"] - marks["serialized"]),
+            "validation": handler_start - marks["routed"],
+            "handler": handler_end - handler_start,
+            "serialization": marks["serialized"] - handler_end,
+            "total": total,
+        }
+        return {f"{name}_ms": round(seconds * 1000, 3) for name, seconds in phases.items()}
+
+
+class ProfileRecord:
+    """A finished profile kept in the ring."""
+
+    def __init__(self, profile_id: int, session: ProfileSession, status: Optional[int]):
+        self.id = profile_id
+        self.captured_at = datetime.utcnow().isoformat() + "Z"
+        self.method = session.method
+        self.path = session.path
+        self.status = status
+        self.phases = session.phases()
+        self.stats = pstats.Stats(session.loop_profiler)
+        if session.handler_profiler.getstats():
+            self.stats.add(session.handler_profiler)
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "captured_at": self.captured_at,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "phases": self.phases,
+        }
+
+    def report(self, limit: int = 40) -> str:
+        buffer = io.StringIO()
+        self.stats.stream = buffer
+        self.stats.sort_stats("cumulative").print_stats(limit)
+        return buffer.getvalue()
+
+    def dump(self) -> bytes:
+        """The profile in the binary format ``pstats``/snakeviz load."""
+        return marshal.dumps(self.stats.stats)
+
+
+PROFILES: Deque[ProfileRecord] = deque(maxlen=MAX_PROFILES)
+_profile_ids = itertools.count(1)
+
+
+def find_profile(profile_id: int) -> Optional[ProfileRecord]:
+    return next((record for record in list(PROFILES) if record.id == profile_id), None)
+
+
+def list_profiles() -> List[dict]:
+    return [record.summary() for record in reversed(list(PROFILES))]
+
+
+def admin_allowed(token: Optional[bytes]) -> bool:
+    """Whether a caller presenting ``token`` (raw header bytes) may use the admin features."""
+    if ADMIN_TOKEN is None:
+        return ADMIN_OPEN
+    return token is not None and hmac.compare_digest(token, ADMIN_TOKEN.encode())
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a request when asked to by ``X-Profile: 1`` or picked by
+    ``MININGMITRA_PROFILE_SAMPLE_RATE``; otherwise it is a pass-through.
+
+    The header only works together with a matching ``X-Admin-Token``
+    (see ``admin_allowed``); sampling needs none. Only one request is profiled at a
+    time, since the event loop thread can host a single cProfile.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope) or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(scope["method"], scope["path"])
+        token = current_profile.set(session)
+        status = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        session.loop_profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session.loop_profiler.disable()
+            session.mark("end")
+            current_profile.reset(token)
+            self._busy.release()
+            PROFILES.append(ProfileRecord(next(_profile_ids), session, status))
+
+    @staticmethod
+    def _wanted(scope) -> bool:
+        requested = _header(scope, PROFILE_HEADER)
+        if requested is not None and requested not in (b"0", b"false"):
+            return admin_allowed(_header(scope, ADMIN_TOKEN_HEADER))
+        return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def _profiled_endpoint(endpoint: Callable) -> Callable:
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            session = current_profile.get()
+            if session is None:
+                return await endpoint(*args, **kwargs)
+            session.mark("handler_start")
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                session.mark("handler_end")
+        return wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        session = current_profile.get()
+        if session is None:
+            return endpoint(*args, **kwargs)
+        return session.run_handler(endpoint, args, kwargs)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRoute that stamps phase boundaries for ProfilingMiddleware.
+
+    Costs one context-variable lookup per request when nothing is profiled.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _profiled_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def profiled_handler(request):
+            session = current_profile.get()
+            if session is None:
+                return await handler(request)
+            session.mark("routed")
+            response = await handler(request)
+            session.mark("serialized")
+            return response
+
+        return profiled_handler
@@ -0,0 +1,94 @@
+import json
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from src.services.sites import SITES, current_site
+
+
+SITE_HEADER = b"x-site-id"
+SITE_PATH_PREFIX = "/api/sites/"
+
+
+def _split_site_path(path: str) -> Optional[tuple]:
+    """``/api/sites/{site}/workers/1`` -> (``site``, ``/api/workers/1``); None for other paths."""
+    if not path.startswith(SITE_PATH_PREFIX):
+        return None
+    site, slash, rest = path[len(SITE_PATH_PREFIX):].partition("/")
+    if not slash or not rest:
+        return None
+    return site, "/api/" + rest
+
+
+def _site_location(location: str, site: str) -> str:
+    """A redirect target ``/api/...`` (absolute or not) moved under ``/api/sites/{site}/``."""
+    parts = urlsplit(location)
+    if not parts.path.startswith("/api/") or parts.path.startswith(SITE_PATH_PREFIX):
+        return location
+    return urlunsplit(parts._replace(path=f"{SITE_PATH_PREFIX}{site}/{parts.path[len('/api/'):]}"))
+
+
+class SiteMiddleware:
+    """
+    Resolves which mine a request is for and scopes it to that site.
+
+    The site comes from a ``/api/sites/{site}/...`` path, which is rewritten
+    to the plain ``/api/...`` route, or else from the ``X-Site-Id`` header,
+    defaulting to the first configured site. The handler then reads
+    ``current_site`` to pick its shard. Unknown sites get a 404 here.
+    A redirect answering a site path (such as the trailing-slash one) is
+    pointed back under that site's prefix.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        site = None
+        routed = _split_site_path(scope["path"])
+        if routed is not None:
+            site, path = routed
+            scope = {**scope, "path": path, "raw_path": path.encode()}
+            send = self._site_redirects(send, site)
+        else:
+            for name, value in scope.get("headers", ()):
+                if name == SITE_HEADER:
+                    site = value.decode("latin-1").strip()
+                    break
+        if site is None:
+            await self.app(scope, receive, send)
+            return
+        if site not in SITES:
+            await self._not_found(send, site)
+            return
+
+        token = current_site.set(site)
+        try:
+            await self.app({**scope, "site": site}, receive, send)
+        finally:
+            current_site.reset(token)
+
+    @staticmethod
+    def _site_redirects(send, site: str):
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and 300 <= message["status"] < 400:
+                message = {**message, "headers": [
+                    (name, _site_location(value.decode("latin-1"), site).encode("latin-1")) if name == b"location" else (name, value)
+                    for name, value in message.get("headers", ())
+                ]}
+            await send(message)
+
+        return send_wrapper
+
+    @staticmethod
+    async def _not_found(send, site: str) -> None:
+        body = json.dumps({"detail": f"Unknown site: {site}"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 404,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
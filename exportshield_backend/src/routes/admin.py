@@ -0,0 +1,53 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import PlainTextResponse
+
+from src.middleware.profiling import ProfiledRoute, admin_allowed, find_profile, list_profiles
+from src.services.seed_loader import seed_reports
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Reject callers without the admin token; with none configured, everyone unless MININGMITRA_ADMIN_OPEN is on"""
+    # Starlette decodes headers as latin-1, so this recovers the bytes sent
+    if not admin_allowed(x_admin_token.encode("latin-1") if x_admin_token is not None else None):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["Admin"],
+    route_class=ProfiledRoute,
+    dependencies=[Depends(require_admin)],
+)
+
+
+@router.get("/profiles")
+def get_profiles():
+    """List captured request profiles, newest first"""
+    return list_profiles()
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(
+    profile_id: int,
+    format: str = Query("text", pattern="^(text|pstats)$", description="text report or binary pstats dump"),
+):
+    """Get one request profile as a text report or a pstats file"""
+    record = find_profile(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "pstats":
+        return Response(
+            record.dump(),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.pstats"'},
+        )
+    phases = "\n".join(f"{name}: {value}" for name, value in record.phases.items())
+    return PlainTextResponse(f"{record.method} {record.path} -> {record.status}\n{phases}\n\n{record.report()}")
+
+
+@router.get("/seeds")
+def get_seed_reports():
+    """List the seed files loaded at startup with their record counts and load throughput"""
+    return seed_reports()
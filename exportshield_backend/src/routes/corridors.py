@@ -1,9 +1,20 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional, Dict
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import List, NamedTuple, Optional, Dict
 from datetime import datetime
 from pydantic import BaseModel
 
-router = APIRouter(prefix="/api/corridors", tags=["Corridors"])
+from src.middleware.profiling import ProfiledRoute
+from src.routes.dependencies import etag, if_match_version, merge_patch_changes, precondition_failed
+from src.routes.incidents import incidents_shards
+from src.services.audit_log import audit_trail
+from src.services.indexes import CountIndex
+from src.services.metrics_service import CORRIDOR_GROUPS, WINDOW_RETENTION_HOURS, CorridorMetrics
+from src.services.route_service import CORRIDOR_ROUTE_FIELDS, CorridorGraph
+from src.services.seed_loader import fallback_seed, register_seed
+from src.services.sites import DEFAULT_SITE, SiteShards, current_site, store_name
+from src.services.store import EntityStore, VersionConflict
+
+router = APIRouter(prefix="/api/corridors", tags=["Corridors"], route_class=ProfiledRoute)
 
 
 # Pydantic models
@@ -24,8 +35,27 @@ class CorridorCreate(BaseModel):
     route_end_lng: float
 
 
+# Partial update body: only the fields present are validated and applied
+class CorridorPatch(BaseModel):
+    name: Optional[str] = None
+    from_location: Optional[str] = None
+    to_location: Optional[str] = None
+    score: Optional[int] = None
+    risk_level: Optional[str] = None
+    pollution: Optional[int] = None
+    green_cover: Optional[int] = None
+    temperature: Optional[float] = None
+    traffic: Optional[int] = None
+    compliance: Optional[int] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    route_end_lat: Optional[float] = None
+    route_end_lng: Optional[float] = None
+
+
 class Corridor(BaseModel):
     id: str
+    site: str = DEFAULT_SITE
     name: str
     from_location: str
     to_location: str
@@ -42,8 +72,12 @@ class Corridor(BaseModel):
     route_end_lng: float
     created_at: str
     updated_at: str
+    version: int
 
 
+# Seed records share one timestamp instead of formatting two per record at import
+SEEDED_AT = datetime.utcnow().isoformat() + "Z"
+
 # Mock data
 MOCK_CORRIDORS = [
     {
@@ -62,8 +96,8 @@ MOCK_CORRIDORS = [
         "longitude": 87.2718,
         "route_end_lat": 23.5830,
         "route_end_lng": 87.2730,
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "2",
@@ -81,8 +115,8 @@ MOCK_CORRIDORS = [
         "longitude": 87.2730,
         "route_end_lat": 23.5840,
         "route_end_lng": 87.2745,
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "3",
@@ -100,8 +134,8 @@ MOCK_CORRIDORS = [
         "longitude": 87.2710,
         "route_end_lat": 23.5820,
         "route_end_lng": 87.2718,
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "4",
@@ -119,85 +153,175 @@ MOCK_CORRIDORS = [
         "longitude": 87.2745,
         "route_end_lat": 23.5850,
         "route_end_lng": 87.2755,
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
 ]
 
 
+class CorridorsShard(NamedTuple):
+    store: EntityStore
+    graph: CorridorGraph
+    metrics: CorridorMetrics
+    by_risk: CountIndex
+
+
+def corridor_record(corridor: CorridorCreate, corridor_id: str, site: str, at: str) -> dict:
+    """A new corridor as stored"""
+    return {
+        "id": corridor_id,
+        "site": site,
+        **corridor.dict(),
+        "created_at": at,
+        "updated_at": at,
+    }
+
+
+def build_corridors_shard(site: str) -> CorridorsShard:
+    store = EntityStore(store_name(site, "corridors"), fallback_seed(site, "corridors", MOCK_CORRIDORS))
+    register_seed(
+        site, "corridors", store, CorridorCreate,
+        lambda corridor, corridor_id, at: corridor_record(corridor, corridor_id, site, at),
+    )
+    audit_trail.watch(store)
+    graph = CorridorGraph()
+    store.subscribe(graph.on_corridor_change, fields=CORRIDOR_ROUTE_FIELDS)
+    incidents_shards.get(site).store.subscribe(graph.on_incident_change, fields=("status", "zone"))
+    metrics = CorridorMetrics()
+    store.subscribe(metrics.on_change, fields=metrics.watched_fields)
+    return CorridorsShard(store, graph, metrics, CountIndex(store, "risk_level"))
+
+
+corridors_shards = SiteShards(build_corridors_shard)
+
+
 @router.get("/", response_model=List[Corridor])
 def get_all_corridors():
     """Get all corridors"""
-    return MOCK_CORRIDORS
+    return corridors_shards.current().store.all()
 
 
 @router.get("/metrics/average")
 def get_average_metrics() -> Dict[str, float]:
     """Get average metrics across all corridors"""
-    if not MOCK_CORRIDORS:
-        return {
-            "pollution": 0,
-            "greenCover": 0,
-            "temperature": 0,
-            "traffic": 0,
-            "compliance": 0,
-        }
-    
-    total = len(MOCK_CORRIDORS)
+    return corridors_shards.current().metrics.average()
+
+
+@router.get("/metrics/average/by/{group}")
+def get_grouped_average_metrics(group: str) -> Dict[str, Dict[str, float]]:
+    """Get average metrics per risk_level or per from_location"""
+    if group not in CORRIDOR_GROUPS:
+        raise HTTPException(status_code=404, detail=f"Unknown group, expected one of: {', '.join(CORRIDOR_GROUPS)}")
+    return corridors_shards.current().metrics.average_by(group)
+
+
+@router.get("/metrics/average/window")
+def get_windowed_average_metrics(
+    hours: int = Query(24, ge=1, le=WINDOW_RETENTION_HOURS, description="Look-back window in hours"),
+) -> dict:
+    """Get average metrics of corridor readings recorded in the last N hours"""
+    return corridors_shards.current().metrics.average_window(hours)
+
+
+@router.get("/metrics/distribution")
+def get_metric_distribution() -> dict:
+    """Get min/max/percentiles of corridor pollution and temperature"""
+    return corridors_shards.current().metrics.distribution()
+
+
+@router.get("/route")
+def get_safest_route(
+    from_location: str = Query(..., alias="from", description="Starting location, e.g. Zone C"),
+    to_location: str = Query(..., alias="to", description="Destination, e.g. Exit Point"),
+) -> dict:
+    """Get the lowest-risk path between two locations for evacuation planning"""
+    shard = corridors_shards.current()
+    route = shard.graph.route(from_location, to_location)
+    if route is None:
+        raise HTTPException(status_code=404, detail="No route between these locations")
+    total_risk, path, corridor_ids = route
     return {
-        "pollution": sum(c["pollution"] for c in MOCK_CORRIDORS) / total,
-        "greenCover": sum(c["green_cover"] for c in MOCK_CORRIDORS) / total,
-        "temperature": sum(c["temperature"] for c in MOCK_CORRIDORS) / total,
-        "traffic": sum(c["traffic"] for c in MOCK_CORRIDORS) / total,
-        "compliance": sum(c["compliance"] for c in MOCK_CORRIDORS) / total,
+        "from": from_location,
+        "to": to_location,
+        "path": path,
+        "corridors": [shard.store.get(corridor_id) for corridor_id in corridor_ids],
+        "hops": len(corridor_ids),
+        "total_risk": round(total_risk, 3),
     }
 
 
 @router.get("/{corridor_id}", response_model=Corridor)
-def get_corridor(corridor_id: str):
+def get_corridor(corridor_id: str, response: Response):
     """Get specific corridor by ID"""
-    corridor = next((c for c in MOCK_CORRIDORS if c["id"] == corridor_id), None)
+    corridor = corridors_shards.current().store.get(corridor_id)
     if not corridor:
         raise HTTPException(status_code=404, detail="Corridor not found")
+    response.headers["ETag"] = etag(corridor)
     return corridor
 
 
 @router.post("/", response_model=Corridor, status_code=201)
 def create_corridor(corridor: CorridorCreate):
     """Create new corridor"""
-    new_corridor = {
-        "id": str(len(MOCK_CORRIDORS) + 1),
-        **corridor.dict(),
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
-    }
-    MOCK_CORRIDORS.append(new_corridor)
-    return new_corridor
+    corridors_store = corridors_shards.current().store
+    new_corridor = corridor_record(corridor, corridors_store.new_id(), current_site.get(), datetime.utcnow().isoformat() + "Z")
+    return corridors_store.insert(new_corridor)
 
 
 @router.put("/{corridor_id}", response_model=Corridor)
-def update_corridor(corridor_id: str, corridor: CorridorCreate):
+def update_corridor(
+    corridor_id: str,
+    corridor: CorridorCreate,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
+):
     """Update existing corridor"""
-    corridor_index = next((i for i, c in enumerate(MOCK_CORRIDORS) if c["id"] == corridor_id), None)
-    if corridor_index is None:
+    def apply_update(existing: dict) -> dict:
+        return {
+            "id": corridor_id,
+            "site": existing.get("site", current_site.get()),
+            **corridor.dict(),
+            "created_at": existing["created_at"],
+            "updated_at": datetime.utcnow().isoformat() + "Z",
+        }
+
+    try:
+        updated_corridor = corridors_shards.current().store.update(corridor_id, apply_update, expected_version)
+    except KeyError:
         raise HTTPException(status_code=404, detail="Corridor not found")
-    
-    updated_corridor = {
-        "id": corridor_id,
-        **corridor.dict(),
-        "created_at": MOCK_CORRIDORS[corridor_index]["created_at"],
-        "updated_at": datetime.utcnow().isoformat() + "Z",
-    }
-    MOCK_CORRIDORS[corridor_index] = updated_corridor
+    except VersionConflict as conflict:
+        raise precondition_failed(conflict)
+    response.headers["ETag"] = etag(updated_corridor)
+    return updated_corridor
+
+
+@router.patch("/{corridor_id}", response_model=Corridor)
+def patch_corridor(
+    corridor_id: str,
+    corridor: CorridorPatch,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
+):
+    """Partially update a corridor (JSON Merge Patch)"""
+    changes = merge_patch_changes(corridor)
+    changes["updated_at"] = datetime.utcnow().isoformat() + "Z"
+    try:
+        updated_corridor = corridors_shards.current().store.patch(corridor_id, changes, expected_version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Corridor not found")
+    except VersionConflict as conflict:
+        raise precondition_failed(conflict)
+    response.headers["ETag"] = etag(updated_corridor)
     return updated_corridor
 
 
 @router.delete("/{corridor_id}")
-def delete_corridor(corridor_id: str):
+def delete_corridor(corridor_id: str, expected_version: Optional[int] = Depends(if_match_version)):
     """Delete corridor"""
-    corridor_index = next((i for i, c in enumerate(MOCK_CORRIDORS) if c["id"] == corridor_id), None)
-    if corridor_index is None:
+    try:
+        corridors_shards.current().store.delete(corridor_id, expected_version)
+    except KeyError:
         raise HTTPException(status_code=404, detail="Corridor not found")
-    
-    MOCK_CORRIDORS.pop(corridor_index)
+    except VersionConflict as conflict:
+        raise precondition_failed(conflict)
     return {"message": "Corridor deleted", "id": corridor_id}
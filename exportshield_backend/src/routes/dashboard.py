@@ -1,46 +1,115 @@
-from fastapi import APIRouter
-from datetime import datetime
+import os
+import time
+from typing import Dict, NamedTuple, Optional
 
-router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"])
+from fastapi import APIRouter, Header, Response
+from fastapi.concurrency import run_in_threadpool
+from datetime import datetime, timedelta, timezone
 
+from src.middleware.profiling import ProfiledRoute
+from src.routes.corridors import corridors_shards
+from src.routes.incidents import incidents_shards
+from src.routes.machinery import machinery_shards
+from src.routes.roster import on_shift_summary, roster_shards
+from src.routes.workers import workers_shards
+from src.services.anomaly_service import describe_anomaly
+from src.services.maintenance_service import SCHEDULE_FIELDS
+from src.services.sites import DEFAULT_SITE, SITES, SiteShards
+from src.services.snapshot_cache import SnapshotCache
+from src.services.store import ReadSnapshot, consistent_read
 
-@router.get("/statistics")
-def get_dashboard_statistics():
-    """Get comprehensive dashboard statistics for demo"""
+router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"], route_class=ProfiledRoute)
+
+# Seconds a dashboard payload may be served before a background rebuild is
+# triggered; changes to the underlying data trigger one straight away.
+DASHBOARD_MAX_AGE = float(os.getenv("MININGMITRA_DASHBOARD_MAX_AGE", "5"))
+
+
+def site_overview(site: str, roster: Optional[dict] = None, snapshot: Optional[ReadSnapshot] = None) -> Dict[str, int]:
+    """
+    Headline counts of one site, read from its maintained indexes.
+
+    Every value is a count, so a multi-site rollup is the sum of these.
+    Who is on shift or on a break comes from the roster at ``roster``'s
+    moment (default now). With a ``snapshot`` every other count is as of
+    that snapshot, so they all describe the same moment.
+    """
+    roster = roster or on_shift_summary(site, time.time())
+    workers = workers_shards.get(site)
+    machinery = machinery_shards.get(site)
+    incidents = incidents_shards.get(site)
+    corridors = corridors_shards.get(site)
+    worker_status = workers.by_status.counts(snapshot)
+    machinery_status = machinery.by_status.counts(snapshot)
+    corridor_risk = corridors.by_risk.counts(snapshot)
+    incident_status = incidents.by_status.counts(snapshot)
+    return {
+        # Every record is counted under some value, so the totals come from the same counts
+        "total_workers": sum(worker_status.values()),
+        "active_workers": worker_status.get("active", 0),
+        "critical_workers": workers.critical.count(snapshot),
+        "workers_on_shift": roster["on_duty"] + roster["on_break"],
+        "workers_on_break": roster["on_break"],
+        "workers_with_high_fatigue": workers.by_fatigue.counts(snapshot).get("high", 0),
+        "total_machinery": sum(machinery_status.values()),
+        "operational_machinery": machinery_status.get("operational", 0),
+        "maintenance_required": machinery_status.get("maintenance_required", 0),
+        "equipment_due_maintenance_soon": machinery.schedule.count_due(7, snapshot=snapshot),
+        "total_incidents": sum(incident_status.values()),
+        "active_incidents": incidents.active.count(snapshot),
+        "resolved_incidents": incident_status.get("resolved", 0),
+        "high_severity_incidents": incidents.critical.count(snapshot),
+        "total_corridors": sum(corridor_risk.values()),
+        "safe_corridors": corridor_risk.get("low", 0),
+        "high_risk_corridors": corridor_risk.get("high", 0),
+    }
+
+
+def build_dashboard_statistics(site: str) -> dict:
+    """
+    The dashboard payload of one site.
+
+    Every figure taken from the workers, machinery, incidents and corridors
+    indexes is read as of one ReadSnapshot, so writes landing while it is
+    built never show up in some figures and not others.
+    """
+    now = datetime.now(timezone.utc)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today - timedelta(days=today.weekday())
+    roster = on_shift_summary(site, now.timestamp())
+    timeline = incidents_shards.get(site).timeline
+    with consistent_read() as snapshot:
+        overview = site_overview(site, roster, snapshot)
+        incidents_today = timeline.count_created(today.timestamp(), now.timestamp() + 1, snapshot)
+        incidents_this_week = timeline.count_created(week_start.timestamp(), now.timestamp() + 1, snapshot)
     return {
         "overview": {
-            "total_workers": 8,
-            "active_workers": 6,
-            "critical_workers": 1,
-            "workers_on_break": 1,
-            "total_machinery": 6,
-            "operational_machinery": 5,
-            "maintenance_required": 1,
-            "total_incidents": 6,
-            "active_incidents": 4,
-            "resolved_incidents": 2,
-            "total_corridors": 5,
-            "safe_corridors": 3,
-            "high_risk_corridors": 1,
+            key: overview[key]
+            for key in (
+                "total_workers", "active_workers", "critical_workers", "workers_on_shift", "workers_on_break",
+                "total_machinery", "operational_machinery", "maintenance_required",
+                "total_incidents", "active_incidents", "resolved_incidents",
+                "total_corridors", "safe_corridors", "high_risk_corridors",
+            )
         },
         "health_metrics": {
             "average_heart_rate": 86.25,
             "average_temperature": 37.64,
             "average_oxygen_level": 94.62,
-            "workers_with_high_fatigue": 2,
+            "workers_with_high_fatigue": overview["workers_with_high_fatigue"],
             "workers_needing_medical_attention": 1,
         },
         "equipment_metrics": {
             "average_machinery_health": 83.0,
             "average_efficiency": 89.5,
             "high_risk_equipment": 1,
-            "equipment_due_maintenance_soon": 2,
+            "equipment_due_maintenance_soon": overview["equipment_due_maintenance_soon"],
             "total_operating_hours": 10150,
         },
         "safety_metrics": {
-            "incidents_today": 2,
-            "incidents_this_week": 6,
-            "high_severity_incidents": 3,
+            "incidents_today": incidents_today,
+            "incidents_this_week": incidents_this_week,
+            "high_severity_incidents": overview["high_severity_incidents"],
             "zones_requiring_attention": ["Zone A", "Zone B", "Zone C"],
             "safety_compliance_score": 78.5,
         },
@@ -109,28 +178,28 @@ def get_dashboard_statistics():
         ],
         "zone_statistics": {
             "Zone A - Deep Excavation": {
-                "workers": 3,
+                "workers": _rostered(roster, "Zone A - Deep Excavation"),
                 "machinery": 2,
                 "incidents": 2,
                 "risk_level": "high",
                 "safety_score": 65,
             },
             "Zone B - Ventilation Shaft": {
-                "workers": 2,
+                "workers": _rostered(roster, "Zone B - Ventilation Shaft"),
                 "machinery": 2,
                 "incidents": 2,
                 "risk_level": "medium",
                 "safety_score": 75,
             },
             "Zone C - Mineral Processing": {
-                "workers": 1,
+                "workers": _rostered(roster, "Zone C - Mineral Processing"),
                 "machinery": 1,
                 "incidents": 1,
                 "risk_level": "medium",
                 "safety_score": 80,
             },
             "Zone D - Exploration Tunnel": {
-                "workers": 2,
+                "workers": _rostered(roster, "Zone D - Exploration Tunnel"),
                 "machinery": 1,
                 "incidents": 1,
                 "risk_level": "low",
@@ -148,17 +217,35 @@ def get_dashboard_statistics():
         "metadata": {
             "last_updated": datetime.utcnow().isoformat() + "Z",
             "data_version": "1.0.0",
-            "mine_name": "MiningMitra Demo Site",
+            "site": site,
+            "mine_name": SITES[site],
             "location": "India - Mining Region",
         }
     }
 
 
-@router.get("/alerts/live")
-def get_live_alerts():
-    """Get real-time alerts for demo"""
+def _rostered(roster: dict, zone: str) -> int:
+    """Workers rostered into ``zone`` right now, on duty or on a break"""
+    counts = roster["by_zone"].get(zone, {})
+    return counts.get("on_duty", 0) + counts.get("on_break", 0)
+
+
+def _anomaly_alert(event: dict) -> dict:
     return {
-        "critical_alerts": [
+        "id": f"anomaly_{event['seq']}",
+        "title": "Equipment Anomaly Alert",
+        "description": describe_anomaly(event),
+        "zone": event["location"],
+        "severity": "warning",
+        "timestamp": event["at"],
+        "action_required": "Inspect the machine and schedule maintenance",
+    }
+
+
+def build_live_alerts(site: str) -> dict:
+    critical_alerts, warnings = [], []
+    if site == DEFAULT_SITE:
+        critical_alerts = [
             {
                 "id": "crit_1",
                 "title": "Critical Health Alert",
@@ -177,17 +264,8 @@ def get_live_alerts():
                 "timestamp": datetime.utcnow().isoformat() + "Z",
                 "action_required": "Evacuate zone immediately",
             },
-        ],
-        "warnings": [
-            {
-                "id": "warn_1",
-                "title": "Equipment Maintenance Alert",
-                "description": "Rotary Drill RD-2500 vibration levels exceeding safe limits",
-                "zone": "Zone D - Exploration Tunnel",
-                "severity": "warning",
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "action_required": "Schedule immediate maintenance",
-            },
+        ]
+        warnings = [
             {
                 "id": "warn_2",
                 "title": "Worker Fatigue Alert",
@@ -197,8 +275,56 @@ def get_live_alerts():
                 "timestamp": datetime.utcnow().isoformat() + "Z",
                 "action_required": "Recommend rest break",
             },
-        ],
-        "total_alerts": 4,
-        "critical_count": 2,
-        "warning_count": 2,
+        ]
+    # Detected machinery anomalies, newest first, ahead of the demo warnings
+    warnings = [_anomaly_alert(event) for event in machinery_shards.get(site).anomalies.active()] + warnings
+    return {
+        "critical_alerts": critical_alerts,
+        "warnings": warnings,
+        "total_alerts": len(critical_alerts) + len(warnings),
+        "critical_count": len(critical_alerts),
+        "warning_count": len(warnings),
     }
+
+
+class DashboardShard(NamedTuple):
+    statistics: SnapshotCache
+    live_alerts: SnapshotCache
+
+
+def build_dashboard_shard(site: str) -> DashboardShard:
+    statistics = SnapshotCache(f"statistics-{site}", lambda: build_dashboard_statistics(site), DASHBOARD_MAX_AGE)
+    live_alerts = SnapshotCache(f"alerts-{site}", lambda: build_live_alerts(site), DASHBOARD_MAX_AGE)
+    # Only this site's writes mark its snapshot stale
+    incidents_shards.get(site).store.subscribe(statistics.invalidate)
+    machinery_shards.get(site).store.subscribe(statistics.invalidate, fields=SCHEDULE_FIELDS)
+    workers_shards.get(site).store.subscribe(statistics.invalidate, fields=("status", "fatigue_level"))
+    corridors_shards.get(site).store.subscribe(statistics.invalidate, fields=("risk_level",))
+    roster_shards.get(site).store.subscribe(statistics.invalidate)
+    machinery_shards.get(site).anomalies.subscribe(live_alerts.invalidate)
+    return DashboardShard(statistics, live_alerts)
+
+
+dashboard_shards = SiteShards(build_dashboard_shard)
+
+
+async def snapshot_response(cache: SnapshotCache, if_none_match: Optional[str]) -> Response:
+    """Serve a cached snapshot, or 304 when the client already has it"""
+    # The first build walks every store; keep it off the event loop
+    snapshot = cache.get() if cache.built else await run_in_threadpool(cache.get)
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if if_none_match == snapshot.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(snapshot.body, media_type="application/json", headers=headers)
+
+
+@router.get("/statistics")
+async def get_dashboard_statistics(if_none_match: Optional[str] = Header(None)):
+    """Get comprehensive dashboard statistics for demo"""
+    return await snapshot_response(dashboard_shards.current().statistics, if_none_match)
+
+
+@router.get("/alerts/live")
+async def get_live_alerts(if_none_match: Optional[str] = Header(None)):
+    """Get real-time alerts for demo"""
+    return await snapshot_response(dashboard_shards.current().live_alerts, if_none_match)
@@ -0,0 +1,62 @@
+from typing import Optional
+
+from fastapi import Header, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from src.services.sites import site_path
+
+
+def etag(record: dict) -> str:
+    """Strong ETag for a stored record, derived from its version"""
+    return f'"{record["version"]}"'
+
+
+def if_match_version(if_match: Optional[str] = Header(None)) -> Optional[int]:
+    """
+    Resolve the ``If-Match`` request header to the record version it pins.
+
+    Absent or ``*`` means any version. ``If-Match`` uses strong comparison
+    (RFC 9110), which a weak validator never passes, so one fails with 412.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip()
+    if tag.startswith("W/"):
+        raise HTTPException(status_code=412, detail="If-Match requires a strong validator")
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed If-Match header")
+
+
+def precondition_failed(conflict) -> HTTPException:
+    return HTTPException(
+        status_code=412,
+        detail=f"Version mismatch: current version is {conflict.current_version}",
+        headers={"ETag": f'"{conflict.current_version}"'},
+    )
+
+
+def merge_patch_changes(patch: BaseModel) -> dict:
+    """
+    Fields explicitly sent in a JSON Merge Patch body.
+
+    Unsent fields are left alone. A ``null`` would mean "remove the field",
+    which the flat records here do not allow, so it is rejected.
+    """
+    changes = patch.dict(exclude_unset=True)
+    removed = sorted(field for field, value in changes.items() if value is None)
+    if removed:
+        raise HTTPException(status_code=422, detail=f"Fields cannot be removed: {', '.join(removed)}")
+    return changes
+
+
+def job_accepted(job) -> JSONResponse:
+    """202 Accepted for a queued background job, pointing at its status endpoint"""
+    location = site_path(f"/api/jobs/{job.id}")
+    return JSONResponse(
+        {**job.describe(), "status_url": location},
+        status_code=202,
+        headers={"Location": location},
+    )
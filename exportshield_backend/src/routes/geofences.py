@@ -0,0 +1,260 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import Annotated, List, Literal, NamedTuple, Optional, Tuple
+from datetime import datetime
+from pydantic import BaseModel, Field, field_validator
+
+from src.middleware.profiling import ProfiledRoute
+from src.routes.dependencies import etag, if_match_version, merge_patch_changes, precondition_failed
+from src.routes.workers import workers_shards
+from src.services.geofence_service import GeofenceEngine
+from src.services.sites import SiteShards, site_seed, store_name
+from src.services.store import EntityStore, VersionConflict
+
+router = APIRouter(prefix="/api/geofences", tags=["Geofences"], route_class=ProfiledRoute)
+
+
+# Widest a fence may span in latitude or longitude (~55 km), and its most vertices
+MAX_FENCE_DEGREES = 0.5
+MAX_FENCE_VERTICES = 1000
+
+# [latitude, longitude]
+Vertex = Tuple[Annotated[float, Field(ge=-90, le=90)], Annotated[float, Field(ge=-180, le=180)]]
+
+
+def check_extent(polygon: Optional[List[Vertex]]) -> Optional[List[Vertex]]:
+    if polygon:
+        for axis, name in ((0, "latitude"), (1, "longitude")):
+            values = [vertex[axis] for vertex in polygon]
+            if max(values) - min(values) > MAX_FENCE_DEGREES:
+                raise ValueError(f"A geofence may span at most {MAX_FENCE_DEGREES} degrees of {name}")
+    return polygon
+
+
+# Pydantic models
+class GeofenceCreate(BaseModel):
+    name: str
+    kind: Literal["zone", "hazard"]
+    zone: Optional[str] = None
+    incident_id: Optional[str] = None
+    polygon: List[Vertex] = Field(..., min_length=3, max_length=MAX_FENCE_VERTICES, description="[latitude, longitude] vertices")
+
+    _check_extent = field_validator("polygon")(check_extent)
+
+
+# Partial update body: only the fields present are validated and applied
+class GeofencePatch(BaseModel):
+    name: Optional[str] = None
+    kind: Optional[Literal["zone", "hazard"]] = None
+    zone: Optional[str] = None
+    incident_id: Optional[str] = None
+    polygon: Optional[List[Vertex]] = Field(None, min_length=3, max_length=MAX_FENCE_VERTICES)
+
+    _check_extent = field_validator("polygon")(check_extent)
+
+
+class Geofence(BaseModel):
+    id: str
+    name: str
+    kind: str
+    zone: Optional[str] = None
+    incident_id: Optional[str] = None
+    polygon: List[Tuple[float, float]]
+    created_at: str
+    updated_at: str
+    version: int
+
+
+# Seed records share one timestamp instead of formatting two per record at import
+SEEDED_AT = datetime.utcnow().isoformat() + "Z"
+
+# Mock data: one fence per monitoring zone, plus the Zone C collapse-risk area
+MOCK_GEOFENCES = [
+    {
+        "id": "1",
+        "name": "Zone A - Deep Excavation",
+        "kind": "zone",
+        "zone": "Zone A - Deep Excavation",
+        "incident_id": None,
+        "polygon": [[23.5813, 87.2712], [23.5813, 87.2719], [23.5822, 87.2719], [23.5822, 87.2712]],
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
+    },
+    {
+        "id": "2",
+        "name": "Zone B - Ventilation Shaft",
+        "kind": "zone",
+        "zone": "Zone B - Ventilation Shaft",
+        "incident_id": None,
+        "polygon": [[23.5822, 87.2719], [23.5822, 87.2724], [23.5829, 87.2724], [23.5829, 87.2719]],
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
+    },
+    {
+        "id": "3",
+        "name": "Zone C - Mineral Processing",
+        "kind": "zone",
+        "zone": "Zone C - Mineral Processing",
+        "incident_id": None,
+        "polygon": [[23.5829, 87.2722], [23.5829, 87.2735], [23.5836, 87.2735], [23.5836, 87.2722]],
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
+    },
+    {
+        "id": "4",
+        "name": "Zone D - Exploration Tunnel",
+        "kind": "zone",
+        "zone": "Zone D - Exploration Tunnel",
+        "incident_id": None,
+        "polygon": [[23.5805, 87.2700], [23.5805, 87.2712], [23.5813, 87.2712], [23.5813, 87.2704]],
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
+    },
+    {
+        "id": "5",
+        "name": "Zone C collapse-risk area",
+        "kind": "hazard",
+        "zone": None,
+        "incident_id": "3",
+        "polygon": [[23.5828, 87.2727], [23.5828, 87.2733], [23.5832, 87.2733], [23.5832, 87.2727]],
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
+    },
+]
+
+
+class GeofencesShard(NamedTuple):
+    store: EntityStore
+    engine: GeofenceEngine
+
+
+def build_geofences_shard(site: str) -> GeofencesShard:
+    store = EntityStore(store_name(site, "geofences"), site_seed(site, MOCK_GEOFENCES))
+    return GeofencesShard(store, GeofenceEngine(store, workers_shards.get(site).store))
+
+
+geofences_shards = SiteShards(build_geofences_shard)
+
+
+def _check_zone(geofence: dict) -> None:
+    if geofence["kind"] == "zone" and not geofence.get("zone"):
+        raise HTTPException(status_code=422, detail="Zone geofences need a zone name")
+
+
+@router.get("/", response_model=List[Geofence])
+def get_all_geofences():
+    """Get all geofences"""
+    return geofences_shards.current().store.all()
+
+
+@router.get("/events")
+def get_geofence_events(
+    after: int = Query(0, ge=0, description="Return events with a sequence number above this"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Get worker entry/exit events, oldest first"""
+    return geofences_shards.current().engine.events(after, limit)
+
+
+@router.get("/at")
+def get_geofences_at(latitude: float = Query(...), longitude: float = Query(...)):
+    """Get the geofences containing a point"""
+    shard = geofences_shards.current()
+    return [shard.store.get(fence_id) for fence_id in shard.engine.fences_at(latitude, longitude)]
+
+
+@router.get("/{geofence_id}", response_model=Geofence)
+def get_geofence(geofence_id: str, response: Response):
+    """Get a specific geofence by ID"""
+    geofence = geofences_shards.current().store.get(geofence_id)
+    if not geofence:
+        raise HTTPException(status_code=404, detail="Geofence not found")
+    response.headers["ETag"] = etag(geofence)
+    return geofence
+
+
+@router.get("/{geofence_id}/occupants")
+def get_geofence_occupants(geofence_id: str):
+    """Get the workers currently inside a geofence"""
+    shard = geofences_shards.current()
+    if not shard.store.get(geofence_id):
+        raise HTTPException(status_code=404, detail="Geofence not found")
+    workers_store = workers_shards.current().store
+    return [workers_store.get(worker_id) for worker_id in shard.engine.occupants(geofence_id)]
+
+
+@router.post("/", response_model=Geofence, status_code=201)
+def create_geofence(geofence: GeofenceCreate):
+    """Create a new geofence"""
+    geofences_store = geofences_shards.current().store
+    new_geofence = {
+        "id": geofences_store.new_id(),
+        **geofence.dict(),
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "updated_at": datetime.utcnow().isoformat() + "Z",
+    }
+    _check_zone(new_geofence)
+    return geofences_store.insert(new_geofence)
+
+
+@router.put("/{geofence_id}", response_model=Geofence)
+def update_geofence(
+    geofence_id: str,
+    geofence: GeofenceCreate,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
+):
+    """Update an existing geofence"""
+    def apply_update(existing: dict) -> dict:
+        return {
+            "id": geofence_id,
+            **geofence.dict(),
+            "created_at": existing["created_at"],
+            "updated_at": datetime.utcnow().isoformat() + "Z",
+        }
+
+    _check_zone(geofence.dict())
+    try:
+        updated_geofence = geofences_shards.current().store.update(geofence_id, apply_update, expected_version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Geofence not found")
+    except VersionConflict as conflict:
+        raise precondition_failed(conflict)
+    response.headers["ETag"] = etag(updated_geofence)
+    return updated_geofence
+
+
+@router.patch("/{geofence_id}", response_model=Geofence)
+def patch_geofence(
+    geofence_id: str,
+    geofence: GeofencePatch,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
+):
+    """Partially update a geofence (JSON Merge Patch)"""
+    changes = merge_patch_changes(geofence)
+    geofences_store = geofences_shards.current().store
+    existing = geofences_store.get(geofence_id)
+    if not existing:
+        raise HTTPException(status_code=404, detail="Geofence not found")
+    _check_zone({**existing, **changes})
+    changes["updated_at"] = datetime.utcnow().isoformat() + "Z"
+    try:
+        updated_geofence = geofences_store.patch(geofence_id, changes, expected_version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Geofence not found")
+    except VersionConflict as conflict:
+        raise precondition_failed(conflict)
+    response.headers["ETag"] = etag(updated_geofence)
+    return updated_geofence
+
+
+@router.delete("/{geofence_id}")
+def delete_geofence(geofence_id: str, expected_version: Optional[int] = Depends(if_match_version)):
+    """Delete a geofence"""
+    try:
+        geofences_shards.current().store.delete(geofence_id, expected_version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Geofence not found")
+    except VersionConflict as conflict:
+        raise precondition_failed(conflict)
+    return {"message": "Geofence deleted", "id": geofence_id}
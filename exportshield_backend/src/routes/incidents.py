@@ -1,9 +1,28 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional, Dict
-from datetime import datetime
+import math
+from collections import defaultdict
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import List, Literal, NamedTuple, Optional, Dict
+from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel
 
-router = APIRouter(prefix="/api/incidents", tags=["Incidents"])
+from src.middleware.profiling import ProfiledRoute
+from src.routes.dependencies import etag, if_match_version, job_accepted, merge_patch_changes, precondition_failed
+from src.routes.workers import workers_shards
+from src.services.audit_log import audit_trail
+from src.services.exposure_service import EXPOSURE_FIELDS, METERS_PER_DEGREE, ExposureTracker
+from src.services.job_queue import job_queues
+from src.services.incident_timeline import IncidentTimeline, format_timestamp
+from src.services.indexes import CountIndex, FilteredIndex
+from src.services.seed_loader import fallback_seed, register_seed
+from src.services.sites import DEFAULT_SITE, SiteShards, current_site, store_name
+from src.services.store import BOOKKEEPING_FIELDS, EntityStore, VersionConflict
+
+router = APIRouter(prefix="/api/incidents", tags=["Incidents"], route_class=ProfiledRoute)
+
+# Heat each incident adds to its grid cell, by severity
+SEVERITY_HEAT = {"low": 1, "medium": 2, "high": 3, "critical": 5}
+HEATMAP_PROGRESS_EVERY = 1000
 
 
 # Pydantic models
@@ -19,8 +38,22 @@ class IncidentCreate(BaseModel):
     affected_workers: Optional[int] = 0
 
 
+# Partial update body: only the fields present are validated and applied
+class IncidentPatch(BaseModel):
+    type: Optional[str] = None
+    severity: Optional[str] = None
+    zone: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    affected_workers: Optional[int] = None
+
+
 class Incident(BaseModel):
     id: str
+    site: str = DEFAULT_SITE
     type: str
     severity: str
     zone: str
@@ -30,9 +63,14 @@ class Incident(BaseModel):
     description: str
     status: str
     affected_workers: int
+    exposed_worker_ids: List[str] = []
     created_at: str
     updated_at: str
+    version: int
+
 
+# Seed records share one timestamp instead of formatting two per record at import
+SEEDED_AT = datetime.utcnow().isoformat() + "Z"
 
 # Mock data
 MOCK_INCIDENTS = [
@@ -47,8 +85,8 @@ MOCK_INCIDENTS = [
         "description": "Elevated methane levels detected in Zone B tunnel section",
         "status": "active",
         "affected_workers": 5,
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "2",
@@ -61,8 +99,8 @@ MOCK_INCIDENTS = [
         "description": "Primary drill experienced mechanical failure",
         "status": "resolved",
         "affected_workers": 2,
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "3",
@@ -75,8 +113,8 @@ MOCK_INCIDENTS = [
         "description": "Cracks detected in support beams - immediate evacuation required",
         "status": "active",
         "affected_workers": 12,
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "4",
@@ -89,85 +127,268 @@ MOCK_INCIDENTS = [
         "description": "Multiple workers showing signs of heat stress",
         "status": "active",
         "affected_workers": 3,
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
 ]
 
 
+class IncidentsShard(NamedTuple):
+    store: EntityStore
+    exposure: ExposureTracker
+    active: FilteredIndex
+    critical: FilteredIndex
+    by_zone: CountIndex
+    by_severity: CountIndex
+    by_status: CountIndex
+    timeline: IncidentTimeline
+
+
+def incident_record(incident: IncidentCreate, incident_id: str, site: str, at: str) -> dict:
+    """A new incident as stored, before its exposure is computed"""
+    return {
+        "id": incident_id,
+        "site": site,
+        **incident.dict(),
+        "created_at": at,
+        "updated_at": at,
+    }
+
+
+def build_incidents_shard(site: str) -> IncidentsShard:
+    # Exposure is computed from live worker positions, so the seed gets it too.
+    exposure = ExposureTracker(workers_shards.get(site).store)
+    store = EntityStore(
+        store_name(site, "incidents"),
+        [exposure.with_exposure(i) for i in fallback_seed(site, "incidents", MOCK_INCIDENTS)],
+    )
+    register_seed(
+        site, "incidents", store, IncidentCreate,
+        lambda incident, incident_id, at: exposure.with_exposure(incident_record(incident, incident_id, site, at)),
+    )
+    audit_trail.watch(store)
+    exposure.track(store)
+    active = FilteredIndex(store, lambda i: i["status"] == "active", fields=("status",))
+    critical = FilteredIndex(
+        store,
+        lambda i: i["severity"] == "critical" or i["severity"] == "high",
+        fields=("severity",),
+    )
+    # Exposure refreshes follow worker movement and are not lifecycle events
+    timeline = IncidentTimeline(store, fields=Incident.model_fields.keys() - BOOKKEEPING_FIELDS - set(EXPOSURE_FIELDS))
+    return IncidentsShard(
+        store,
+        exposure,
+        active,
+        critical,
+        CountIndex(store, "zone"),
+        CountIndex(store, "severity"),
+        CountIndex(store, "status"),
+        timeline,
+    )
+
+
+incidents_shards = SiteShards(build_incidents_shard)
+
+
+def _period(since: Optional[datetime], until: Optional[datetime], default_days: int = 30):
+    """Epoch bounds for a [since, until) query, defaulting to the last ``default_days`` days"""
+    end = until or datetime.now(timezone.utc)
+    start = since or end - timedelta(days=default_days)
+    return (
+        (start if start.tzinfo else start.replace(tzinfo=timezone.utc)).timestamp(),
+        (end if end.tzinfo else end.replace(tzinfo=timezone.utc)).timestamp(),
+    )
+
+
 @router.get("/", response_model=List[Incident])
 def get_all_incidents():
     """Get all incidents"""
-    return MOCK_INCIDENTS
+    return incidents_shards.current().store.all()
 
 
 @router.get("/active", response_model=List[Incident])
 def get_active_incidents():
     """Get all active incidents"""
-    return [i for i in MOCK_INCIDENTS if i["status"] == "active"]
+    return incidents_shards.current().active.records()
 
 
 @router.get("/critical", response_model=List[Incident])
 def get_critical_incidents():
     """Get critical severity incidents"""
-    return [i for i in MOCK_INCIDENTS if i["severity"] == "critical" or i["severity"] == "high"]
+    return incidents_shards.current().critical.records()
 
 
 @router.get("/heatmap")
 def get_incident_heatmap() -> Dict[str, int]:
     """Get incident count by zone for heatmap visualization"""
-    heatmap = {}
-    for incident in MOCK_INCIDENTS:
-        zone = incident["zone"]
-        heatmap[zone] = heatmap.get(zone, 0) + 1
-    return heatmap
+    return incidents_shards.current().by_zone.counts()
+
+
+def _grid_heatmap(incidents_store: EntityStore, cell_m: float, status: Optional[str]):
+    """Bin incidents into square cells of ``cell_m`` metres, weighted by severity"""
+    def run(job) -> dict:
+        incidents = [i for i in incidents_store.all() if status is None or i["status"] == status]
+        lat_step = cell_m / METERS_PER_DEGREE
+        origin = sum(i["latitude"] for i in incidents) / len(incidents) if incidents else 0.0
+        lng_step = lat_step / max(math.cos(math.radians(origin)), 1e-6)
+        cells = defaultdict(lambda: [0, 0])
+        for position, incident in enumerate(incidents):
+            if position % HEATMAP_PROGRESS_EVERY == 0:
+                job.report(position / len(incidents), f"binned {position} of {len(incidents)}")
+            cell = cells[(math.floor(incident["latitude"] / lat_step), math.floor(incident["longitude"] / lng_step))]
+            cell[0] += 1
+            cell[1] += SEVERITY_HEAT.get(incident["severity"], 1)
+        ranked = sorted(cells.items(), key=lambda item: (-item[1][1], item[0]))
+        return {
+            "cell_m": cell_m,
+            "status": status,
+            "incidents": len(incidents),
+            "cells": [
+                {
+                    "latitude": round((row + 0.5) * lat_step, 6),
+                    "longitude": round((col + 0.5) * lng_step, 6),
+                    "count": count,
+                    "heat": heat,
+                }
+                for (row, col), (count, heat) in ranked
+            ],
+        }
+
+    return run
+
+
+@router.post("/heatmap/grid", status_code=202)
+def rebuild_grid_heatmap(
+    cell_m: float = Query(25.0, ge=1, le=1000, description="Cell edge in metres"),
+    status: Optional[str] = Query(None, description="Only incidents with this status, e.g. active"),
+    priority: Literal["high", "normal", "low"] = Query("normal"),
+):
+    """Queue a rebuild of the fine-grained incident heatmap, weighted by severity"""
+    return job_accepted(job_queues.current().submit("incident-heatmap", _grid_heatmap(incidents_shards.current().store, cell_m, status), priority))
+
+
+@router.get("/stats/counts")
+def get_incident_counts(
+    by: str = Query("day", description="Bucket by day, week or zone"),
+    since: Optional[datetime] = Query(None, description="Start of period (default: 30 days ago)"),
+    until: Optional[datetime] = Query(None, description="End of period (default: now)"),
+) -> Dict[str, int]:
+    """Get incidents created per day, week or zone"""
+    if by not in ("day", "week", "zone"):
+        raise HTTPException(status_code=422, detail="by must be one of: day, week, zone")
+    return incidents_shards.current().timeline.counts(by, *_period(since, until))
+
+
+@router.get("/stats/resolution")
+def get_resolution_stats(
+    since: Optional[datetime] = Query(None, description="Start of period (default: 30 days ago)"),
+    until: Optional[datetime] = Query(None, description="End of period (default: now)"),
+) -> dict:
+    """Get mean time to resolve for incidents resolved in a period"""
+    return incidents_shards.current().timeline.resolution_stats(*_period(since, until))
+
+
+@router.get("/stats/active-at")
+def get_active_at(at: Optional[datetime] = Query(None, description="Point in time (default: now)")) -> dict:
+    """Get how many incidents were active at a point in time, overall and per zone"""
+    moment = _period(None, at)[1]
+    return {"at": format_timestamp(moment), **incidents_shards.current().timeline.active_at(moment)}
+
+
+@router.get("/{incident_id}/history")
+def get_incident_history(incident_id: str) -> List[dict]:
+    """Get the lifecycle events of an incident, oldest first"""
+    history = incidents_shards.current().timeline.history(incident_id)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    return history
 
 
 @router.get("/{incident_id}", response_model=Incident)
-def get_incident(incident_id: str):
+def get_incident(incident_id: str, response: Response):
     """Get specific incident by ID"""
-    incident = next((i for i in MOCK_INCIDENTS if i["id"] == incident_id), None)
+    incident = incidents_shards.current().store.get(incident_id)
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
+    response.headers["ETag"] = etag(incident)
     return incident
 
 
 @router.post("/", response_model=Incident, status_code=201)
 def create_incident(incident: IncidentCreate):
     """Create new incident"""
-    new_incident = {
-        "id": str(len(MOCK_INCIDENTS) + 1),
-        **incident.dict(),
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
-    }
-    MOCK_INCIDENTS.append(new_incident)
-    return new_incident
+    shard = incidents_shards.current()
+    new_incident = shard.exposure.with_exposure(
+        incident_record(incident, shard.store.new_id(), current_site.get(), datetime.utcnow().isoformat() + "Z")
+    )
+    return shard.store.insert(new_incident)
 
 
 @router.put("/{incident_id}", response_model=Incident)
-def update_incident(incident_id: str, incident: IncidentCreate):
+def update_incident(
+    incident_id: str,
+    incident: IncidentCreate,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
+):
     """Update existing incident"""
-    incident_index = next((i for i, inc in enumerate(MOCK_INCIDENTS) if inc["id"] == incident_id), None)
-    if incident_index is None:
+    shard = incidents_shards.current()
+
+    def apply_update(existing: dict) -> dict:
+        return shard.exposure.with_exposure({
+            "id": incident_id,
+            "site": existing.get("site", current_site.get()),
+            **incident.dict(),
+            "exposed_worker_ids": existing.get("exposed_worker_ids", []),
+            "created_at": existing["created_at"],
+            "updated_at": datetime.utcnow().isoformat() + "Z",
+        })
+
+    try:
+        updated_incident = shard.store.update(incident_id, apply_update, expected_version)
+    except KeyError:
         raise HTTPException(status_code=404, detail="Incident not found")
-    
-    updated_incident = {
-        "id": incident_id,
-        **incident.dict(),
-        "created_at": MOCK_INCIDENTS[incident_index]["created_at"],
-        "updated_at": datetime.utcnow().isoformat() + "Z",
-    }
-    MOCK_INCIDENTS[incident_index] = updated_incident
+    except VersionConflict as conflict:
+        raise precondition_failed(conflict)
+    response.headers["ETag"] = etag(updated_incident)
+    return updated_incident
+
+
+@router.patch("/{incident_id}", response_model=Incident)
+def patch_incident(
+    incident_id: str,
+    incident: IncidentPatch,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
+):
+    """Partially update an incident (JSON Merge Patch)"""
+    changes = merge_patch_changes(incident)
+    changes["updated_at"] = datetime.utcnow().isoformat() + "Z"
+    shard = incidents_shards.current()
+    if changes.keys() & {"latitude", "longitude", "severity", "status"}:
+        current = shard.store.get(incident_id)
+        if current is not None:
+            exposure = shard.exposure.with_exposure({**current, **changes})
+            changes["exposed_worker_ids"] = exposure["exposed_worker_ids"]
+            changes["affected_workers"] = exposure["affected_workers"]
+    try:
+        updated_incident = shard.store.patch(incident_id, changes, expected_version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    except VersionConflict as conflict:
+        raise precondition_failed(conflict)
+    response.headers["ETag"] = etag(updated_incident)
     return updated_incident
 
 
 @router.delete("/{incident_id}")
-def delete_incident(incident_id: str):
+def delete_incident(incident_id: str, expected_version: Optional[int] = Depends(if_match_version)):
     """Delete incident"""
-    incident_index = next((i for i, inc in enumerate(MOCK_INCIDENTS) if inc["id"] == incident_id), None)
-    if incident_index is None:
+    try:
+        incidents_shards.current().store.delete(incident_id, expected_version)
+    except KeyError:
         raise HTTPException(status_code=404, detail="Incident not found")
-    
-    MOCK_INCIDENTS.pop(incident_index)
+    except VersionConflict as conflict:
+        raise precondition_failed(conflict)
     return {"message": "Incident deleted", "id": incident_id}
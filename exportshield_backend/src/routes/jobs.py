@@ -0,0 +1,105 @@
+import json
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Response
+
+from src.middleware.profiling import ProfiledRoute
+from src.routes.corridors import corridors_shards
+from src.routes.dependencies import job_accepted
+from src.routes.geofences import geofences_shards
+from src.routes.incidents import incidents_shards
+from src.routes.machinery import machinery_shards
+from src.routes.workers import workers_shards
+from src.services.job_queue import FINISHED, job_queues
+from src.services.sites import site_path
+from src.services.store import consistent_read
+
+router = APIRouter(prefix="/api/jobs", tags=["Jobs"], route_class=ProfiledRoute)
+
+EXPORTABLE = {
+    "workers": workers_shards,
+    "machinery": machinery_shards,
+    "incidents": incidents_shards,
+    "corridors": corridors_shards,
+    "geofences": geofences_shards,
+}
+EXPORT_PROGRESS_EVERY = 1000
+
+
+def _export(stores):
+    """Encode every record of ``{name: store}`` as NDJSON, one ``{"store", "record"}`` object per line"""
+    def run(job) -> bytes:
+        # One read snapshot, so every store is exported as of the same moment
+        with consistent_read() as snapshot:
+            snapshots = [(name, snapshot.records(store)) for name, store in stores.items()]
+        total = sum(len(records) for _, records in snapshots) or 1
+        lines = []
+        for name, records in snapshots:
+            for record in records:
+                if len(lines) % EXPORT_PROGRESS_EVERY == 0:
+                    job.report(len(lines) / total, f"exporting {name}")
+                lines.append(json.dumps({"store": name, "record": record}, separators=(",", ":")))
+        return ("\n".join(lines) + "\n").encode("utf-8") if lines else b""
+
+    return run
+
+
+def _get_job(job_id: str):
+    job = job_queues.current().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or its result has expired")
+    return job
+
+
+@router.get("/")
+def get_jobs(status: Optional[Literal["queued", "running", "succeeded", "failed", "cancelled"]] = None):
+    """List background jobs, newest first"""
+    return [job.describe() for job in job_queues.current().jobs(status)]
+
+
+@router.post("/exports", status_code=202)
+def create_export(
+    stores: Optional[str] = Query(None, description=f"Comma-separated stores to export (default all): {', '.join(EXPORTABLE)}"),
+    priority: Literal["high", "normal", "low"] = Query("low"),
+):
+    """Queue an NDJSON export of one or more stores"""
+    names = [name.strip() for name in stores.split(",") if name.strip()] if stores else list(EXPORTABLE)
+    unknown = sorted(set(names) - EXPORTABLE.keys())
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown stores: {', '.join(unknown)}")
+    selected = {name: EXPORTABLE[name].current().store for name in names}
+    return job_accepted(job_queues.current().submit("export", _export(selected), priority, media_type="application/x-ndjson"))
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    """Get the status and progress of a background job"""
+    job = _get_job(job_id)
+    described = job.describe()
+    if job.status == "succeeded":
+        described["result_url"] = site_path(f"/api/jobs/{job.id}/result")
+    return described
+
+
+@router.get("/{job_id}/result")
+def get_job_result(job_id: str):
+    """Get the result of a finished background job"""
+    job = _get_job(job_id)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}, no result available")
+    if job.media_type == "application/json":
+        return job.result
+    return Response(
+        job.result,
+        media_type=job.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{job.kind}-{job.id}.ndjson"'},
+    )
+
+
+@router.delete("/{job_id}")
+def cancel_job(job_id: str):
+    """Cancel a queued job or stop a running one at its next progress report"""
+    job = _get_job(job_id)
+    if job.status in FINISHED:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    return job_queues.current().cancel(job_id).describe()
@@ -1,9 +1,27 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from collections import Counter
+from typing import List, Literal, NamedTuple, Optional
 from datetime import datetime
 from pydantic import BaseModel
 
-router = APIRouter(prefix="/api/machinery", tags=["Machinery"])
+from src.middleware.profiling import ProfiledRoute
+from src.routes.dependencies import etag, if_match_version, job_accepted, merge_patch_changes, precondition_failed
+from src.services.anomaly_service import AnomalyDetector
+from src.services.audit_log import audit_trail
+from src.services.indexes import CountIndex, FilteredIndex
+from src.services.job_queue import job_queues
+from src.services.maintenance_service import MaintenanceSchedule, flagged_at, parse_window, risk_band, risk_score
+from src.services.seed_loader import fallback_seed, register_seed
+from src.services.sites import DEFAULT_SITE, SiteShards, current_site, store_name
+from src.services.store import EntityStore, VersionConflict
+
+router = APIRouter(prefix="/api/machinery", tags=["Machinery"], route_class=ProfiledRoute)
+
+MAINTENANCE_CREWS = int(os.getenv("MININGMITRA_MAINTENANCE_CREWS", "2"))
+RESCORE_PROGRESS_EVERY = 200
+MAX_TELEMETRY_BATCH = 5000
 
 
 # Pydantic models
@@ -21,8 +39,32 @@ class MachineryCreate(BaseModel):
     predicted_failure_risk: Optional[str] = "low"
 
 
+# Partial update body: only the fields present are validated and applied
+class MachineryPatch(BaseModel):
+    name: Optional[str] = None
+    type: Optional[str] = None
+    location: Optional[str] = None
+    health: Optional[int] = None
+    status: Optional[str] = None
+    operating_hours: Optional[int] = None
+    efficiency: Optional[int] = None
+    vibration: Optional[float] = None
+    temperature: Optional[float] = None
+    next_maintenance: Optional[str] = None
+    predicted_failure_risk: Optional[str] = None
+
+
+# One sensor reading in a telemetry batch; absent signals keep their last value
+class MachineryReading(BaseModel):
+    id: str
+    vibration: Optional[float] = None
+    temperature: Optional[float] = None
+    operating_hours: Optional[int] = None
+
+
 class Machinery(BaseModel):
     id: str
+    site: str = DEFAULT_SITE
     name: str
     type: str
     location: str
@@ -34,10 +76,16 @@ class Machinery(BaseModel):
     temperature: float
     next_maintenance: str
     predicted_failure_risk: str
+    # When the machine was flagged maintenance_required; unset otherwise
+    flagged_at: Optional[str] = None
     created_at: str
     updated_at: str
+    version: int
 
 
+# Seed records share one timestamp instead of formatting two per record at import
+SEEDED_AT = datetime.utcnow().isoformat() + "Z"
+
 # Mock data
 MOCK_MACHINERY = [
     {
@@ -53,8 +101,8 @@ MOCK_MACHINERY = [
         "temperature": 65.0,
         "next_maintenance": "2025-12-01",
         "predicted_failure_risk": "low",
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "2",
@@ -69,8 +117,9 @@ MOCK_MACHINERY = [
         "temperature": 85.0,
         "next_maintenance": "2025-11-20",
         "predicted_failure_risk": "high",
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "flagged_at": SEEDED_AT,
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "3",
@@ -85,8 +134,8 @@ MOCK_MACHINERY = [
         "temperature": 55.0,
         "next_maintenance": "2026-01-15",
         "predicted_failure_risk": "low",
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "4",
@@ -101,8 +150,8 @@ MOCK_MACHINERY = [
         "temperature": 72.0,
         "next_maintenance": "2025-11-25",
         "predicted_failure_risk": "medium",
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "5",
@@ -117,8 +166,8 @@ MOCK_MACHINERY = [
         "temperature": 68.0,
         "next_maintenance": "2025-12-10",
         "predicted_failure_risk": "low",
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "6",
@@ -133,74 +182,261 @@ MOCK_MACHINERY = [
         "temperature": 45.0,
         "next_maintenance": "2025-11-30",
         "predicted_failure_risk": "low",
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
 ]
 
 
+class MachineryShard(NamedTuple):
+    store: EntityStore
+    critical: FilteredIndex
+    schedule: MaintenanceSchedule
+    by_status: CountIndex
+    anomalies: AnomalyDetector
+
+
+def machinery_record(machinery: MachineryCreate, machinery_id: str, site: str, at: str) -> dict:
+    """New machinery as stored"""
+    return {
+        "id": machinery_id,
+        "site": site,
+        **machinery.dict(),
+        "next_maintenance": machinery.next_maintenance or "2025-12-31",
+        "flagged_at": flagged_at(None, machinery.status, at),
+        "created_at": at,
+        "updated_at": at,
+    }
+
+
+def build_machinery_shard(site: str) -> MachineryShard:
+    store = EntityStore(store_name(site, "machinery"), fallback_seed(site, "machinery", MOCK_MACHINERY))
+    register_seed(
+        site, "machinery", store, MachineryCreate,
+        lambda machinery, machinery_id, at: machinery_record(machinery, machinery_id, site, at),
+    )
+    audit_trail.watch(store)
+    critical = FilteredIndex(
+        store,
+        lambda m: m["status"] == "maintenance_required" or m["predicted_failure_risk"] == "high",
+        fields=("status", "predicted_failure_risk"),
+    )
+    schedule = MaintenanceSchedule(store)
+    return MachineryShard(store, critical, schedule, CountIndex(store, "status"), AnomalyDetector(store))
+
+
+machinery_shards = SiteShards(build_machinery_shard)
+
+
 @router.get("/", response_model=List[Machinery])
 def get_all_machinery():
     """Get all machinery"""
-    return MOCK_MACHINERY
+    return machinery_shards.current().store.all()
 
 
 @router.get("/critical", response_model=List[Machinery])
 def get_critical_machinery():
     """Get machinery that requires maintenance or has high failure risk"""
-    return [
-        m for m in MOCK_MACHINERY 
-        if m["status"] == "maintenance_required" or m["predicted_failure_risk"] == "high"
-    ]
+    return machinery_shards.current().critical.records()
+
+
+@router.get("/maintenance/upcoming")
+def get_upcoming_maintenance(
+    within: str = Query("7d", pattern=r"^\d+[dw]$", description="Look-ahead window, e.g. 7d or 2w"),
+):
+    """Get machinery due for maintenance within a window, most urgent first"""
+    return machinery_shards.current().schedule.upcoming(parse_window(within))
+
+
+@router.get("/maintenance/plan")
+def get_maintenance_plan(
+    days: int = Query(14, ge=1, le=90, description="Planning horizon in days"),
+    crews: int = Query(MAINTENANCE_CREWS, ge=1, le=50, description="Maintenance crews available per day"),
+    jobs_per_crew: int = Query(1, ge=1, le=10, description="Jobs one crew completes per day"),
+):
+    """Get a day-by-day maintenance plan that fits crew capacity"""
+    return machinery_shards.current().schedule.plan(days, crews, jobs_per_crew)
+
+
+@router.get("/anomalies")
+def get_machinery_anomalies(
+    after: int = Query(0, ge=0, description="Return anomalies with a sequence number above this"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Get vibration and temperature anomalies, oldest first"""
+    return machinery_shards.current().anomalies.events(after, limit)
+
+
+@router.get("/anomalies/active")
+def get_active_machinery_anomalies():
+    """Get each machine's latest anomaly still within the alert hold time"""
+    return machinery_shards.current().anomalies.active()
+
+
+@router.post("/telemetry")
+def ingest_machinery_telemetry(readings: List[MachineryReading]):
+    """Apply a batch of sensor readings and report the anomalies they raised"""
+    if len(readings) > MAX_TELEMETRY_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_TELEMETRY_BATCH} readings per batch")
+    shard = machinery_shards.current()
+    stamp = datetime.utcnow().isoformat() + "Z"
+    missing, raised = [], []
+    for reading in readings:
+        changes = reading.dict(exclude_none=True)
+        machine_id = changes.pop("id")
+        try:
+            machine = shard.store.patch(machine_id, {**changes, "updated_at": stamp})
+        except KeyError:
+            missing.append(machine_id)
+            continue
+        raised.extend(shard.anomalies.observe(machine, changes, stamp))
+    return {"applied": len(readings) - len(missing), "missing": missing, "anomalies": raised}
+
+
+def _rescore_fleet(machinery_store: EntityStore):
+    """Re-derive every machine's predicted_failure_risk from its current readings"""
+    def rescored(current: dict) -> dict:
+        return {
+            **current,
+            "predicted_failure_risk": risk_band(risk_score(current)),
+            "updated_at": datetime.utcnow().isoformat() + "Z",
+        }
+
+    def run(job) -> dict:
+        machines = machinery_store.all()
+        bands = Counter()
+        changed = 0
+        for position, machine in enumerate(machines):
+            if position % RESCORE_PROGRESS_EVERY == 0:
+                job.report(position / len(machines), f"rescored {position} of {len(machines)}")
+            band = risk_band(risk_score(machine))
+            bands[band] += 1
+            if band != machine["predicted_failure_risk"]:
+                try:
+                    machinery_store.update(machine["id"], rescored)
+                except KeyError:
+                    continue
+                changed += 1
+        return {"scored": len(machines), "changed": changed, "bands": dict(bands)}
+
+    return run
+
+
+@router.post("/risk/rescore", status_code=202)
+def rescore_machinery_risk(priority: Literal["high", "normal", "low"] = Query("normal")):
+    """Queue a rescoring of predicted failure risk across the whole fleet"""
+    return job_accepted(job_queues.current().submit("machinery-rescore", _rescore_fleet(machinery_shards.current().store), priority))
 
 
 @router.get("/{machinery_id}", response_model=Machinery)
-def get_machinery(machinery_id: str):
+def get_machinery(machinery_id: str, response: Response):
     """Get specific machinery by ID"""
-    machinery = next((m for m in MOCK_MACHINERY if m["id"] == machinery_id), None)
+    machinery = machinery_shards.current().store.get(machinery_id)
     if not machinery:
         raise HTTPException(status_code=404, detail="Machinery not found")
+    response.headers["ETag"] = etag(machinery)
     return machinery
 
 
 @router.post("/", response_model=Machinery, status_code=201)
 def create_machinery(machinery: MachineryCreate):
     """Create new machinery entry"""
-    new_machinery = {
-        "id": str(len(MOCK_MACHINERY) + 1),
-        **machinery.dict(),
-        "next_maintenance": machinery.next_maintenance or "2025-12-31",
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
-    }
-    MOCK_MACHINERY.append(new_machinery)
-    return new_machinery
+    machinery_store = machinery_shards.current().store
+    new_machinery = machinery_record(machinery, machinery_store.new_id(), current_site.get(), datetime.utcnow().isoformat() + "Z")
+    return machinery_store.insert(new_machinery)
+
+
+@router.get("/{machinery_id}/anomalies")
+def get_machinery_baseline(machinery_id: str, after: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    """Get a machine's signal baselines and its anomalies"""
+    anomalies = machinery_shards.current().anomalies
+    baseline = anomalies.baseline(machinery_id)
+    if baseline is None:
+        raise HTTPException(status_code=404, detail="Machinery not found")
+    return {**baseline, "anomalies": anomalies.events(after, limit, machine_ids={machinery_id})}
 
 
 @router.put("/{machinery_id}", response_model=Machinery)
-def update_machinery(machinery_id: str, machinery: MachineryCreate):
+def update_machinery(
+    machinery_id: str,
+    machinery: MachineryCreate,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
+):
     """Update existing machinery"""
-    machinery_index = next((i for i, m in enumerate(MOCK_MACHINERY) if m["id"] == machinery_id), None)
-    if machinery_index is None:
+    def apply_update(existing: dict) -> dict:
+        at = datetime.utcnow().isoformat() + "Z"
+        return {
+            "id": machinery_id,
+            "site": existing.get("site", current_site.get()),
+            **machinery.dict(),
+            "next_maintenance": machinery.next_maintenance or existing["next_maintenance"],
+            "flagged_at": flagged_at(existing, machinery.status, at),
+            "created_at": existing["created_at"],
+            "updated_at": at,
+        }
+
+    shard = machinery_shards.current()
+    try:
+        updated_machinery = shard.store.update(machinery_id, apply_update, expected_version)
+    except KeyError:
         raise HTTPException(status_code=404, detail="Machinery not found")
-    
-    updated_machinery = {
-        "id": machinery_id,
-        **machinery.dict(),
-        "next_maintenance": machinery.next_maintenance or MOCK_MACHINERY[machinery_index]["next_maintenance"],
-        "created_at": MOCK_MACHINERY[machinery_index]["created_at"],
-        "updated_at": datetime.utcnow().isoformat() + "Z",
-    }
-    MOCK_MACHINERY[machinery_index] = updated_machinery
+    except VersionConflict as conflict:
+        raise precondition_failed(conflict)
+    shard.anomalies.observe(updated_machinery, updated_machinery, updated_machinery["updated_at"])
+    response.headers["ETag"] = etag(updated_machinery)
+    return updated_machinery
+
+
+def _patch_machinery(machinery_store: EntityStore, machinery_id: str, changes: dict, expected_version: Optional[int]) -> dict:
+    """``store.patch`` that also keeps ``flagged_at`` in step with a status change"""
+    if "status" not in changes:
+        return machinery_store.patch(machinery_id, changes, expected_version)
+    while True:
+        current = machinery_store.get(machinery_id)
+        if current is None:
+            raise KeyError(machinery_id)
+        flagged = flagged_at(current, changes["status"], changes["updated_at"])
+        try:
+            # Pinned to the version read, so the flag cannot be computed from a stale status
+            return machinery_store.patch(
+                machinery_id, {**changes, "flagged_at": flagged},
+                current["version"] if expected_version is None else expected_version,
+            )
+        except VersionConflict:
+            if expected_version is not None:
+                raise
+
+
+@router.patch("/{machinery_id}", response_model=Machinery)
+def patch_machinery(
+    machinery_id: str,
+    machinery: MachineryPatch,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
+):
+    """Partially update machinery (JSON Merge Patch)"""
+    changes = merge_patch_changes(machinery)
+    changes["updated_at"] = datetime.utcnow().isoformat() + "Z"
+    shard = machinery_shards.current()
+    try:
+        updated_machinery = _patch_machinery(shard.store, machinery_id, changes, expected_version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Machinery not found")
+    except VersionConflict as conflict:
+        raise precondition_failed(conflict)
+    shard.anomalies.observe(updated_machinery, changes, changes["updated_at"])
+    response.headers["ETag"] = etag(updated_machinery)
     return updated_machinery
 
 
 @router.delete("/{machinery_id}")
-def delete_machinery(machinery_id: str):
+def delete_machinery(machinery_id: str, expected_version: Optional[int] = Depends(if_match_version)):
     """Delete machinery"""
-    machinery_index = next((i for i, m in enumerate(MOCK_MACHINERY) if m["id"] == machinery_id), None)
-    if machinery_index is None:
+    try:
+        machinery_shards.current().store.delete(machinery_id, expected_version)
+    except KeyError:
         raise HTTPException(status_code=404, detail="Machinery not found")
-    
-    MOCK_MACHINERY.pop(machinery_index)
+    except VersionConflict as conflict:
+        raise precondition_failed(conflict)
     return {"message": "Machinery deleted", "id": machinery_id}
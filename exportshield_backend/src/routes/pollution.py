@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Query
 
+from src.middleware.profiling import ProfiledRoute
 from src.services.pollution_service import calculate_pollution_index
 
 
-router = APIRouter(prefix="/api", tags=["Pollution"])
+router = APIRouter(prefix="/api", tags=["Pollution"], route_class=ProfiledRoute)
 
 
 @router.get("/pollution")
@@ -0,0 +1,291 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import Dict, List, Literal, NamedTuple, Optional
+from datetime import datetime, timedelta, timezone
+from pydantic import BaseModel, model_validator
+
+from src.middleware.profiling import ProfiledRoute
+from src.routes.dependencies import etag, if_match_version, precondition_failed
+from src.routes.workers import MOCK_WORKERS, workers_shards
+from src.services.incident_timeline import format_timestamp
+from src.services.roster_service import DAY, MAX_SHIFT_HOURS, RosterRollups
+from src.services.seed_loader import fallback_seed, register_seed
+from src.services.sites import DEFAULT_SITE, SiteShards, current_site, store_name
+from src.services.store import EntityStore, VersionConflict
+
+router = APIRouter(prefix="/api/roster", tags=["Roster"], route_class=ProfiledRoute)
+
+# Longest span one headcount series may cover, per bucket size
+MAX_SERIES_DAYS = {"hour": 31, "day": 366}
+
+
+def _utc(moment: datetime) -> datetime:
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+# Pydantic models
+class ShiftBreak(BaseModel):
+    start: datetime
+    end: datetime
+
+
+class ShiftCreate(BaseModel):
+    worker_id: str
+    shift: str
+    start: datetime
+    end: datetime
+    # Default to the worker's current zone and role
+    zone: Optional[str] = None
+    role: Optional[str] = None
+    breaks: List[ShiftBreak] = []
+
+    @model_validator(mode="after")
+    def check_times(self):
+        start, end = _utc(self.start), _utc(self.end)
+        if end <= start:
+            raise ValueError("A shift must end after it starts")
+        if end - start > timedelta(hours=MAX_SHIFT_HOURS):
+            raise ValueError(f"A shift may last at most {MAX_SHIFT_HOURS} hours")
+        previous_end = start
+        for shift_break in sorted(self.breaks, key=lambda b: _utc(b.start)):
+            if not previous_end <= _utc(shift_break.start) < _utc(shift_break.end) <= end:
+                raise ValueError("Breaks must lie within the shift without overlapping")
+            previous_end = _utc(shift_break.end)
+        return self
+
+
+class Shift(BaseModel):
+    id: str
+    site: str = DEFAULT_SITE
+    worker_id: str
+    shift: str
+    zone: str
+    role: str
+    start: str
+    end: str
+    breaks: List[Dict[str, str]]
+    created_at: str
+    updated_at: str
+    version: int
+
+
+# Daily pattern of the demo roster, in UTC hours: (start, length, meal break offset)
+SHIFT_PATTERNS = {
+    "morning": (6, 8, 4),
+    "afternoon": (14, 8, 4),
+    "night": (22, 8, 4),
+}
+DEMO_ROSTER_DAYS = 30
+
+
+def demo_roster(today: datetime) -> List[dict]:
+    """
+    Shifts of the demo workers for the last DEMO_ROSTER_DAYS days and today.
+
+    Workers rotate through the morning, afternoon and night shifts in id
+    order, in their current zone, each with a 30-minute meal break.
+    """
+    created_at = today.replace(tzinfo=None).isoformat() + "Z"
+    shifts = []
+    for days_ago in range(DEMO_ROSTER_DAYS, -1, -1):
+        day = today - timedelta(days=days_ago)
+        for index, worker in enumerate(MOCK_WORKERS):
+            name = list(SHIFT_PATTERNS)[index % len(SHIFT_PATTERNS)]
+            first_hour, hours, break_after = SHIFT_PATTERNS[name]
+            start = day + timedelta(hours=first_hour)
+            break_start = start + timedelta(hours=break_after)
+            shifts.append({
+                "id": str(len(shifts) + 1),
+                "worker_id": worker["id"],
+                "shift": name,
+                "zone": worker["zone"],
+                "role": worker["role"],
+                "start": format_timestamp(start.timestamp()),
+                "end": format_timestamp((start + timedelta(hours=hours)).timestamp()),
+                "breaks": [{
+                    "start": format_timestamp(break_start.timestamp()),
+                    "end": format_timestamp((break_start + timedelta(minutes=30)).timestamp()),
+                }],
+                "created_at": created_at,
+                "updated_at": created_at,
+            })
+    return shifts
+
+
+MOCK_ROSTER = demo_roster(datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0))
+
+
+def shift_record(shift: ShiftCreate, shift_id: str, site: str, at: str) -> dict:
+    """A shift as stored; zone and role default to the worker's, when the worker is known"""
+    worker = workers_shards.get(site).store.get(shift.worker_id) or {}
+    return {
+        "id": shift_id,
+        "site": site,
+        "worker_id": shift.worker_id,
+        "shift": shift.shift,
+        "zone": shift.zone or worker.get("zone") or "unassigned",
+        "role": shift.role or worker.get("role") or "unassigned",
+        "start": format_timestamp(_utc(shift.start).timestamp()),
+        "end": format_timestamp(_utc(shift.end).timestamp()),
+        "breaks": [
+            {"start": format_timestamp(_utc(b.start).timestamp()), "end": format_timestamp(_utc(b.end).timestamp())}
+            for b in sorted(shift.breaks, key=lambda b: _utc(b.start))
+        ],
+        "created_at": at,
+        "updated_at": at,
+    }
+
+
+class RosterShard(NamedTuple):
+    store: EntityStore
+    rollups: RosterRollups
+
+
+def build_roster_shard(site: str) -> RosterShard:
+    store = EntityStore(store_name(site, "shifts"), fallback_seed(site, "shifts", MOCK_ROSTER))
+    register_seed(site, "shifts", store, ShiftCreate, lambda shift, shift_id, at: shift_record(shift, shift_id, site, at))
+    return RosterShard(store, RosterRollups(store))
+
+
+roster_shards = SiteShards(build_roster_shard)
+
+
+def _period(since: Optional[datetime], until: Optional[datetime], default_days: int):
+    """Epoch bounds for a [since, until) query, defaulting to the last ``default_days`` days"""
+    end = _utc(until or datetime.now(timezone.utc))
+    start = _utc(since) if since else end - timedelta(days=default_days)
+    if end <= start:
+        raise HTTPException(status_code=422, detail="until must be after since")
+    return start.timestamp(), end.timestamp()
+
+
+def _require_worker(worker_id: str) -> None:
+    if workers_shards.current().store.get(worker_id) is None:
+        raise HTTPException(status_code=422, detail=f"Unknown worker {worker_id}")
+
+
+def on_shift_summary(site: str, moment: float) -> dict:
+    """Who is rostered on at ``moment``: on duty and on break, overall and per zone"""
+    shifts = roster_shards.get(site).rollups.on_shift_at(moment)
+    by_zone: Dict[str, Dict[str, int]] = {}
+    for shift in shifts:
+        counts = by_zone.setdefault(shift["zone"], {"on_duty": 0, "on_break": 0})
+        counts["on_break" if shift["on_break"] else "on_duty"] += 1
+    on_break = sum(1 for shift in shifts if shift["on_break"])
+    return {
+        "at": format_timestamp(moment),
+        "on_duty": len(shifts) - on_break,
+        "on_break": on_break,
+        "by_zone": by_zone,
+        "shifts": shifts,
+    }
+
+
+@router.get("/", response_model=List[Shift])
+def get_roster(worker_id: Optional[str] = Query(None, description="Only this worker's shifts")):
+    """Get all rostered shifts"""
+    shifts = roster_shards.current().store.all()
+    if worker_id is not None:
+        shifts = [shift for shift in shifts if shift["worker_id"] == worker_id]
+    return shifts
+
+
+@router.get("/now")
+def get_on_shift(at: Optional[datetime] = Query(None, description="Point in time (default: now)")):
+    """Get the workers on duty and on break at a point in time, overall and per zone"""
+    moment = _utc(at or datetime.now(timezone.utc)).timestamp()
+    return on_shift_summary(current_site.get(), moment)
+
+
+@router.get("/headcount")
+def get_headcount(
+    by: Literal["zone", "shift", "role", "all"] = Query("zone"),
+    interval: Literal["hour", "day"] = Query("hour"),
+    since: Optional[datetime] = Query(None, description="Start of period (default: 1 day ago for hours, 30 days for days)"),
+    until: Optional[datetime] = Query(None, description="End of period (default: now)"),
+):
+    """Get the average number of workers on duty per hour or day, per zone, shift or role"""
+    start, end = _period(since, until, 1 if interval == "hour" else 30)
+    if end - start > MAX_SERIES_DAYS[interval] * DAY:
+        raise HTTPException(status_code=422, detail=f"{interval} series cover at most {MAX_SERIES_DAYS[interval]} days")
+    return {
+        "by": by,
+        "interval": interval,
+        "since": format_timestamp(start),
+        "until": format_timestamp(end),
+        "series": roster_shards.current().rollups.headcount(by, interval, start, end),
+    }
+
+
+@router.get("/rollups")
+def get_roster_rollups(
+    by: Literal["zone", "shift", "role", "all"] = Query("shift"),
+    since: Optional[datetime] = Query(None, description="Start of period (default: 30 days ago)"),
+    until: Optional[datetime] = Query(None, description="End of period (default: now)"),
+):
+    """Get shifts, person-hours, break hours and average headcount per zone, shift or role over whole UTC days"""
+    start, end = _period(since, until, 30)
+    first, last = start // DAY * DAY, -(-end // DAY) * DAY
+    return {
+        "by": by,
+        "since": format_timestamp(first),
+        "until": format_timestamp(last),
+        "days": round((last - first) / DAY),
+        "groups": roster_shards.current().rollups.totals(by, start, end),
+    }
+
+
+@router.get("/{shift_id}", response_model=Shift)
+def get_shift(shift_id: str, response: Response):
+    """Get a specific shift by ID"""
+    shift = roster_shards.current().store.get(shift_id)
+    if not shift:
+        raise HTTPException(status_code=404, detail="Shift not found")
+    response.headers["ETag"] = etag(shift)
+    return shift
+
+
+@router.post("/", response_model=Shift, status_code=201)
+def create_shift(shift: ShiftCreate):
+    """Roster a worker for a shift"""
+    _require_worker(shift.worker_id)
+    roster_store = roster_shards.current().store
+    new_shift = shift_record(shift, roster_store.new_id(), current_site.get(), datetime.utcnow().isoformat() + "Z")
+    return roster_store.insert(new_shift)
+
+
+@router.put("/{shift_id}", response_model=Shift)
+def update_shift(
+    shift_id: str,
+    shift: ShiftCreate,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
+):
+    """Update a rostered shift"""
+    _require_worker(shift.worker_id)
+
+    def apply_update(existing: dict) -> dict:
+        return {
+            **shift_record(shift, shift_id, existing.get("site", current_site.get()), existing["created_at"]),
+            "updated_at": datetime.utcnow().isoformat() + "Z",
+        }
+
+    try:
+        updated_shift = roster_shards.current().store.update(shift_id, apply_update, expected_version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Shift not found")
+    except VersionConflict as conflict:
+        raise precondition_failed(conflict)
+    response.headers["ETag"] = etag(updated_shift)
+    return updated_shift
+
+
+@router.delete("/{shift_id}")
+def delete_shift(shift_id: str, expected_version: Optional[int] = Depends(if_match_version)):
+    """Remove a shift from the roster"""
+    try:
+        roster_shards.current().store.delete(shift_id, expected_version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Shift not found")
+    except VersionConflict as conflict:
+        raise precondition_failed(conflict)
+    return {"message": "Shift deleted", "id": shift_id}
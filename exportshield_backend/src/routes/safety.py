@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Query
 
+from src.middleware.profiling import ProfiledRoute
 from src.services.safety_service import calculate_safety_score
 
 
-router = APIRouter(prefix="/api", tags=["Safety"])
+router = APIRouter(prefix="/api", tags=["Safety"], route_class=ProfiledRoute)
 
 
 @router.get("/safety")
@@ -0,0 +1,45 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from src.middleware.profiling import ProfiledRoute
+from src.routes.incidents import incidents_shards
+from src.routes.machinery import machinery_shards
+from src.routes.workers import workers_shards
+from src.services.search_service import SearchIndex
+from src.services.sites import SiteShards
+
+router = APIRouter(prefix="/api/search", tags=["Search"], route_class=ProfiledRoute)
+
+# Searchable fields per kind of store, with the weight a match in each field adds
+SEARCH_FIELDS = {
+    "incidents": (incidents_shards, {"title": 3.0, "type": 2.0, "description": 1.0}),
+    "workers": (workers_shards, {"name": 3.0, "role": 2.0, "zone": 1.0}),
+    "machinery": (machinery_shards, {"name": 3.0, "type": 2.0, "location": 1.0}),
+}
+
+
+def build_search_index(site: str) -> SearchIndex:
+    index = SearchIndex()
+    for kind, (shards, fields) in SEARCH_FIELDS.items():
+        index.track(shards.get(site).store, fields, kind)
+    return index
+
+
+search_indexes = SiteShards(build_search_index)
+
+
+@router.get("/")
+def search(
+    q: str = Query(..., min_length=1, description="Words to match; end a word with * for a prefix match, e.g. RD-*"),
+    types: Optional[str] = Query(None, description="Comma-separated stores to search: incidents, workers, machinery"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """Search incidents, workers and machinery by text, best matches first"""
+    stores = None
+    if types:
+        stores = {name.strip() for name in types.split(",") if name.strip()}
+        unknown = stores - SEARCH_FIELDS.keys()
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown search types: {', '.join(sorted(unknown))}")
+    return {"query": q, **search_indexes.current().search(q, stores, limit)}
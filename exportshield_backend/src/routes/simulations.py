@@ -0,0 +1,126 @@
+import math
+from typing import Dict, List, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Response
+from pydantic import BaseModel, Field
+
+from src.middleware.profiling import ProfiledRoute
+from src.routes.geofences import geofences_shards
+from src.routes.machinery import machinery_shards
+from src.services.route_service import zone_key
+from src.services.simulation_service import (
+    INPUTS,
+    MAX_INPUT_VALUES,
+    MAX_SCENARIOS,
+    SimulationCache,
+    grid_points,
+    observed_input,
+    resolve_input,
+    simulate,
+)
+
+router = APIRouter(prefix="/api/simulations", tags=["Simulation"], route_class=ProfiledRoute)
+
+simulation_cache = SimulationCache()
+
+
+# One input: a fixed value, grid values or a start/stop/steps axis, or a
+# distribution (uniform low/high, normal mean/std, triangular low/mode/high)
+class InputSpec(BaseModel):
+    value: Optional[float] = None
+    values: Optional[List[float]] = Field(None, min_length=1, max_length=MAX_INPUT_VALUES)
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    steps: Optional[int] = Field(None, ge=1, le=MAX_SCENARIOS)
+    distribution: Optional[Literal["uniform", "normal", "triangular"]] = None
+    low: Optional[float] = None
+    high: Optional[float] = None
+    mode: Optional[float] = None
+    mean: Optional[float] = None
+    std: Optional[float] = None
+
+
+class SimulationRequest(BaseModel):
+    mode: Literal["grid", "monte_carlo"] = "monte_carlo"
+    samples: int = Field(10000, ge=1, description="Monte Carlo draws per zone")
+    seed: int = 0
+    zones: Optional[List[str]] = Field(None, description="Zones to simulate (default every zone of the site)")
+    depth: InputSpec
+    explosives: InputSpec
+    # Default to the zone's live machinery readings
+    temperature: Optional[InputSpec] = None
+    vibration: Optional[InputSpec] = None
+    percentiles: List[float] = Field([5, 25, 50, 75, 95], min_length=1, max_length=20)
+
+
+def _site_zones() -> Dict[str, Dict[str, List[float]]]:
+    """Zone name -> live machinery readings per signal, for every zone geofence of the site."""
+    zones = {
+        fence["zone"]: {"temperature": [], "vibration": []}
+        for fence in geofences_shards.current().store.all()
+        if fence["kind"] == "zone" and fence.get("zone")
+    }
+    by_key = {zone_key(zone): readings for zone, readings in zones.items()}
+    for machine in machinery_shards.current().store.all():
+        readings = by_key.get(zone_key(machine["location"]))
+        if readings is not None:
+            readings["temperature"].append(machine["temperature"])
+            readings["vibration"].append(machine["vibration"])
+    return zones
+
+
+def _scenario_total(request: SimulationRequest, zones: List[str], site_zones: Dict[str, Dict[str, List[float]]]) -> int:
+    """Scenarios a request asks for over ``zones``, counted before any grid axis is built."""
+    if request.mode == "monte_carlo":
+        return request.samples * len(zones)
+    total = 0
+    for zone in zones:
+        points = []
+        for name in INPUTS:
+            spec = getattr(request, name)
+            # A grid over live readings takes each distinct reading once
+            points.append(grid_points(spec.dict()) if spec is not None else max(len(set(site_zones[zone][name])), 1))
+        total += math.prod(points)
+    return total
+
+
+@router.post("/")
+def run_simulation(request: SimulationRequest, response: Response):
+    """Sweep a grid or Monte Carlo draws of the pollution and safety inputs for every zone"""
+    if any(not 0 <= percentile <= 100 for percentile in request.percentiles):
+        raise HTTPException(status_code=400, detail="Percentiles must lie between 0 and 100")
+    site_zones = _site_zones()
+    names = request.zones or list(site_zones)
+    unknown = [zone for zone in names if zone not in site_zones]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown zones: {', '.join(unknown)}")
+    if not names:
+        raise HTTPException(status_code=400, detail="The site has no zones to simulate")
+
+    total = _scenario_total(request, names, site_zones)
+    if total > MAX_SCENARIOS:
+        raise HTTPException(status_code=413, detail=f"{total} scenarios requested, at most {MAX_SCENARIOS} allowed")
+
+    zones = {}
+    try:
+        for zone in names:
+            specs = {}
+            for name in INPUTS:
+                spec = getattr(request, name)
+                if spec is not None:
+                    specs[name] = resolve_input(name, spec.dict(), request.mode)
+                    continue
+                specs[name] = observed_input(site_zones[zone][name], request.mode)
+                if specs[name] is None:
+                    raise ValueError(f"{zone} has no machinery readings; give {name} explicitly")
+            zones[zone] = specs
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    key = simulation_cache.key(request.mode, request.samples, request.seed, request.percentiles, zones)
+    result = simulation_cache.get(key)
+    response.headers["X-Cache"] = "hit" if result is not None else "miss"
+    if result is None:
+        result = simulate(request.mode, zones, request.samples, request.seed, request.percentiles)
+        simulation_cache.put(key, result)
+    return result
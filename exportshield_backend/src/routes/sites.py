@@ -0,0 +1,47 @@
+from collections import Counter
+
+from fastapi import APIRouter
+
+from src.middleware.profiling import ProfiledRoute
+from src.routes.corridors import corridors_shards
+from src.routes.dashboard import site_overview
+from src.routes.incidents import incidents_shards
+from src.routes.workers import workers_shards
+from src.services.metrics_service import RunningMeans
+from src.services.sites import DEFAULT_SITE, SITES
+
+router = APIRouter(prefix="/api/sites", tags=["Sites"], route_class=ProfiledRoute)
+
+
+@router.get("/")
+def get_sites():
+    """List the mines served, with each site's headline counts"""
+    return [
+        {"id": site, "name": name, "default": site == DEFAULT_SITE, "overview": site_overview(site)}
+        for site, name in SITES.items()
+    ]
+
+
+@router.get("/rollup")
+def get_sites_rollup():
+    """Get totals across all sites, merged from each site's aggregates"""
+    overview = Counter()
+    fatigue = Counter()
+    severity = Counter()
+    corridor_totals = RunningMeans()
+    per_site = {}
+    for site in SITES:
+        counts = site_overview(site)
+        per_site[site] = counts
+        overview.update(counts)
+        fatigue.update(workers_shards.get(site).by_fatigue.counts())
+        severity.update(incidents_shards.get(site).by_severity.counts())
+        corridor_totals.merge(corridors_shards.get(site).metrics.totals())
+    return {
+        "sites": len(SITES),
+        "overview": {key: overview[key] for key in per_site[DEFAULT_SITE]},
+        "workers_by_fatigue": dict(fatigue),
+        "incidents_by_severity": dict(severity),
+        "corridor_averages": corridor_totals.means(),
+        "per_site": per_site,
+    }
@@ -1,9 +1,18 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response
+from typing import List, NamedTuple, Optional
 from datetime import datetime
 from pydantic import BaseModel
 
-router = APIRouter(prefix="/api/workers", tags=["Workers"])
+from src.middleware.profiling import ProfiledRoute
+from src.routes.dependencies import etag, if_match_version, merge_patch_changes, precondition_failed
+from src.services.audit_log import audit_trail
+from src.services.fatigue_service import FatigueEstimator
+from src.services.indexes import CountIndex, FilteredIndex
+from src.services.seed_loader import fallback_seed, register_seed
+from src.services.sites import DEFAULT_SITE, SiteShards, current_site, store_name
+from src.services.store import EntityStore, VersionConflict
+
+router = APIRouter(prefix="/api/workers", tags=["Workers"], route_class=ProfiledRoute)
 
 
 # Pydantic models for request/response
@@ -16,12 +25,25 @@ class WorkerCreate(BaseModel):
     heart_rate: Optional[int] = None
     temperature: Optional[float] = None
     oxygen_level: Optional[int] = None
-    fatigue_level: Optional[str] = "low"
     status: Optional[str] = "active"
 
 
+# Partial update body: only the fields present are validated and applied
+class WorkerPatch(BaseModel):
+    name: Optional[str] = None
+    role: Optional[str] = None
+    zone: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    heart_rate: Optional[int] = None
+    temperature: Optional[float] = None
+    oxygen_level: Optional[int] = None
+    status: Optional[str] = None
+
+
 class Worker(BaseModel):
     id: str
+    site: str = DEFAULT_SITE
     name: str
     role: str
     zone: str
@@ -34,8 +56,12 @@ class Worker(BaseModel):
     status: str
     created_at: str
     updated_at: str
+    version: int
 
 
+# Seed records share one timestamp instead of formatting two per record at import
+SEEDED_AT = datetime.utcnow().isoformat() + "Z"
+
 # Mock data - Replace with database queries
 MOCK_WORKERS = [
     {
@@ -50,8 +76,8 @@ MOCK_WORKERS = [
         "oxygen_level": 98,
         "fatigue_level": "low",
         "status": "active",
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "2",
@@ -65,8 +91,8 @@ MOCK_WORKERS = [
         "oxygen_level": 95,
         "fatigue_level": "medium",
         "status": "active",
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "3",
@@ -80,8 +106,8 @@ MOCK_WORKERS = [
         "oxygen_level": 88,
         "fatigue_level": "high",
         "status": "critical",
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "4",
@@ -95,8 +121,8 @@ MOCK_WORKERS = [
         "oxygen_level": 97,
         "fatigue_level": "low",
         "status": "active",
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "5",
@@ -110,8 +136,8 @@ MOCK_WORKERS = [
         "oxygen_level": 94,
         "fatigue_level": "medium",
         "status": "active",
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "6",
@@ -125,8 +151,8 @@ MOCK_WORKERS = [
         "oxygen_level": 90,
         "fatigue_level": "high",
         "status": "warning",
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "7",
@@ -140,8 +166,8 @@ MOCK_WORKERS = [
         "oxygen_level": 99,
         "fatigue_level": "low",
         "status": "active",
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
     {
         "id": "8",
@@ -155,75 +181,165 @@ MOCK_WORKERS = [
         "oxygen_level": 96,
         "fatigue_level": "medium",
         "status": "active",
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": SEEDED_AT,
+        "updated_at": SEEDED_AT,
     },
 ]
 
 
+class WorkersShard(NamedTuple):
+    store: EntityStore
+    critical: FilteredIndex
+    fatigue: FatigueEstimator
+    by_fatigue: CountIndex
+    by_status: CountIndex
+
+
+def worker_record(worker: WorkerCreate, worker_id: str, site: str, at: str) -> dict:
+    """A new worker as stored, with default vitals for any not reported yet"""
+    return {
+        "id": worker_id,
+        "site": site,
+        **worker.dict(),
+        "heart_rate": worker.heart_rate or 75,
+        "temperature": worker.temperature or 37.0,
+        "oxygen_level": worker.oxygen_level or 98,
+        "fatigue_level": "low",
+        "created_at": at,
+        "updated_at": at,
+    }
+
+
+def build_workers_shard(site: str) -> WorkersShard:
+    store = EntityStore(store_name(site, "workers"), fallback_seed(site, "workers", MOCK_WORKERS))
+    register_seed(site, "workers", store, WorkerCreate, lambda worker, worker_id, at: worker_record(worker, worker_id, site, at))
+    audit_trail.watch(store)
+    critical = FilteredIndex(
+        store,
+        lambda w: w["status"] == "critical" or w["fatigue_level"] == "high",
+        fields=("status", "fatigue_level"),
+    )
+    # fatigue_level is derived from streaming vitals, never taken from clients
+    fatigue = FatigueEstimator(store)
+    return WorkersShard(store, critical, fatigue, CountIndex(store, "fatigue_level"), CountIndex(store, "status"))
+
+
+workers_shards = SiteShards(build_workers_shard)
+
+
+def latest(worker: dict) -> dict:
+    """
+    The stored version of a just-written worker.
+
+    Geofences follow a position change with their own write to ``zone``,
+    so the version the write returned may already be superseded.
+    """
+    return workers_shards.current().store.get(worker["id"]) or worker
+
+
 @router.get("/", response_model=List[Worker])
 def get_all_workers():
     """Get all workers"""
-    return MOCK_WORKERS
+    return workers_shards.current().store.all()
 
 
 @router.get("/critical", response_model=List[Worker])
 def get_critical_workers():
-    """Get workers with critical health status"""
-    return [w for w in MOCK_WORKERS if w["status"] == "critical" or w["fatigue_level"] == "high"]
+    """Get workers with critical health status or high estimated fatigue"""
+    return workers_shards.current().critical.records()
 
 
 @router.get("/{worker_id}", response_model=Worker)
-def get_worker(worker_id: str):
+def get_worker(worker_id: str, response: Response):
     """Get a specific worker by ID"""
-    worker = next((w for w in MOCK_WORKERS if w["id"] == worker_id), None)
+    worker = workers_shards.current().store.get(worker_id)
     if not worker:
         raise HTTPException(status_code=404, detail="Worker not found")
+    response.headers["ETag"] = etag(worker)
     return worker
 
 
+@router.get("/{worker_id}/fatigue")
+def get_worker_fatigue(worker_id: str):
+    """Get how a worker's fatigue level was estimated from their recent vitals"""
+    estimate = workers_shards.current().fatigue.estimate(worker_id)
+    if estimate is None:
+        raise HTTPException(status_code=404, detail="Worker not found")
+    return estimate
+
+
 @router.post("/", response_model=Worker, status_code=201)
 def create_worker(worker: WorkerCreate):
     """Create a new worker"""
-    new_worker = {
-        "id": str(len(MOCK_WORKERS) + 1),
-        **worker.dict(),
-        "heart_rate": worker.heart_rate or 75,
-        "temperature": worker.temperature or 37.0,
-        "oxygen_level": worker.oxygen_level or 98,
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
-    }
-    MOCK_WORKERS.append(new_worker)
-    return new_worker
+    workers_store = workers_shards.current().store
+    new_worker = worker_record(worker, workers_store.new_id(), current_site.get(), datetime.utcnow().isoformat() + "Z")
+    return latest(workers_store.insert(new_worker))
 
 
 @router.put("/{worker_id}", response_model=Worker)
-def update_worker(worker_id: str, worker: WorkerCreate):
+def update_worker(
+    worker_id: str,
+    worker: WorkerCreate,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
+):
     """Update an existing worker"""
-    worker_index = next((i for i, w in enumerate(MOCK_WORKERS) if w["id"] == worker_id), None)
-    if worker_index is None:
+    def apply_update(existing: dict) -> dict:
+        return {
+            "id": worker_id,
+            "site": existing.get("site", current_site.get()),
+            **worker.dict(),
+            "heart_rate": worker.heart_rate or existing["heart_rate"],
+            "temperature": worker.temperature or existing["temperature"],
+            "oxygen_level": worker.oxygen_level or existing["oxygen_level"],
+            "fatigue_level": existing["fatigue_level"],
+            "created_at": existing["created_at"],
+            "updated_at": datetime.utcnow().isoformat() + "Z",
+        }
+
+    shard = workers_shards.current()
+    try:
+        updated_worker = shard.store.update(worker_id, apply_update, expected_version)
+    except KeyError:
         raise HTTPException(status_code=404, detail="Worker not found")
-    
-    updated_worker = {
-        "id": worker_id,
-        **worker.dict(),
-        "heart_rate": worker.heart_rate or MOCK_WORKERS[worker_index]["heart_rate"],
-        "temperature": worker.temperature or MOCK_WORKERS[worker_index]["temperature"],
-        "oxygen_level": worker.oxygen_level or MOCK_WORKERS[worker_index]["oxygen_level"],
-        "created_at": MOCK_WORKERS[worker_index]["created_at"],
-        "updated_at": datetime.utcnow().isoformat() + "Z",
-    }
-    MOCK_WORKERS[worker_index] = updated_worker
+    except VersionConflict as conflict:
+        raise precondition_failed(conflict)
+    shard.fatigue.observe(updated_worker, updated_worker, updated_worker["updated_at"])
+    updated_worker = latest(updated_worker)
+    response.headers["ETag"] = etag(updated_worker)
+    return updated_worker
+
+
+@router.patch("/{worker_id}", response_model=Worker)
+def patch_worker(
+    worker_id: str,
+    worker: WorkerPatch,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
+):
+    """Partially update a worker (JSON Merge Patch)"""
+    changes = merge_patch_changes(worker)
+    changes["updated_at"] = datetime.utcnow().isoformat() + "Z"
+    shard = workers_shards.current()
+    try:
+        updated_worker = shard.store.patch(worker_id, changes, expected_version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Worker not found")
+    except VersionConflict as conflict:
+        raise precondition_failed(conflict)
+    shard.fatigue.observe(updated_worker, changes, changes["updated_at"])
+    updated_worker = latest(updated_worker)
+    response.headers["ETag"] = etag(updated_worker)
     return updated_worker
 
 
 @router.delete("/{worker_id}")
-def delete_worker(worker_id: str):
+def delete_worker(worker_id: str, expected_version: Optional[int] = Depends(if_match_version)):
     """Delete a worker"""
-    worker_index = next((i for i, w in enumerate(MOCK_WORKERS) if w["id"] == worker_id), None)
-    if worker_index is None:
+    try:
+        workers_shards.current().store.delete(worker_id, expected_version)
+    except KeyError:
         raise HTTPException(status_code=404, detail="Worker not found")
-    
-    MOCK_WORKERS.pop(worker_index)
+    except VersionConflict as conflict:
+        raise precondition_failed(conflict)
     return {"message": "Worker deleted", "id": worker_id}
@@ -0,0 +1,234 @@
+import itertools
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Collection, Deque, Dict, List, Mapping, Optional
+
+from src.services.incident_timeline import format_timestamp, parse_timestamp
+from src.services.store import EntityStore
+
+
+# Time constant of each machine's baseline in seconds: a reading this old
+# carries 1/e of the weight of one taken now.
+ANOMALY_WINDOW = float(os.getenv("MININGMITRA_ANOMALY_WINDOW", "300"))
+# Readings further than this many standard deviations from the baseline are spikes
+ANOMALY_Z = float(os.getenv("MININGMITRA_ANOMALY_Z", "4"))
+# Seconds a machine's latest anomaly stays among the live alerts
+ANOMALY_HOLD = float(os.getenv("MININGMITRA_ANOMALY_HOLD", "900"))
+
+SIGNALS = ("vibration", "temperature")
+UNITS = {"vibration": "mm/s", "temperature": "°C"}
+# Smallest standard deviation assumed per signal, so a machine that has
+# reported flat readings does not flag sensor rounding as an anomaly.
+DEVIATION_FLOORS = {"vibration": 0.1, "temperature": 0.5}
+# Readings a machine's baseline needs before anything is flagged
+WARMUP_SAMPLES = 30
+# CUSUM slack and decision threshold, in standard deviations. A sustained
+# shift of k + h/n sigma is flagged after about n readings.
+CUSUM_SLACK = 0.5
+CUSUM_THRESHOLD = 10.0
+MAX_EVENTS = 10_000
+
+
+def _weight(elapsed: float, samples: int) -> float:
+    """
+    Weight of a new reading arriving ``elapsed`` seconds after the last one.
+
+    Until a window's worth of readings has arrived this is at least
+    1/samples, so a young baseline is the plain mean and variance of every
+    reading so far rather than one dominated by its first value.
+    """
+    return max(1.0 - math.exp(-max(elapsed, 0.0) / ANOMALY_WINDOW), 1.0 / samples)
+
+
+class _Baseline:
+    """Time-decayed mean and variance of one signal, plus two-sided CUSUM sums."""
+
+    __slots__ = ("mean", "var", "high", "low", "samples", "value")
+
+    def __init__(self, value: float):
+        self.mean = value
+        self.var = 0.0
+        self.high = 0.0
+        self.low = 0.0
+        self.samples = 1
+        self.value = value
+
+    def deviation(self, signal: str) -> float:
+        return max(math.sqrt(self.var), DEVIATION_FLOORS[signal])
+
+    def observe(self, signal: str, value: float, elapsed: float) -> Optional[dict]:
+        """Score ``value`` against the baseline, then fold it in; the anomaly found, if any."""
+        deviation = self.deviation(signal)
+        z = (value - self.mean) / deviation
+        self.samples += 1
+        self.value = value
+        if self.samples <= WARMUP_SAMPLES:
+            self._fold(value - self.mean, _weight(elapsed, self.samples))
+            return None
+        # A spike moves the CUSUM sums and the baseline no further than a
+        # reading right at the spike threshold would.
+        clipped = max(-ANOMALY_Z, min(z, ANOMALY_Z))
+        self.high = max(0.0, self.high + clipped - CUSUM_SLACK)
+        self.low = max(0.0, self.low - clipped - CUSUM_SLACK)
+        baseline = self.mean
+        if abs(z) < ANOMALY_Z and max(self.high, self.low) >= CUSUM_THRESHOLD:
+            # Re-learn the mean from the new level, keeping the variance, so
+            # a shift is reported once
+            self.mean = value
+            self.high = self.low = 0.0
+            self.samples = 1
+            return {"kind": "shift", "z": z, "baseline": baseline}
+        self._fold(clipped * deviation, _weight(elapsed, self.samples))
+        return {"kind": "spike", "z": z, "baseline": baseline} if abs(z) >= ANOMALY_Z else None
+
+    def _fold(self, diff: float, alpha: float) -> None:
+        increment = alpha * diff
+        self.mean += increment
+        self.var = (1.0 - alpha) * (self.var + diff * increment)
+
+    def describe(self, signal: str) -> dict:
+        return {
+            "value": self.value,
+            "mean": round(self.mean, 3),
+            "deviation": round(self.deviation(signal), 3),
+            "cusum_high": round(self.high, 3),
+            "cusum_low": round(self.low, 3),
+            "samples": self.samples,
+        }
+
+
+class _Machine:
+    __slots__ = ("baselines", "at", "latest", "latest_at")
+
+    def __init__(self, record: dict, at: float):
+        self.baselines = {signal: _Baseline(float(record[signal])) for signal in SIGNALS}
+        self.at = at
+        self.latest: Optional[dict] = None
+        self.latest_at = 0.0
+
+
+class AnomalyDetector:
+    """
+    Streaming anomaly detection on machinery vibration and temperature.
+
+    Every reading is scored in O(1) against the machine's own baseline, a
+    time-decayed mean and variance kept without history. A reading more
+    than ANOMALY_Z deviations out is a ``spike``; a sustained drift that
+    no single reading gives away is caught by two-sided CUSUM sums as a
+    ``shift``, after which the new level becomes the baseline. Anomalies
+    are numbered events, and each machine's latest one is reported as a
+    live alert for ANOMALY_HOLD seconds.
+
+    Readings come in through ``observe`` from the telemetry paths, not from
+    store changes: the store drops a patch that repeats the current value,
+    but a repeated reading is evidence CUSUM needs to confirm a sustained
+    shift. The store listener only tracks machines being added and removed.
+    """
+
+    def __init__(self, machinery: EntityStore):
+        self._lock = threading.Lock()
+        self._machines: Dict[str, _Machine] = {}
+        self._events: Deque[dict] = deque(maxlen=MAX_EVENTS)
+        self._sequence = itertools.count(1)
+        self._listeners: List[Callable[[dict], None]] = []
+        machinery.subscribe(self._on_machine_change, fields=SIGNALS)
+
+    def subscribe(self, listener: Callable[[dict], None]) -> None:
+        """Call ``listener(event)`` for every anomaly found from now on."""
+        self._listeners.append(listener)
+
+    def events(self, after: int = 0, limit: int = 100, machine_ids: Optional[Collection[str]] = None) -> List[dict]:
+        """Anomalies with a sequence number above ``after``, oldest first, optionally of some machines only."""
+        with self._lock:
+            found = [
+                event for event in self._events
+                if event["seq"] > after and (machine_ids is None or event["machinery_id"] in machine_ids)
+            ]
+        return found[:limit]
+
+    def baseline(self, machine_id: str) -> Optional[dict]:
+        with self._lock:
+            machine = self._machines.get(machine_id)
+            if machine is None:
+                return None
+            return {
+                "machinery_id": machine_id,
+                "signals": {signal: baseline.describe(signal) for signal, baseline in machine.baselines.items()},
+                "last_reading_at": format_timestamp(machine.at),
+                "latest_anomaly": machine.latest,
+                "window_seconds": ANOMALY_WINDOW,
+            }
+
+    def active(self, now: Optional[float] = None) -> List[dict]:
+        """Each machine's latest anomaly from the last ANOMALY_HOLD seconds, newest first."""
+        since = (now if now is not None else time.time()) - ANOMALY_HOLD
+        with self._lock:
+            found = [
+                machine.latest for machine in self._machines.values()
+                if machine.latest is not None and machine.latest_at >= since
+            ]
+        return sorted(found, key=lambda event: event["seq"], reverse=True)
+
+    def observe(self, record: dict, readings: Mapping[str, object], at: str) -> List[dict]:
+        """
+        Score one reading of ``record``'s machine, taken at ``at``; the anomalies it raised.
+
+        ``readings`` may hold any fields; only its vibration and temperature
+        count, whether or not they differ from the last reading.
+        """
+        machine_id = record["id"]
+        moment = parse_timestamp(at)
+        found = []
+        with self._lock:
+            machine = self._machines.get(machine_id)
+            if machine is None:
+                return found
+            elapsed = moment - machine.at
+            for signal, baseline in machine.baselines.items():
+                if readings.get(signal) is None:
+                    continue
+                value = float(readings[signal])
+                anomaly = baseline.observe(signal, value, elapsed)
+                if anomaly is not None:
+                    event = {
+                        "seq": next(self._sequence),
+                        "event": anomaly["kind"],
+                        "machinery_id": machine_id,
+                        "machinery": record["name"],
+                        "location": record["location"],
+                        "signal": signal,
+                        "direction": "high" if anomaly["z"] > 0 else "low",
+                        "value": value,
+                        "baseline": round(anomaly["baseline"], 3),
+                        "z": round(anomaly["z"], 2),
+                        "at": at,
+                    }
+                    self._events.append(event)
+                    machine.latest, machine.latest_at = event, moment
+                    found.append(event)
+            machine.at = max(machine.at, moment)
+        for event in found:
+            for listener in self._listeners:
+                listener(event)
+        return found
+
+    def _on_machine_change(self, old: Optional[dict], new: Optional[dict]) -> None:
+        with self._lock:
+            if new is None:
+                self._machines.pop(old["id"], None)
+            elif new["id"] not in self._machines:
+                # The first reading a machine is stored with seeds its baseline
+                self._machines[new["id"]] = _Machine(new, parse_timestamp(new["updated_at"]))
+
+
+def describe_anomaly(event: dict) -> str:
+    """One-line alert text, e.g. ``Rotary Drill RD-2500 vibration spike: 8.5 mm/s, 5.1σ above its baseline of 3.2``."""
+    unit = UNITS[event["signal"]]
+    side = "above" if event["direction"] == "high" else "below"
+    return (
+        f"{event['machinery']} {event['signal']} {event['event']}: {event['value']} {unit}, "
+        f"{abs(event['z']):.1f}σ {side} its baseline of {event['baseline']:.1f}"
+    )
@@ -0,0 +1,212 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler
+from typing import List, Optional
+
+from src.services.incident_timeline import format_timestamp
+from src.services.store import BOOKKEEPING_FIELDS, EntityStore
+
+
+# Auditing is opt-in like durability: without a path nothing is recorded
+# and the CRUD routers pay nothing for it.
+AUDIT_LOG = os.getenv("MININGMITRA_AUDIT_LOG")
+AUDIT_MAX_BYTES = int(os.getenv("MININGMITRA_AUDIT_MAX_BYTES", str(10 * 1024 * 1024)))
+AUDIT_BACKUPS = int(os.getenv("MININGMITRA_AUDIT_BACKUPS", "5"))
+# Entries waiting for the writer; past this, entries are dropped (and the
+# gap recorded) rather than making a request wait on the disk.
+AUDIT_QUEUE_SIZE = int(os.getenv("MININGMITRA_AUDIT_QUEUE_SIZE", "100000"))
+AUDIT_BATCH = 1000
+# Pause between batches, so a busy server hands the writer hundreds of
+# entries per wake-up rather than waking it (and taking the GIL) per entry.
+AUDIT_FLUSH_INTERVAL = 0.05
+
+# Who is behind the request being handled; set by AuditMiddleware and
+# copied into the threadpool that runs sync handlers.
+current_actor: ContextVar[Optional[dict]] = ContextVar("current_actor", default=None)
+SYSTEM_ACTOR = {"actor": "system"}
+
+_STOP = object()
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """
+    A QueueHandler that never blocks and never formats on the caller's thread.
+
+    Entries are dicts passed as the log message; the writer thread encodes
+    them. A full queue drops the entry and counts it.
+    """
+
+    def __init__(self, entries: queue.Queue):
+        super().__init__(entries)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchedRotatingWriter:
+    """
+    Drains the audit queue on one thread and appends JSON lines in batches.
+
+    Each wake-up takes everything queued (up to AUDIT_BATCH entries),
+    encodes it and issues a single write; it then sleeps AUDIT_FLUSH_INTERVAL
+    unless the batch was full, so under load the batches grow instead of
+    the writes and wake-ups multiplying. Once the file would pass
+    ``max_bytes`` it is rotated to ``.1``, ``.2`` ... ``.{backups}``, the
+    oldest being deleted, as logging's RotatingFileHandler does.
+    """
+
+    def __init__(self, path: str, entries: queue.Queue, handler: _DroppingQueueHandler,
+                 max_bytes: int = AUDIT_MAX_BYTES, backups: int = AUDIT_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._entries = entries
+        self._handler = handler
+        self._reported_drops = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "ab")
+        self._size = self._file.tell()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._entries.put(_STOP)
+        self._thread.join()
+        self._file.close()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._entries.get()]
+            while len(batch) < AUDIT_BATCH:
+                try:
+                    batch.append(self._entries.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = any(item is _STOP for item in batch)
+            self._write([item.msg for item in batch if item is not _STOP])
+            if stopping:
+                return
+            if len(batch) < AUDIT_BATCH:
+                time.sleep(AUDIT_FLUSH_INTERVAL)
+
+    def _write(self, entries: List[dict]) -> None:
+        dropped = self._handler.dropped
+        if dropped > self._reported_drops:
+            entries.append({"type": "gap", "ts": time.time(), "dropped": dropped - self._reported_drops})
+            self._reported_drops = dropped
+        if not entries:
+            return
+        for entry in entries:
+            entry["ts"] = format_timestamp(entry["ts"])
+        data = "".join(json.dumps(entry, separators=(",", ":"), default=str) + "\n" for entry in entries).encode()
+        if self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+
+    def _rotate(self) -> None:
+        self._file.close()
+        if self.backups > 0:
+            for number in range(self.backups - 1, 0, -1):
+                source = f"{self.path}.{number}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{number + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "ab")
+        self._size = 0
+
+
+class AuditTrail:
+    """
+    Structured audit entries for every change to the watched stores.
+
+    A store listener records inserts with the new record, deletes with
+    the removed one, and updates with the fields that changed (old and new
+    value). Each entry names the actor, client and request from
+    ``current_actor``; writes made outside a request, such as background
+    jobs, are attributed to ``system``. Entries go to the
+    ``miningmitra.audit`` logger, whose queue handler hands them to the
+    writer thread without blocking. Nothing is recorded until ``start``.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.logger = logging.getLogger("miningmitra.audit")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self._handler: Optional[_DroppingQueueHandler] = None
+        self._writer: Optional[BatchedRotatingWriter] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._writer is not None
+
+    def watch(self, store: EntityStore) -> None:
+        """Audit writes to ``store``; a no-op when no audit log is configured."""
+        if self.path:
+            store.subscribe(lambda old, new: self._on_change(store.name, old, new), replay=False)
+
+    def start(self) -> None:
+        if self.path and self._writer is None:
+            entries: queue.Queue = queue.Queue(AUDIT_QUEUE_SIZE)
+            self._handler = _DroppingQueueHandler(entries)
+            self.logger.addHandler(self._handler)
+            self._writer = BatchedRotatingWriter(self.path, entries, self._handler)
+
+    def stop(self) -> None:
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            self.logger.removeHandler(self._handler)
+            writer.close()
+
+    def record(self, entry: dict) -> None:
+        """Queue one entry; ``ts`` is filled in with the current time if absent."""
+        if self._writer is not None:
+            entry.setdefault("ts", time.time())
+            # makeRecord + handle is logger.info without its caller lookup,
+            # which walks the stack and is most of the cost of a log call
+            self.logger.handle(self.logger.makeRecord(self.logger.name, logging.INFO, "", 0, entry, None, None))
+
+    def _on_change(self, store: str, old: Optional[dict], new: Optional[dict]) -> None:
+        if self._writer is None:
+            return
+        entry = {"type": "audit", **(current_actor.get() or SYSTEM_ACTOR), "store": store}
+        if old is None:
+            entry.update(op="insert", id=new["id"], version=new["version"], record=new)
+        elif new is None:
+            entry.update(op="delete", id=old["id"], version=old["version"], record=old)
+        else:
+            changes = {
+                field: [old.get(field), value]
+                for field, value in new.items()
+                if field not in BOOKKEEPING_FIELDS and old.get(field) != value
+            }
+            entry.update(op="update", id=new["id"], version=new["version"], changes=changes)
+        self.record(entry)
+
+
+audit_trail = AuditTrail(AUDIT_LOG)
+
+
+def start_audit_log() -> None:
+    audit_trail.start()
+
+
+def stop_audit_log() -> None:
+    audit_trail.stop()
@@ -0,0 +1,219 @@
+import math
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.services.store import EntityStore, defer
+
+
+# Exposure radius around an incident, by severity.
+SEVERITY_RADIUS_M = {"low": 25.0, "medium": 50.0, "high": 100.0, "critical": 200.0}
+DEFAULT_RADIUS_M = 50.0
+
+# Incident fields the tracker writes back as workers move.
+EXPOSURE_FIELDS = ("exposed_worker_ids", "affected_workers")
+
+# Grid cell edge in degrees (~110 m of latitude). A radius query only
+# visits the cells its bounding box overlaps.
+CELL_DEGREES = 0.001
+METERS_PER_DEGREE = 111_320.0
+
+
+def exposure_radius(severity: str) -> float:
+    return SEVERITY_RADIUS_M.get(severity, DEFAULT_RADIUS_M)
+
+
+def distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Equirectangular distance, accurate to well under 1% across a mine site."""
+    x = (lng2 - lng1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = lat2 - lat1
+    return math.hypot(x, y) * METERS_PER_DEGREE
+
+
+def _cell(lat: float, lng: float) -> Tuple[int, int]:
+    return int(math.floor(lat / CELL_DEGREES)), int(math.floor(lng / CELL_DEGREES))
+
+
+def _cells_covering(lat: float, lng: float, radius_m: float) -> List[Tuple[int, int]]:
+    """Grid cells overlapped by the bounding box of a circle."""
+    lat_span = radius_m / METERS_PER_DEGREE
+    lng_span = lat_span / max(math.cos(math.radians(lat)), 1e-6)
+    low_row, low_col = _cell(lat - lat_span, lng - lng_span)
+    high_row, high_col = _cell(lat + lat_span, lng + lng_span)
+    return [(row, col) for row in range(low_row, high_row + 1) for col in range(low_col, high_col + 1)]
+
+
+def _id_order(worker_id: str) -> Tuple[int, str]:
+    """Numeric ids in numeric order ("2" before "10")."""
+    return len(worker_id), worker_id
+
+
+class _SortedIds:
+    """Worker ids as a set for membership plus a list in ``_id_order`` for publishing."""
+
+    __slots__ = ("ids", "members")
+
+    def __init__(self, worker_ids):
+        self.ids = sorted(worker_ids, key=_id_order)
+        self.members = set(self.ids)
+
+    def __contains__(self, worker_id: str) -> bool:
+        return worker_id in self.members
+
+    def add(self, worker_id: str) -> None:
+        self.members.add(worker_id)
+        insort(self.ids, worker_id, key=_id_order)
+
+    def discard(self, worker_id: str) -> None:
+        if worker_id in self.members:
+            self.members.discard(worker_id)
+            del self.ids[bisect_left(self.ids, _id_order(worker_id), key=_id_order)]
+
+
+class WorkerGrid:
+    """Uniform grid of worker positions for radius queries."""
+
+    def __init__(self):
+        self.positions: Dict[str, Tuple[float, float]] = {}
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+
+    def move(self, worker_id: str, lat: float, lng: float) -> None:
+        self.remove(worker_id)
+        self.positions[worker_id] = (lat, lng)
+        self._cells.setdefault(_cell(lat, lng), set()).add(worker_id)
+
+    def remove(self, worker_id: str) -> None:
+        position = self.positions.pop(worker_id, None)
+        if position is None:
+            return
+        cell = _cell(*position)
+        members = self._cells[cell]
+        members.discard(worker_id)
+        if not members:
+            del self._cells[cell]
+
+    def within(self, lat: float, lng: float, radius_m: float) -> List[str]:
+        found = []
+        for cell in _cells_covering(lat, lng, radius_m):
+            for worker_id in self._cells.get(cell, ()):
+                if distance_m(lat, lng, *self.positions[worker_id]) <= radius_m:
+                    found.append(worker_id)
+        return found
+
+
+class ExposureTracker:
+    """
+    Which workers are within the hazard radius of each open incident.
+
+    Worker positions live in a grid, so computing an incident's exposure
+    only measures distances to workers in nearby cells. Each open
+    incident is also registered in the cells its radius overlaps, and its
+    exposed workers are kept as a set: a worker move only tests the
+    incidents registered at its old and new cells and adds or removes
+    that one worker. An incident whose set changed is written back once
+    per outer write, deferred until that write has released its lock, so
+    a bulk load touching thousands of workers costs one write per incident.
+    """
+
+    def __init__(self, workers: EntityStore):
+        self._lock = threading.Lock()
+        self._grid = WorkerGrid()
+        self._hazards: Dict[str, Tuple[float, float, float]] = {}
+        self._hazard_cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._exposed: Dict[str, _SortedIds] = {}
+        self._pending: Set[str] = set()
+        self._incidents: Optional[EntityStore] = None
+        workers.subscribe(self._on_worker_change, fields=("latitude", "longitude"))
+
+    def track(self, incidents: EntityStore) -> None:
+        """Start following ``incidents`` so worker moves refresh their exposure."""
+        self._incidents = incidents
+        incidents.subscribe(self._on_incident_change, fields=("latitude", "longitude", "severity", "status"))
+
+    def exposed_workers(self, lat: float, lng: float, severity: str) -> List[str]:
+        with self._lock:
+            found = self._grid.within(lat, lng, exposure_radius(severity))
+        return sorted(found, key=_id_order)
+
+    def with_exposure(self, incident: dict) -> dict:
+        """
+        ``incident`` with ``exposed_worker_ids`` and ``affected_workers`` set.
+
+        Resolved incidents keep whatever exposure they had when resolved.
+        """
+        if incident["status"] == "resolved":
+            return {"exposed_worker_ids": [], **incident}
+        exposed = self.exposed_workers(incident["latitude"], incident["longitude"], incident["severity"])
+        return {**incident, "exposed_worker_ids": exposed, "affected_workers": len(exposed)}
+
+    def _on_incident_change(self, old: Optional[dict], new: Optional[dict]) -> None:
+        with self._lock:
+            incident_id = (old or new)["id"]
+            self._remove_hazard(incident_id)
+            if new is not None and new["status"] != "resolved":
+                lat, lng, radius = new["latitude"], new["longitude"], exposure_radius(new["severity"])
+                self._hazards[incident_id] = (lat, lng, radius)
+                for cell in _cells_covering(lat, lng, radius):
+                    self._hazard_cells.setdefault(cell, set()).add(incident_id)
+                exposed = self._exposed[incident_id] = _SortedIds(self._grid.within(lat, lng, radius))
+                # Records that arrive without current exposure (bulk loads,
+                # restores) get it written back once the insert completes.
+                if exposed.ids != new.get("exposed_worker_ids") and incident_id not in self._pending:
+                    self._pending.add(incident_id)
+                    defer(lambda: self._refresh(incident_id))
+
+    def _on_worker_change(self, old: Optional[dict], new: Optional[dict]) -> None:
+        worker_id = (old or new)["id"]
+        changed = []
+        with self._lock:
+            if new is None:
+                self._grid.remove(worker_id)
+            else:
+                self._grid.move(worker_id, new["latitude"], new["longitude"])
+            candidates = set()
+            for worker in (old, new):
+                if worker is not None:
+                    candidates.update(self._hazard_cells.get(_cell(worker["latitude"], worker["longitude"]), ()))
+            for incident_id in candidates:
+                lat, lng, radius = self._hazards[incident_id]
+                inside = new is not None and distance_m(lat, lng, new["latitude"], new["longitude"]) <= radius
+                exposed = self._exposed[incident_id]
+                if inside == (worker_id in exposed):
+                    continue
+                if inside:
+                    exposed.add(worker_id)
+                else:
+                    exposed.discard(worker_id)
+                if incident_id not in self._pending:
+                    self._pending.add(incident_id)
+                    changed.append(incident_id)
+        for incident_id in changed:
+            defer(lambda incident_id=incident_id: self._refresh(incident_id))
+
+    def _remove_hazard(self, incident_id: str) -> None:
+        hazard = self._hazards.pop(incident_id, None)
+        self._exposed.pop(incident_id, None)
+        if hazard is None:
+            return
+        for cell in _cells_covering(*hazard):
+            members = self._hazard_cells[cell]
+            members.discard(incident_id)
+            if not members:
+                del self._hazard_cells[cell]
+
+    def _refresh(self, incident_id: str) -> None:
+        with self._lock:
+            self._pending.discard(incident_id)
+            exposed = self._exposed.get(incident_id)
+            exposed = list(exposed.ids) if exposed is not None else None
+        if exposed is None or self._incidents is None:
+            return
+        try:
+            self._incidents.patch(incident_id, {
+                "exposed_worker_ids": exposed,
+                "affected_workers": len(exposed),
+                "updated_at": datetime.utcnow().isoformat() + "Z",
+            })
+        except KeyError:
+            pass
@@ -0,0 +1,184 @@
+import math
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Mapping, Optional
+
+from src.services.incident_timeline import format_timestamp, parse_timestamp
+from src.services.store import EntityStore, defer
+
+
+# Time constant of the vital-sign averages in seconds: a reading this old
+# carries 1/e of the weight of one taken now.
+FATIGUE_WINDOW = float(os.getenv("MININGMITRA_FATIGUE_WINDOW", "600"))
+
+VITALS = ("heart_rate", "temperature", "oxygen_level")
+# Value at which each vital starts to count as strain and value at which it
+# saturates; oxygen strains as it falls.
+STRAIN_RANGES = {"heart_rate": (70.0, 120.0), "temperature": (37.0, 38.5), "oxygen_level": (98.0, 88.0)}
+HEART_RATE_SWING = 15.0          # bpm standard deviation at which variability saturates
+SHIFT_HOURS = 12.0               # time on shift at which the shift term saturates
+# Weights of the strain terms in the fatigue score; they sum to 1.
+FATIGUE_WEIGHTS = {"heart_rate": 0.3, "temperature": 0.25, "oxygen_level": 0.2, "variability": 0.1, "shift": 0.15}
+# Lowest score of each fatigue_level, most severe first
+FATIGUE_LEVELS = (("high", 0.55), ("medium", 0.22))
+# A level is only left once the score is this far past its threshold, so a
+# score hovering on a boundary does not flip the label on every reading.
+HYSTERESIS = 0.03
+OFF_SHIFT = frozenset({"off_duty", "offline"})
+
+
+def _strain(value: float, start: float, saturation: float) -> float:
+    return min(max(0.0, (value - start) / (saturation - start)), 1.0)
+
+
+def _level(score: float) -> str:
+    for name, threshold in FATIGUE_LEVELS:
+        if score >= threshold:
+            return name
+    return "low"
+
+
+def fatigue_level(score: float, current: Optional[str] = None) -> str:
+    """The level for ``score``; moving off ``current`` takes a margin of HYSTERESIS."""
+    rank = {name: position for position, name in enumerate(("low", "medium", "high"))}
+    if current not in rank:
+        return _level(score)
+    rising, falling = _level(score - HYSTERESIS), _level(score + HYSTERESIS)
+    if rank[rising] > rank[current]:
+        return rising
+    if rank[falling] < rank[current]:
+        return falling
+    return current
+
+
+class _Vitals:
+    """Exponentially weighted mean and variance of each vital for one worker."""
+
+    __slots__ = ("mean", "var", "seen", "at", "samples", "shift_started")
+
+    def __init__(self, record: dict, at: float):
+        self.mean = {vital: float(record[vital]) for vital in VITALS}
+        self.var = dict.fromkeys(VITALS, 0.0)
+        # When each vital was last reported; a reading may carry only some of them
+        self.seen = dict.fromkeys(VITALS, at)
+        self.at = at
+        self.samples = 1
+        self.shift_started = None if record["status"] in OFF_SHIFT else at
+
+    def add(self, readings: Mapping[str, object], status: str, at: float) -> None:
+        for vital in VITALS:
+            if readings.get(vital) is None:
+                continue
+            # Weight by elapsed time rather than per sample, so irregular
+            # reporting rates age the average the same way.
+            alpha = 1.0 - math.exp(-max(at - self.seen[vital], 0.0) / FATIGUE_WINDOW)
+            diff = float(readings[vital]) - self.mean[vital]
+            increment = alpha * diff
+            self.mean[vital] += increment
+            self.var[vital] = (1.0 - alpha) * (self.var[vital] + diff * increment)
+            self.seen[vital] = max(self.seen[vital], at)
+        self.at = max(self.at, at)
+        self.samples += 1
+        if status in OFF_SHIFT:
+            self.shift_started = None
+        elif self.shift_started is None:
+            self.shift_started = at
+
+    def terms(self) -> Dict[str, float]:
+        terms = {vital: _strain(self.mean[vital], *STRAIN_RANGES[vital]) for vital in VITALS}
+        terms["variability"] = min(math.sqrt(self.var["heart_rate"]) / HEART_RATE_SWING, 1.0)
+        hours = (self.at - self.shift_started) / 3600 if self.shift_started is not None else 0.0
+        terms["shift"] = min(hours / SHIFT_HOURS, 1.0)
+        return terms
+
+
+class FatigueEstimator:
+    """
+    Server-side fatigue for every worker, from streaming vitals.
+
+    Each vitals reading updates a time-weighted moving average and variance
+    per vital in O(1), with no history kept. The fatigue score is a weighted
+    sum of heart-rate, temperature and oxygen strain, heart-rate variability
+    and time on shift. When the score crosses into another level the
+    worker's ``fatigue_level`` is rewritten, so indexes filtering on it
+    follow at telemetry speed.
+
+    Readings come in through ``observe`` from the telemetry paths, not from
+    store changes: the store drops a patch that repeats the current value,
+    but a worker holding a high heart rate is strained by every reading of
+    it, and time on shift advances with each one. The store listener only
+    tracks workers being added and removed.
+    """
+
+    def __init__(self, workers: EntityStore):
+        self._lock = threading.Lock()
+        self._vitals: Dict[str, _Vitals] = {}
+        self._workers = workers
+        workers.subscribe(self._on_worker_change, fields=VITALS + ("status",))
+
+    def estimate(self, worker_id: str) -> Optional[dict]:
+        with self._lock:
+            vitals = self._vitals.get(worker_id)
+            if vitals is None:
+                return None
+            terms = vitals.terms()
+            averages = {vital: round(value, 2) for vital, value in vitals.mean.items()}
+            deviations = {vital: round(math.sqrt(value), 2) for vital, value in vitals.var.items()}
+            samples, at, shift_started = vitals.samples, vitals.at, vitals.shift_started
+        score = self._score(terms)
+        worker = self._workers.get(worker_id)
+        return {
+            "worker_id": worker_id,
+            "fatigue_level": worker["fatigue_level"] if worker else fatigue_level(score),
+            "score": round(score, 4),
+            "terms": {name: round(value, 4) for name, value in terms.items()},
+            "averages": averages,
+            "deviations": deviations,
+            "samples": samples,
+            "window_seconds": FATIGUE_WINDOW,
+            "shift_started_at": format_timestamp(shift_started) if shift_started is not None else None,
+            "last_sample_at": format_timestamp(at),
+        }
+
+    @staticmethod
+    def _score(terms: Dict[str, float]) -> float:
+        return sum(FATIGUE_WEIGHTS[name] * value for name, value in terms.items())
+
+    def observe(self, record: dict, readings: Mapping[str, object], at: str) -> None:
+        """
+        Fold one reading of ``record``'s worker, taken at ``at``, into their vitals.
+
+        ``readings`` may hold any fields; the vitals it carries count whether
+        or not they differ from the last reading, and a reading with neither
+        a vital nor a status is not one.
+        """
+        if not any(readings.get(field) is not None for field in VITALS + ("status",)):
+            return
+        worker_id = record["id"]
+        with self._lock:
+            vitals = self._vitals.get(worker_id)
+            if vitals is None:
+                return
+            vitals.add(readings, record["status"], parse_timestamp(at))
+            score = self._score(vitals.terms())
+        level = fatigue_level(score, record.get("fatigue_level"))
+        if level != record.get("fatigue_level"):
+            defer(lambda: self._assign_level(worker_id, level))
+
+    def _on_worker_change(self, old: Optional[dict], new: Optional[dict]) -> None:
+        with self._lock:
+            if new is None:
+                self._vitals.pop(old["id"], None)
+            elif new["id"] not in self._vitals:
+                # The vitals a worker is stored with seed their averages
+                self._vitals[new["id"]] = _Vitals(new, parse_timestamp(new["updated_at"]))
+
+    def _assign_level(self, worker_id: str, level: str) -> None:
+        worker = self._workers.get(worker_id)
+        if worker is None or worker["fatigue_level"] == level:
+            return
+        try:
+            self._workers.patch(worker_id, {"fatigue_level": level, "updated_at": datetime.utcnow().isoformat() + "Z"})
+        except KeyError:
+            pass
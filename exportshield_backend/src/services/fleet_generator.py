@@ -0,0 +1,296 @@
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from src.services.store import EntityStore
+
+
+class SiteZone(NamedTuple):
+    name: str
+    bounds: Tuple[float, float, float, float]   # min lat, min lng, max lat, max lng
+    weight: float                               # share of workers and machines
+    incident_rate: float                        # relative incident frequency
+
+
+# Zones match the seeded geofences, so generated positions agree with them.
+SITE_ZONES = [
+    SiteZone("Zone A - Deep Excavation", (23.5813, 87.2712, 23.5822, 87.2719), 0.35, 3.0),
+    SiteZone("Zone B - Ventilation Shaft", (23.5822, 87.2719, 23.5829, 87.2724), 0.25, 2.0),
+    SiteZone("Zone C - Mineral Processing", (23.5829, 87.2722, 23.5836, 87.2735), 0.20, 2.0),
+    SiteZone("Zone D - Exploration Tunnel", (23.5805, 87.2704, 23.5813, 87.2712), 0.20, 1.0),
+]
+SITE_ENDPOINTS = ["Entrance A", "Entrance B", "Exit Point"]
+
+FIRST_NAMES = ["Rajesh", "Priya", "Vikram", "Anjali", "Suresh", "Mohammed", "Kavita", "Arjun", "Deepa", "Ravi", "Sunita", "Imran"]
+LAST_NAMES = ["Kumar", "Sharma", "Singh", "Reddy", "Patel", "Ali", "Nair", "Desai", "Iyer", "Das", "Gupta", "Khan"]
+ROLES = [("Miner", 0.45), ("Senior Miner", 0.15), ("Equipment Operator", 0.2), ("Safety Engineer", 0.1), ("Mine Supervisor", 0.1)]
+MACHINE_TYPES = [
+    ("Excavator", "Hydraulic Excavator HE"), ("Drill", "Rotary Drill RD"), ("Loader", "Front-End Loader FL"),
+    ("Haul Truck", "Haul Truck HT"), ("Continuous Miner", "Continuous Miner CM"), ("Ventilation System", "Ventilation Fan VF"),
+]
+INCIDENT_TYPES = [
+    # type, title, description, severity weights (low, medium, high, critical)
+    ("Gas Leak", "Gas Leak Detected", "Elevated methane levels detected", (1, 3, 4, 2)),
+    ("Equipment Failure", "Equipment Malfunction", "Mechanical failure reported by operator", (3, 4, 2, 1)),
+    ("Structural Issue", "Structural Damage", "Cracks detected in support beams", (1, 2, 3, 3)),
+    ("Health Emergency", "Worker Health Emergency", "Worker showing signs of heat stress", (2, 3, 3, 1)),
+    ("Dust Exposure", "High Dust Levels", "Respirable dust above the permitted limit", (4, 4, 1, 0)),
+]
+SEVERITIES = ("low", "medium", "high", "critical")
+STATUSES = ("active", "investigating", "resolved")
+RESOLVE_HOURS = 12.0
+
+
+def _timestamp(moment: datetime) -> str:
+    return moment.isoformat() + "Z"
+
+
+class FleetGenerator:
+    """
+    Deterministic synthetic mine site for scale testing.
+
+    Every record kind draws from its own random stream derived from
+    ``seed``, so the same seed and ``now`` always give the same fleet and
+    changing one count never shifts the others. Positions cluster inside
+    the zones of ``SITE_ZONES``; a worker's vitals follow one latent
+    strain factor and a machine's health, vibration and temperature one
+    latent wear factor, so they correlate the way real readings do.
+    Records come without ids; ``load_fleet`` assigns them from the stores.
+    """
+
+    def __init__(self, seed: int = 0, now: Optional[datetime] = None):
+        self.seed = seed
+        self.now = (now or datetime.utcnow()).replace(second=0, microsecond=0)
+
+    def _rng(self, kind: str) -> random.Random:
+        return random.Random(f"{self.seed}:{kind}")
+
+    def _zone(self, rng: random.Random, weight: str = "weight") -> SiteZone:
+        return rng.choices(SITE_ZONES, weights=[getattr(zone, weight) for zone in SITE_ZONES])[0]
+
+    @staticmethod
+    def _position(rng: random.Random, zone: SiteZone) -> Tuple[float, float]:
+        """A point clustered around the zone centre and clamped to its bounds."""
+        low_lat, low_lng, high_lat, high_lng = zone.bounds
+        lat = min(max(rng.gauss((low_lat + high_lat) / 2, (high_lat - low_lat) / 5), low_lat), high_lat)
+        lng = min(max(rng.gauss((low_lng + high_lng) / 2, (high_lng - low_lng) / 5), low_lng), high_lng)
+        return round(lat, 6), round(lng, 6)
+
+    def workers(self, count: int) -> List[dict]:
+        rng = self._rng("workers")
+        stamp = _timestamp(self.now)
+        records = []
+        for _ in range(count):
+            zone = self._zone(rng)
+            lat, lng = self._position(rng, zone)
+            strain = rng.betavariate(2, 5)
+            fatigue = "high" if strain > 0.6 else "medium" if strain > 0.35 else "low"
+            records.append({
+                "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                "role": rng.choices([role for role, _ in ROLES], weights=[w for _, w in ROLES])[0],
+                "zone": zone.name,
+                "latitude": lat,
+                "longitude": lng,
+                "heart_rate": int(round(68 + 55 * strain + rng.gauss(0, 4))),
+                "temperature": round(36.5 + 2.0 * strain + rng.gauss(0, 0.15), 1),
+                "oxygen_level": int(min(100, round(99 - 12 * strain + rng.gauss(0, 1)))),
+                "fatigue_level": fatigue,
+                "status": "critical" if strain > 0.8 else rng.choices(["active", "break"], weights=[9, 1])[0],
+                "created_at": stamp,
+                "updated_at": stamp,
+            })
+        return records
+
+    def machinery(self, count: int) -> List[dict]:
+        rng = self._rng("machinery")
+        stamp = _timestamp(self.now)
+        serials: Dict[str, int] = {}
+        records = []
+        for _ in range(count):
+            zone = self._zone(rng)
+            machine_type, model = rng.choice(MACHINE_TYPES)
+            serials[model] = serials.get(model, 0) + 1
+            wear = rng.betavariate(2, 3)
+            health = int(min(100, max(20, round(100 - 55 * wear + rng.gauss(0, 4)))))
+            risk = "high" if wear > 0.7 else "medium" if wear > 0.45 else "low"
+            records.append({
+                "name": f"{model}-{serials[model]:04d}",
+                "type": machine_type,
+                "location": zone.name,
+                "health": health,
+                "status": "maintenance_required" if health < 60 else "operational",
+                "operating_hours": int(200 + 4800 * wear + rng.gauss(0, 150)),
+                "efficiency": int(min(100, max(30, round(health + rng.gauss(5, 3))))),
+                "vibration": round(max(0.5, 1.5 + 8 * wear + rng.gauss(0, 0.5)), 1),
+                "temperature": round(45 + 40 * wear + rng.gauss(0, 3), 1),
+                "next_maintenance": (self.now + timedelta(days=int(90 * (1 - wear)) + rng.randint(0, 14))).date().isoformat(),
+                "predicted_failure_risk": risk,
+                "flagged_at": stamp if health < 60 else None,
+                "created_at": stamp,
+                "updated_at": stamp,
+            })
+        return records
+
+    def incidents(self, count: int, days: int = 30) -> List[dict]:
+        """
+        ``count`` incidents over the ``days`` before ``now``, oldest first.
+
+        Arrivals form a Poisson process, zones are weighted by incident
+        rate, and each incident takes an exponentially distributed time
+        to resolve (mean ``RESOLVE_HOURS``), so only recent ones are open.
+        """
+        rng = self._rng("incidents")
+        span = days * 86400.0
+        gaps = [rng.expovariate(1.0) for _ in range(count)]
+        scale = span / (sum(gaps) or 1.0)
+        start = self.now - timedelta(days=days)
+        offset = 0.0
+        records = []
+        for gap in gaps:
+            offset += gap * scale
+            created = start + timedelta(seconds=offset)
+            zone = self._zone(rng, "incident_rate")
+            lat, lng = self._position(rng, zone)
+            incident_type, title, description, severity_weights = rng.choice(INCIDENT_TYPES)
+            resolved = created + timedelta(hours=rng.expovariate(1 / RESOLVE_HOURS))
+            status = "resolved" if resolved <= self.now else rng.choice(STATUSES[:2])
+            updated = resolved if status == "resolved" else created
+            records.append({
+                "type": incident_type,
+                "severity": rng.choices(SEVERITIES, weights=severity_weights)[0],
+                "zone": zone.name.split(" - ", 1)[0],
+                "latitude": lat,
+                "longitude": lng,
+                "title": title,
+                "description": f"{description} in {zone.name}",
+                "status": status,
+                "affected_workers": rng.randint(0, 12),
+                "created_at": _timestamp(created),
+                "updated_at": _timestamp(updated),
+            })
+        return records
+
+    def corridors(self, count: int) -> List[dict]:
+        rng = self._rng("corridors")
+        stamp = _timestamp(self.now)
+        nodes = [zone.name.split(" - ", 1)[0] for zone in SITE_ZONES] + SITE_ENDPOINTS
+        records = []
+        for number in range(1, count + 1):
+            start, end = rng.sample(nodes, 2)
+            start_zone = next((zone for zone in SITE_ZONES if zone.name.startswith(start)), SITE_ZONES[0])
+            end_zone = next((zone for zone in SITE_ZONES if zone.name.startswith(end)), SITE_ZONES[-1])
+            (lat, lng), (end_lat, end_lng) = self._position(rng, start_zone), self._position(rng, end_zone)
+            pollution = int(min(100, max(5, rng.gauss(45, 15))))
+            traffic = int(min(100, max(5, rng.gauss(50, 20))))
+            risk = "high" if pollution + traffic > 130 else "medium" if pollution + traffic > 90 else "low"
+            records.append({
+                "name": f"Corridor {number}",
+                "from_location": start,
+                "to_location": end,
+                "score": int(max(0, 100 - pollution / 2 - traffic / 4)),
+                "risk_level": risk,
+                "pollution": pollution,
+                "green_cover": int(min(60, max(0, rng.gauss(20, 8)))),
+                "temperature": round(rng.gauss(28, 3), 1),
+                "traffic": traffic,
+                "compliance": int(min(100, max(40, rng.gauss(82, 8)))),
+                "latitude": lat,
+                "longitude": lng,
+                "route_end_lat": end_lat,
+                "route_end_lng": end_lng,
+                "created_at": stamp,
+                "updated_at": stamp,
+            })
+        return records
+
+    def telemetry(self, workers: List[dict], machinery: List[dict]) -> Iterator[Tuple[str, str, dict]]:
+        """
+        Endless ``(store name, id, changes)`` readings for existing records.
+
+        Four in five readings move a worker (a small random walk that now
+        and then crosses into another zone) and update their vitals; the
+        rest report machine vibration and temperature, drifting with wear
+        and with occasional spikes.
+        """
+        rng = self._rng("telemetry")
+        positions = {worker["id"]: [worker["latitude"], worker["longitude"], worker["heart_rate"]] for worker in workers}
+        sensors = {machine["id"]: [machine["vibration"], machine["temperature"]] for machine in machinery}
+        worker_ids, machine_ids = list(positions), list(sensors)
+        while True:
+            if worker_ids and (not machine_ids or rng.random() < 0.8):
+                worker_id = rng.choice(worker_ids)
+                state = positions[worker_id]
+                state[0] = round(state[0] + rng.gauss(0, 0.00004), 6)
+                state[1] = round(state[1] + rng.gauss(0, 0.00004), 6)
+                state[2] = int(min(180, max(50, state[2] + rng.gauss(0, 2))))
+                yield "workers", worker_id, {"latitude": state[0], "longitude": state[1], "heart_rate": state[2]}
+            elif machine_ids:
+                machine_id = rng.choice(machine_ids)
+                state = sensors[machine_id]
+                spike = rng.random() < 0.01
+                state[0] = round(max(0.1, state[0] + rng.gauss(0.002, 0.05)), 2)
+                state[1] = round(state[1] + rng.gauss(0.005, 0.2), 1)
+                vibration = round(state[0] * rng.uniform(2.0, 3.0), 2) if spike else state[0]
+                yield "machinery", machine_id, {"vibration": vibration, "temperature": state[1]}
+            else:
+                return
+
+
+def load_fleet(stores: Dict[str, EntityStore], fleet: Dict[str, List[dict]]) -> Dict[str, int]:
+    """Bulk-insert generated records (``{store name: records}``), assigning ids from each store."""
+    loaded = {}
+    for name, records in fleet.items():
+        store = stores[name]
+        loaded[name] = store.insert_many({"id": store.new_id(), **record} for record in records)
+    return loaded
+
+
+def stream_telemetry(
+    stores: Dict[str, EntityStore],
+    readings: Iterator[Tuple[str, str, dict]],
+    rate: float,
+    duration: float,
+    observers: Optional[Dict[str, Callable[[dict, dict, str], object]]] = None,
+) -> dict:
+    """
+    Apply ``readings`` as patches at ``rate`` per second for ``duration`` seconds.
+
+    Paced against the wall clock: whenever it falls behind it catches up
+    without sleeping, so the achieved rate shows whether the stores (and
+    everything subscribed to them) keep up. ``observers`` get every
+    reading of their store after it is applied, as the telemetry
+    endpoints pass readings to the anomaly detector.
+    """
+    observers = observers or {}
+    started = time.perf_counter()
+    sent = 0
+    max_lag = 0.0
+    while True:
+        elapsed = time.perf_counter() - started
+        if elapsed >= duration:
+            break
+        due = min(int(elapsed * rate) + 1, int(duration * rate))
+        if sent >= due:
+            time.sleep(min(0.005, (sent + 1) / rate - elapsed))
+            continue
+        max_lag = max(max_lag, elapsed - sent / rate)
+        stamp = datetime.utcnow().isoformat() + "Z"
+        for _ in range(due - sent):
+            name, record_id, changes = next(readings)
+            try:
+                record = stores[name].patch(record_id, {**changes, "updated_at": stamp})
+            except KeyError:
+                pass
+            else:
+                if name in observers:
+                    observers[name](record, changes, stamp)
+            sent += 1
+    seconds = time.perf_counter() - started
+    return {
+        "sent": sent,
+        "seconds": round(seconds, 3),
+        "target_rate": rate,
+        "achieved_rate": round(sent / seconds, 1) if seconds else 0.0,
+        "max_lag_ms": round(max_lag * 1000, 1),
+    }
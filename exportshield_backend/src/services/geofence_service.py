@@ -0,0 +1,190 @@
+import itertools
+import math
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+
+from src.services.store import EntityStore, defer
+
+
+# Grid cell edge in degrees for the fence prefilter (~55 m of latitude).
+CELL_DEGREES = 0.0005
+# Fences whose bounding box covers more cells than this (~3.5 km square)
+# go on one list tested at every position instead of into each cell.
+MAX_FENCE_CELLS = 4096
+MAX_EVENTS = 10_000
+
+Point = Tuple[float, float]
+
+
+def point_in_polygon(lat: float, lng: float, polygon: Sequence[Sequence[float]]) -> bool:
+    """Even-odd ray casting; points exactly on an edge may fall either side."""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lng_i = polygon[i]
+        lat_j, lng_j = polygon[j]
+        if (lat_i > lat) != (lat_j > lat):
+            if lng < (lng_j - lng_i) * (lat - lat_i) / (lat_j - lat_i) + lng_i:
+                inside = not inside
+        j = i
+    return inside
+
+
+def _cell(lat: float, lng: float) -> Tuple[int, int]:
+    return int(math.floor(lat / CELL_DEGREES)), int(math.floor(lng / CELL_DEGREES))
+
+
+class _Fence:
+    __slots__ = ("id", "name", "kind", "zone", "polygon", "bbox", "cells")
+
+    def __init__(self, record: dict):
+        self.id = record["id"]
+        self.name = record["name"]
+        self.kind = record["kind"]
+        self.zone = record.get("zone")
+        self.polygon = [tuple(point) for point in record["polygon"]]
+        lats = [point[0] for point in self.polygon]
+        lngs = [point[1] for point in self.polygon]
+        self.bbox = (min(lats), min(lngs), max(lats), max(lngs))
+        low_row, low_col = _cell(self.bbox[0], self.bbox[1])
+        high_row, high_col = _cell(self.bbox[2], self.bbox[3])
+        if (high_row - low_row + 1) * (high_col - low_col + 1) > MAX_FENCE_CELLS:
+            self.cells = None
+        else:
+            self.cells = [(row, col) for row in range(low_row, high_row + 1) for col in range(low_col, high_col + 1)]
+
+    def contains(self, lat: float, lng: float) -> bool:
+        low_lat, low_lng, high_lat, high_lng = self.bbox
+        if not (low_lat <= lat <= high_lat and low_lng <= lng <= high_lng):
+            return False
+        return point_in_polygon(lat, lng, self.polygon)
+
+
+class GeofenceEngine:
+    """
+    Which geofences each worker is inside, kept current from position updates.
+
+    Fences are registered in every grid cell their bounding box overlaps,
+    so a position is only tested against the fences of its own cell, first
+    by bounding box and then by ray casting. Fences too large to register
+    cell by cell are kept on one list that every position is tested
+    against. Crossing a fence boundary
+    records an ``entry`` or ``exit`` event; a worker found inside a
+    ``zone`` fence gets its ``zone`` field set to match, as a write
+    deferred until the position update has released its lock. Outside
+    every zone fence a worker keeps the zone it last had.
+    """
+
+    def __init__(self, fences: EntityStore, workers: EntityStore):
+        self._lock = threading.Lock()
+        self._fences: Dict[str, _Fence] = {}
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._large: Set[str] = set()
+        self._positions: Dict[str, Point] = {}
+        self._inside: Dict[str, FrozenSet[str]] = {}
+        self._events: Deque[dict] = deque(maxlen=MAX_EVENTS)
+        self._sequence = itertools.count(1)
+        self._workers = workers
+        fences.subscribe(self._on_fence_change)
+        workers.subscribe(self._on_worker_change, fields=("latitude", "longitude"))
+
+    def events(self, after: int = 0, limit: int = 100) -> List[dict]:
+        """Events with a sequence number above ``after``, oldest first."""
+        with self._lock:
+            return [event for event in self._events if event["seq"] > after][:limit]
+
+    def occupants(self, fence_id: str) -> List[str]:
+        with self._lock:
+            found = [worker_id for worker_id, inside in self._inside.items() if fence_id in inside]
+        return sorted(found, key=lambda worker_id: (len(worker_id), worker_id))
+
+    def fences_at(self, lat: float, lng: float) -> List[str]:
+        with self._lock:
+            return sorted(self._containing(lat, lng))
+
+    def _containing(self, lat: float, lng: float) -> FrozenSet[str]:
+        candidates = self._cells.get(_cell(lat, lng), ())
+        if self._large:
+            candidates = self._large.union(candidates)
+        return frozenset(fence_id for fence_id in candidates if self._fences[fence_id].contains(lat, lng))
+
+    def _on_worker_change(self, old: Optional[dict], new: Optional[dict]) -> None:
+        with self._lock:
+            if new is None:
+                self._positions.pop(old["id"], None)
+                self._inside.pop(old["id"], None)
+                return
+            worker_id = new["id"]
+            self._positions[worker_id] = (new["latitude"], new["longitude"])
+            inside = self._containing(new["latitude"], new["longitude"])
+            self._transition(worker_id, inside, new["updated_at"])
+            zone = self._zone_of(inside)
+        if zone is not None and zone != new["zone"]:
+            defer(lambda: self._assign_zone(worker_id, zone))
+
+    def _on_fence_change(self, old: Optional[dict], new: Optional[dict]) -> None:
+        with self._lock:
+            retired = None
+            if old is not None:
+                retired = self._fences.pop(old["id"])
+                self._large.discard(old["id"])
+                for cell in retired.cells or ():
+                    members = self._cells[cell]
+                    members.discard(old["id"])
+                    if not members:
+                        del self._cells[cell]
+            if new is not None:
+                fence = self._fences[new["id"]] = _Fence(new)
+                if fence.cells is None:
+                    self._large.add(fence.id)
+                for cell in fence.cells or ():
+                    self._cells.setdefault(cell, set()).add(fence.id)
+            # Fence edits are rare, so re-testing every tracked worker is fine.
+            at = new["updated_at"] if new is not None else datetime.utcnow().isoformat() + "Z"
+            reassigned = []
+            for worker_id, (lat, lng) in self._positions.items():
+                inside = self._containing(lat, lng)
+                if inside != self._inside.get(worker_id, frozenset()):
+                    self._transition(worker_id, inside, at, retired)
+                    zone = self._zone_of(inside)
+                    if zone is not None:
+                        reassigned.append((worker_id, zone))
+        for worker_id, zone in reassigned:
+            defer(lambda worker_id=worker_id, zone=zone: self._assign_zone(worker_id, zone))
+
+    def _transition(self, worker_id: str, inside: FrozenSet[str], at: str, retired: Optional[_Fence] = None) -> None:
+        """Record entry/exit events; ``retired`` names a fence that was just deleted."""
+        previous = self._inside.get(worker_id, frozenset())
+        if inside == previous:
+            return
+        for event, fence_ids in (("exit", previous - inside), ("entry", inside - previous)):
+            for fence_id in sorted(fence_ids):
+                fence = self._fences.get(fence_id) or retired
+                self._events.append({
+                    "seq": next(self._sequence),
+                    "event": event,
+                    "worker_id": worker_id,
+                    "geofence_id": fence_id,
+                    "geofence": fence.name,
+                    "kind": fence.kind,
+                    "at": at,
+                })
+        if inside:
+            self._inside[worker_id] = inside
+        else:
+            self._inside.pop(worker_id, None)
+
+    def _zone_of(self, inside: FrozenSet[str]) -> Optional[str]:
+        zones = sorted(self._fences[fence_id].zone for fence_id in inside if self._fences[fence_id].kind == "zone")
+        return zones[0] if zones else None
+
+    def _assign_zone(self, worker_id: str, zone: str) -> None:
+        worker = self._workers.get(worker_id)
+        if worker is None or worker["zone"] == zone:
+            return
+        try:
+            self._workers.patch(worker_id, {"zone": zone, "updated_at": datetime.utcnow().isoformat() + "Z"})
+        except KeyError:
+            pass
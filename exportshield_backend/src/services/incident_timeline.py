@@ -0,0 +1,209 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.services.store import BOOKKEEPING_FIELDS, EntityStore, ReadSnapshot
+
+
+# Sorts after every record id, so (t, _AFTER_ANY_ID) bounds all entries at t.
+_AFTER_ANY_ID = chr(0x10FFFF)
+
+
+def parse_timestamp(value: str) -> float:
+    """Epoch seconds for the ``2025-01-01T12:00:00.000000Z`` strings the API stores."""
+    parsed = datetime.fromisoformat(value.rstrip("Z"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def format_timestamp(value: float) -> str:
+    return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+
+
+def _change(before, after) -> dict:
+    """History entry for one field; lists (exposed workers) record only what was added and removed."""
+    if isinstance(before, list) and isinstance(after, list):
+        before_set, after_set = set(before), set(after)
+        return {
+            "added": [item for item in after if item not in before_set],
+            "removed": [item for item in before if item not in after_set],
+        }
+    return {"from": before, "to": after}
+
+
+class SortedTimes:
+    """(timestamp, id) pairs kept sorted, so range counts are two binary searches."""
+
+    def __init__(self):
+        self._entries: List[Tuple[float, str]] = []
+
+    def add(self, timestamp: float, record_id: str) -> None:
+        insort(self._entries, (timestamp, record_id))
+
+    def remove(self, timestamp: float, record_id: str) -> None:
+        index = bisect_left(self._entries, (timestamp, record_id))
+        if index < len(self._entries) and self._entries[index] == (timestamp, record_id):
+            del self._entries[index]
+
+    def count_until(self, end: float) -> int:
+        """Entries at or before ``end``."""
+        return bisect_right(self._entries, (end, _AFTER_ANY_ID))
+
+    def between(self, start: float, end: float) -> List[Tuple[float, str]]:
+        """Entries in ``[start, end)``."""
+        return self._entries[bisect_left(self._entries, (start,)):bisect_left(self._entries, (end,))]
+
+    def count_between(self, start: float, end: float) -> int:
+        return bisect_left(self._entries, (end,)) - bisect_left(self._entries, (start,))
+
+
+class IncidentTimeline:
+    """
+    Lifecycle history and time indexes for incidents.
+
+    Every change to an incident appends an event to its history. Creation
+    and resolution times are kept in sorted indexes (overall and per zone),
+    so counts over a period, mean time to resolve and the number of
+    incidents active at a given moment are answered by binary search over
+    the indexes rather than a pass over every incident.
+
+    Only the latest resolution of an incident is indexed; reopening it
+    removes that resolution. A deleted incident leaves the indexes and its
+    history is dropped with it.
+    """
+
+    def __init__(self, store: EntityStore, fields: Iterable[str]):
+        self._store = store
+        self._lock = threading.Lock()
+        self._history: Dict[str, List[dict]] = {}
+        self._state: Dict[str, Tuple[float, Optional[float], str]] = {}
+        self._created = SortedTimes()
+        self._resolved = SortedTimes()
+        self._created_by_zone: Dict[str, SortedTimes] = {}
+        self._resolved_by_zone: Dict[str, SortedTimes] = {}
+        store.subscribe(self.on_change, fields)
+
+    def on_change(self, old: Optional[dict], new: Optional[dict]) -> None:
+        with self._lock:
+            if new is None:
+                self._unindex(old["id"])
+                self._history.pop(old["id"], None)
+            elif old is None:
+                self._history[new["id"]] = [{
+                    "event": "created",
+                    "at": new["created_at"],
+                    "version": new["version"],
+                    "status": new["status"],
+                    "severity": new["severity"],
+                }]
+                resolved_at = parse_timestamp(new["updated_at"]) if new["status"] == "resolved" else None
+                self._index(new["id"], parse_timestamp(new["created_at"]), resolved_at, new["zone"])
+            else:
+                self._record_update(old, new)
+
+    def history(self, incident_id: str) -> Optional[List[dict]]:
+        with self._lock:
+            events = self._history.get(incident_id)
+            return list(events) if events is not None else None
+
+    def counts(self, bucket: str, start: float, end: float) -> Dict[str, int]:
+        """Incidents created in ``[start, end)`` per ``day``, ``week`` (Monday start) or ``zone``."""
+        with self._lock:
+            if bucket == "zone":
+                counts = {
+                    zone: index.count_between(start, end)
+                    for zone, index in self._created_by_zone.items()
+                }
+                return {zone: count for zone, count in counts.items() if count}
+            counts: Dict[str, int] = {}
+            for timestamp, _ in self._created.between(start, end):
+                day = datetime.fromtimestamp(timestamp, timezone.utc).date()
+                if bucket == "week":
+                    day -= timedelta(days=day.weekday())
+                key = day.isoformat()
+                counts[key] = counts.get(key, 0) + 1
+            return counts
+
+    def count_created(self, start: float, end: float, snapshot: Optional[ReadSnapshot] = None) -> int:
+        """Incidents created in ``[start, end)``, now or as of ``snapshot``."""
+        with self._lock:
+            count = self._created.count_between(start, end)
+            if snapshot is not None:
+                for record_id, version in snapshot.changed(self._store).items():
+                    state = self._state.get(record_id)
+                    count -= state is not None and start <= state[0] < end
+                    count += version is not None and start <= parse_timestamp(version["created_at"]) < end
+            return count
+
+    def resolution_stats(self, start: float, end: float) -> dict:
+        """Mean time to resolve for incidents resolved in ``[start, end)``."""
+        with self._lock:
+            durations = [resolved - self._state[record_id][0] for resolved, record_id in self._resolved.between(start, end)]
+        mean_seconds = sum(durations) / len(durations) if durations else None
+        return {
+            "resolved": len(durations),
+            "mean_time_to_resolve_hours": round(mean_seconds / 3600, 3) if mean_seconds is not None else None,
+        }
+
+    def active_at(self, moment: float) -> dict:
+        """Incidents created at or before ``moment`` and not yet resolved by then."""
+        with self._lock:
+            by_zone = {}
+            for zone, created in self._created_by_zone.items():
+                resolved = self._resolved_by_zone.get(zone)
+                active = created.count_until(moment) - (resolved.count_until(moment) if resolved else 0)
+                if active:
+                    by_zone[zone] = active
+            return {
+                "active": self._created.count_until(moment) - self._resolved.count_until(moment),
+                "by_zone": by_zone,
+            }
+
+    def _record_update(self, old: dict, new: dict) -> None:
+        changes = {
+            field: _change(old.get(field), value)
+            for field, value in new.items()
+            if field not in BOOKKEEPING_FIELDS and old.get(field) != value
+        }
+        event = "updated"
+        if "status" in changes:
+            if new["status"] == "resolved":
+                event = "resolved"
+            elif old["status"] == "resolved":
+                event = "reopened"
+        self._history.setdefault(new["id"], []).append({
+            "event": event,
+            "at": new["updated_at"],
+            "version": new["version"],
+            "changes": changes,
+        })
+
+        created_at, resolved_at, zone = self._state[new["id"]]
+        if event == "resolved":
+            resolved_at = parse_timestamp(new["updated_at"])
+        elif event == "reopened":
+            resolved_at = None
+        if event != "updated" or new["zone"] != zone:
+            self._unindex(new["id"])
+            self._index(new["id"], created_at, resolved_at, new["zone"])
+
+    def _index(self, record_id: str, created_at: float, resolved_at: Optional[float], zone: str) -> None:
+        self._state[record_id] = (created_at, resolved_at, zone)
+        self._created.add(created_at, record_id)
+        self._created_by_zone.setdefault(zone, SortedTimes()).add(created_at, record_id)
+        if resolved_at is not None:
+            self._resolved.add(resolved_at, record_id)
+            self._resolved_by_zone.setdefault(zone, SortedTimes()).add(resolved_at, record_id)
+
+    def _unindex(self, record_id: str) -> None:
+        state = self._state.pop(record_id, None)
+        if state is None:
+            return
+        created_at, resolved_at, zone = state
+        self._created.remove(created_at, record_id)
+        self._created_by_zone[zone].remove(created_at, record_id)
+        if resolved_at is not None:
+            self._resolved.remove(resolved_at, record_id)
+            self._resolved_by_zone[zone].remove(resolved_at, record_id)
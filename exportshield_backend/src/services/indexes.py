@@ -0,0 +1,81 @@
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+from src.services.store import EntityStore, ReadSnapshot
+
+
+class FilteredIndex:
+    """
+    Ids of the records in a store that satisfy ``predicate``.
+
+    Subscribed only to ``fields`` (the inputs of the predicate), so writes
+    to any other field never touch it. Lookups go back to the store, so
+    callers always get the latest version of each matching record.
+    """
+
+    def __init__(self, store: EntityStore, predicate: Callable[[dict], bool], fields: Iterable[str]):
+        self._store = store
+        self._predicate = predicate
+        self._ids: Dict[str, None] = {}
+        self._lock = threading.Lock()
+        store.subscribe(self._on_change, fields)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def count(self, snapshot: Optional[ReadSnapshot] = None) -> int:
+        """Matching records now, or as of ``snapshot``."""
+        with self._lock:
+            count = len(self._ids)
+            if snapshot is not None:
+                for record_id, version in snapshot.changed(self._store).items():
+                    count += (version is not None and self._predicate(version)) - (record_id in self._ids)
+            return count
+
+    def records(self) -> List[dict]:
+        return [record for record in map(self._store.get, list(self._ids)) if record is not None]
+
+    def _on_change(self, old: Optional[dict], new: Optional[dict]) -> None:
+        with self._lock:
+            if new is not None and self._predicate(new):
+                self._ids[new["id"]] = None
+            elif old is not None:
+                self._ids.pop(old["id"], None)
+
+
+class CountIndex:
+    """Number of records per value of ``field``, maintained from change events."""
+
+    def __init__(self, store: EntityStore, field: str):
+        self._store = store
+        self._field = field
+        self._counts: Dict[str, int] = {}
+        # The value each record is counted under
+        self._keys: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        store.subscribe(self._on_change, (field,))
+
+    def counts(self, snapshot: Optional[ReadSnapshot] = None) -> Dict[str, int]:
+        """Records per value now, or as of ``snapshot``."""
+        with self._lock:
+            counts = dict(self._counts)
+            if snapshot is not None:
+                for record_id, version in snapshot.changed(self._store).items():
+                    if record_id in self._keys:
+                        counts[self._keys[record_id]] -= 1
+                    if version is not None:
+                        counts[version[self._field]] = counts.get(version[self._field], 0) + 1
+        return {key: count for key, count in counts.items() if count}
+
+    def _on_change(self, old: Optional[dict], new: Optional[dict]) -> None:
+        with self._lock:
+            if old is not None:
+                key = self._keys.pop(old["id"], old[self._field])
+                remaining = self._counts.get(key, 0) - 1
+                if remaining > 0:
+                    self._counts[key] = remaining
+                else:
+                    self._counts.pop(key, None)
+            if new is not None:
+                key = self._keys[new["id"]] = new[self._field]
+                self._counts[key] = self._counts.get(key, 0) + 1
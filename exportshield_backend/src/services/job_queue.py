@@ -0,0 +1,240 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, List, Optional
+
+from src.services.sites import SiteShards, store_name
+
+JOB_WORKERS = int(os.getenv("MININGMITRA_JOB_WORKERS", "2"))
+MAX_JOB_RESULTS = int(os.getenv("MININGMITRA_MAX_JOB_RESULTS", "100"))
+# Encoded size of all kept results together; a single result larger than
+# this fails its job instead of displacing every other result.
+MAX_JOB_RESULT_BYTES = int(os.getenv("MININGMITRA_MAX_JOB_RESULT_BYTES", str(256 * 1024 * 1024)))
+
+# Lower runs first; within a priority jobs run in submission order.
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job by ``Job.report`` once it has been cancelled."""
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def result_size(result: Any) -> int:
+    """Bytes a result takes as served: its length when already encoded, else its JSON encoding."""
+    if isinstance(result, (bytes, bytearray, str)):
+        return len(result)
+    return len(json.dumps(result, separators=(",", ":"), default=str))
+
+
+class Job:
+    """
+    One unit of background work and its observable state.
+
+    ``run(job)`` does the work in a pool thread and calls ``job.report``
+    between chunks; that is where progress is published and where a
+    cancellation takes effect.
+    """
+
+    def __init__(self, kind: str, run: Callable[["Job"], Any], priority: str, media_type: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.priority = priority
+        self.media_type = media_type
+        self.status = "queued"
+        self.progress = 0.0
+        self.message: Optional[str] = None
+        self.result: Any = None
+        self.result_bytes = 0
+        self.error: Optional[str] = None
+        self.submitted_at = _now()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self._run: Optional[Callable[["Job"], Any]] = run
+        self._cancel = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def report(self, progress: float, message: Optional[str] = None) -> None:
+        """Publish progress in ``[0, 1]``; raises JobCancelled if cancellation was requested."""
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+        self.progress = round(min(max(progress, 0.0), 1.0), 4)
+        if message is not None:
+            self.message = message
+
+    def describe(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "priority": self.priority,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "cancel_requested": self._cancel.is_set() and not self.finished,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """
+    Heavy work taken off the request path and run in priority order.
+
+    A daemon thread runs an asyncio loop whose dispatcher waits for a free
+    slot, takes the most urgent queued job and hands it to a thread pool,
+    so at most ``workers`` jobs run at once and a request handler only pays
+    for enqueueing. A queued job is cancelled on the spot; a running one
+    stops at its next ``report``. Finished jobs keep their results until
+    more than ``max_results`` have finished or their results together pass
+    ``max_result_bytes``, oldest evicted first.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        workers: int = JOB_WORKERS,
+        max_results: int = MAX_JOB_RESULTS,
+        max_result_bytes: int = MAX_JOB_RESULT_BYTES,
+    ):
+        self.name = name
+        self.workers = workers
+        self.max_results = max_results
+        self.max_result_bytes = max_result_bytes
+        self._result_bytes = 0
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._sequence = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks = set()
+        self._start_lock = threading.Lock()
+
+    def submit(
+        self,
+        kind: str,
+        run: Callable[[Job], Any],
+        priority: str = "normal",
+        media_type: str = "application/json",
+    ) -> Job:
+        """Queue ``run(job)``; its return value becomes the job result."""
+        job = Job(kind, run, priority, media_type)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._ensure_started()
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (PRIORITIES[priority], next(self._sequence), job))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def jobs(self, status: Optional[str] = None) -> List[Job]:
+        """Known jobs, newest first."""
+        with self._lock:
+            found = list(self._jobs.values())
+        return [job for job in reversed(found) if status is None or job.status == status]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued job or ask a running one to stop; finished jobs are left alone."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        with self._lock:
+            if job.status == "queued":
+                self._finish(job, "cancelled")
+            elif job.status == "running":
+                job._cancel.set()
+        return job
+
+    def _ensure_started(self) -> None:
+        if self._loop is not None:
+            return
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            ready = threading.Event()
+            threading.Thread(
+                target=lambda: asyncio.run(self._dispatch(ready)), name=f"{self.name}-dispatch", daemon=True
+            ).start()
+            ready.wait()
+
+    async def _dispatch(self, ready: threading.Event) -> None:
+        queue = asyncio.PriorityQueue()
+        slots = asyncio.Semaphore(self.workers)
+        self._queue, self._loop = queue, asyncio.get_running_loop()
+        ready.set()
+        with ThreadPoolExecutor(self.workers, thread_name_prefix=f"{self.name}-worker") as executor:
+            while True:
+                # Take a slot first, so the job chosen is the most urgent one at that moment.
+                await slots.acquire()
+                _, _, job = await queue.get()
+                if job.status != "queued":
+                    slots.release()
+                    continue
+                task = asyncio.create_task(self._run(job, executor, slots))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: Job, executor: ThreadPoolExecutor, slots: asyncio.Semaphore) -> None:
+        try:
+            await asyncio.get_running_loop().run_in_executor(executor, self._execute, job)
+        finally:
+            slots.release()
+
+    def _execute(self, job: Job) -> None:
+        with self._lock:
+            if job.status != "queued":
+                return
+            job.status = "running"
+            job.started_at = _now()
+        try:
+            result = job._run(job)
+        except JobCancelled:
+            outcome = "cancelled"
+        except Exception as error:
+            job.error = f"{type(error).__name__}: {error}"
+            outcome = "failed"
+        else:
+            size = result_size(result)
+            if size > self.max_result_bytes:
+                job.error = f"Result of {size} bytes exceeds the {self.max_result_bytes}-byte limit on kept results"
+                outcome = "failed"
+            else:
+                job.result, job.result_bytes = result, size
+                job.progress = 1.0
+                job.message = None
+                outcome = "succeeded"
+        with self._lock:
+            self._finish(job, outcome)
+
+    def _finish(self, job: Job, status: str) -> None:
+        """Mark ``job`` finished and evict the oldest results over the bound; caller holds the lock."""
+        job.status = status
+        job.finished_at = _now()
+        job._run = None
+        self._finished[job.id] = None
+        self._result_bytes += job.result_bytes
+        while len(self._finished) > self.max_results or self._result_bytes > self.max_result_bytes:
+            evicted, _ = self._finished.popitem(last=False)
+            self._result_bytes -= self._jobs.pop(evicted).result_bytes
+
+
+# One queue per site: a site's jobs, their results and their worker slots
+# are its own, so an export of one mine can't be read or cancelled through
+# another, nor a rebuild at one hold up jobs at the others.
+job_queues = SiteShards(lambda site: JobQueue(store_name(site, "jobs")))
@@ -0,0 +1,213 @@
+import itertools
+import threading
+from datetime import date, timedelta
+from heapq import heappop, heappush, heapify
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.services.store import EntityStore, ReadSnapshot
+
+
+# Risk weights over normalised wear indicators; they sum to 1.
+RISK_WEIGHTS = {"health": 0.5, "vibration": 0.3, "operating_hours": 0.2}
+VIBRATION_LIMIT = 10.0           # mm/s at which the vibration term saturates
+OPERATING_HOURS_LIMIT = 5000     # hours at which the wear term saturates
+MAX_PULL_FORWARD_DAYS = 30       # a risk of 1.0 brings maintenance this much earlier
+DEFAULT_INTERVAL_DAYS = 90       # when next_maintenance is missing or unparsable
+# Lowest risk score of each predicted_failure_risk band, most severe first
+RISK_BANDS = (("high", 0.5), ("medium", 0.3))
+
+# Telemetry touches updated_at on every reading, so due dates must not depend on it.
+SCHEDULE_FIELDS = ("name", "location", "health", "status", "operating_hours", "vibration", "next_maintenance", "flagged_at")
+FLAGGED_STATUS = "maintenance_required"
+
+
+def risk_score(machine: dict) -> float:
+    """Wear-based urgency in ``[0, 1]`` from health, vibration and operating hours."""
+    health = 1 - min(max(machine["health"], 0), 100) / 100
+    vibration = min(max(machine["vibration"], 0) / VIBRATION_LIMIT, 1.0)
+    hours = min(max(machine["operating_hours"], 0) / OPERATING_HOURS_LIMIT, 1.0)
+    score = (
+        RISK_WEIGHTS["health"] * health
+        + RISK_WEIGHTS["vibration"] * vibration
+        + RISK_WEIGHTS["operating_hours"] * hours
+    )
+    return round(score, 4)
+
+
+def risk_band(score: float) -> str:
+    """The ``predicted_failure_risk`` label for a risk score."""
+    for band, threshold in RISK_BANDS:
+        if score >= threshold:
+            return band
+    return "low"
+
+
+def flagged_at(current: Optional[dict], status: str, at: str) -> Optional[str]:
+    """
+    When a machine with ``status`` was flagged ``maintenance_required``.
+
+    A machine that already was keeps its time from ``current``; one just
+    flagged gets ``at``; any other status clears it.
+    """
+    if status != FLAGGED_STATUS:
+        return None
+    if current is not None and current["status"] == FLAGGED_STATUS:
+        return current.get("flagged_at") or current["updated_at"]
+    return at
+
+
+def due_date(machine: dict, risk: float) -> date:
+    """
+    The scheduled ``next_maintenance`` pulled forward by risk.
+
+    A machine flagged ``maintenance_required`` is due from when it was
+    flagged. Only fields of the record go in, so the date is stable
+    between writes.
+    """
+    try:
+        scheduled = date.fromisoformat(machine["next_maintenance"][:10])
+    except (TypeError, ValueError):
+        scheduled = date.fromisoformat(machine["created_at"][:10]) + timedelta(days=DEFAULT_INTERVAL_DAYS)
+    due = scheduled - timedelta(days=round(risk * MAX_PULL_FORWARD_DAYS))
+    if machine["status"] == FLAGGED_STATUS:
+        # Records saved before flagged_at existed fall back to their last update
+        due = min(due, date.fromisoformat((machine.get("flagged_at") or machine["updated_at"])[:10]))
+    return due
+
+
+def parse_window(value: str) -> int:
+    """Days in a ``7d`` / ``2w`` window."""
+    count, unit = int(value[:-1]), value[-1]
+    return count * 7 if unit == "w" else count
+
+
+# (due ordinal, -risk, sequence, machine id, summary); the sequence keeps
+# comparisons from ever reaching the id or the summary dict.
+_Entry = Tuple[int, float, int, str, dict]
+
+
+class MaintenanceSchedule:
+    """
+    Machines ordered by maintenance due date, then risk, in a binary heap.
+
+    A change pushes a fresh entry and orphans the old one (lazy deletion),
+    so updates are O(log n); orphans are dropped when they outnumber live
+    entries. Queries walk the heap in order without popping it, touching
+    only about k log k entries for the k machines they return.
+    """
+
+    def __init__(self, store: EntityStore):
+        self._store = store
+        self._lock = threading.Lock()
+        self._heap: List[_Entry] = []
+        self._current: Dict[str, _Entry] = {}
+        self._sequence = itertools.count()
+        store.subscribe(self.on_change, fields=SCHEDULE_FIELDS)
+
+    def on_change(self, old: Optional[dict], new: Optional[dict]) -> None:
+        with self._lock:
+            if new is None:
+                self._current.pop(old["id"], None)
+            else:
+                risk = risk_score(new)
+                summary = {
+                    "id": new["id"],
+                    "name": new["name"],
+                    "location": new["location"],
+                    "status": new["status"],
+                    "next_maintenance": new["next_maintenance"],
+                    "risk_score": risk,
+                }
+                entry = (due_date(new, risk).toordinal(), -risk, next(self._sequence), new["id"], summary)
+                self._current[new["id"]] = entry
+                heappush(self._heap, entry)
+            if len(self._heap) > 2 * len(self._current) + 16:
+                self._heap = list(self._current.values())
+                heapify(self._heap)
+
+    def upcoming(self, within_days: int, today: Optional[date] = None) -> List[dict]:
+        """Machines due on or before ``today + within_days``, most urgent first (overdue included)."""
+        today = today or date.today()
+        horizon = (today + timedelta(days=within_days)).toordinal()
+        found = []
+        with self._lock:
+            for entry in self._ordered():
+                if entry[0] > horizon:
+                    break
+                found.append(self._describe(entry, today))
+        return found
+
+    def count_due(self, within_days: int, today: Optional[date] = None, snapshot: Optional[ReadSnapshot] = None) -> int:
+        """Machines due on or before ``today + within_days``, now or as of ``snapshot``."""
+        if snapshot is None:
+            return len(self.upcoming(within_days, today))
+        horizon = ((today or date.today()) + timedelta(days=within_days)).toordinal()
+        with self._lock:
+            count = sum(1 for _ in itertools.takewhile(lambda entry: entry[0] <= horizon, self._ordered()))
+            for record_id, version in snapshot.changed(self._store).items():
+                entry = self._current.get(record_id)
+                count -= entry is not None and entry[0] <= horizon
+                count += version is not None and due_date(version, risk_score(version)).toordinal() <= horizon
+        return count
+
+    def plan(self, days: int, crews: int, jobs_per_crew: int = 1, today: Optional[date] = None) -> dict:
+        """
+        Assign machines to maintenance days in priority order.
+
+        Only machines due within the ``days``-day horizon are planned. Each
+        day has ``crews * jobs_per_crew`` slots and a machine takes the
+        earliest free one from today on, so the most urgent work goes first
+        and lateness shows wherever capacity runs short; machines that do
+        not fit are listed as unscheduled.
+        """
+        today = today or date.today()
+        capacity = crews * jobs_per_crew
+        total_slots = days * capacity
+        last_day = (today + timedelta(days=days - 1)).toordinal()
+        schedule: List[dict] = [{"date": (today + timedelta(days=d)).isoformat(), "jobs": []} for d in range(days)]
+        unscheduled: List[dict] = []
+        late = 0
+        with self._lock:
+            for position, entry in enumerate(self._ordered()):
+                if entry[0] > last_day:
+                    break
+                job = self._describe(entry, today)
+                if position >= total_slots:
+                    unscheduled.append(job)
+                    continue
+                day = position // capacity
+                job["days_late"] = max(0, day - job["days_until_due"])
+                late += job["days_late"] > 0
+                schedule[day]["jobs"].append(job)
+        return {
+            "start": today.isoformat(),
+            "days": days,
+            "crews": crews,
+            "jobs_per_crew": jobs_per_crew,
+            "scheduled": sum(len(day["jobs"]) for day in schedule),
+            "late": late,
+            "unscheduled": unscheduled,
+            "schedule": [day for day in schedule if day["jobs"]],
+        }
+
+    def _ordered(self) -> Iterator[_Entry]:
+        """Live entries in key order, found by a best-first walk of the heap."""
+        heap = self._heap
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier:
+            entry, index = heappop(frontier)
+            if self._current.get(entry[3]) is entry:
+                yield entry
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heappush(frontier, (heap[child], child))
+
+    @staticmethod
+    def _describe(entry: _Entry, today: date) -> dict:
+        due = date.fromordinal(entry[0])
+        return {
+            **entry[4],
+            "due_date": due.isoformat(),
+            "days_until_due": (due - today).days,
+            "overdue": due < today,
+        }
@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+
+# Response key -> corridor field, in the order the API has always used.
+CORRIDOR_METRICS = {
+    "pollution": "pollution",
+    "greenCover": "green_cover",
+    "temperature": "temperature",
+    "traffic": "traffic",
+    "compliance": "compliance",
+}
+CORRIDOR_GROUPS = ("risk_level", "from_location")
+WINDOW_RETENTION_HOURS = 7 * 24
+
+
+class RunningMeans:
+    """Running sums and a count, so means are O(1) and removals are exact inverses."""
+
+    __slots__ = ("count", "sums")
+
+    def __init__(self):
+        self.count = 0
+        self.sums = dict.fromkeys(CORRIDOR_METRICS, 0.0)
+
+    def add(self, record: dict, sign: int = 1) -> None:
+        self.count += sign
+        for key, field in CORRIDOR_METRICS.items():
+            self.sums[key] += sign * record[field]
+
+    def merge(self, other: "RunningMeans") -> None:
+        self.count += other.count
+        for key in self.sums:
+            self.sums[key] += other.sums[key]
+
+    def means(self) -> Dict[str, float]:
+        if self.count <= 0:
+            return dict.fromkeys(CORRIDOR_METRICS, 0)
+        return {key: total / self.count for key, total in self.sums.items()}
+
+
+class Histogram:
+    """
+    Fixed-width bucket counts over ``[low, high)``.
+
+    Unlike a min-heap or a streaming quantile sketch it supports removal,
+    which corridor updates and deletes need. Min, max and percentiles are
+    exact to the bucket width; values outside the range land in the edge
+    buckets.
+    """
+
+    def __init__(self, low: float, high: float, width: float):
+        self.low = low
+        self.width = width
+        self.counts = [0] * int((high - low) / width)
+        self.total = 0
+
+    def add(self, value: float, sign: int = 1) -> None:
+        index = min(max(int((value - self.low) / self.width), 0), len(self.counts) - 1)
+        self.counts[index] += sign
+        self.total += sign
+
+    def add_many(self, values: Iterable[float]) -> None:
+        low, width, last = self.low, self.width, len(self.counts) - 1
+        # Count bucket indexes in C first; only distinct indexes are clamped in Python
+        for index, count in Counter([int((value - low) / width) for value in values]).items():
+            self.counts[min(max(index, 0), last)] += count
+            self.total += count
+
+    def merge(self, other: "Histogram") -> None:
+        """Add ``other``'s counts; both must share the same range and width."""
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.total += other.total
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.total <= 0:
+            return None
+        rank = q * (self.total - 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen > rank:
+                return self.low + index * self.width
+        return None
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        return {
+            "min": self.quantile(0.0),
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "max": self.quantile(1.0),
+            "count": self.total,
+        }
+
+
+class CorridorMetrics:
+    """
+    Corridor environmental aggregates maintained from change events.
+
+    Holds global and per-group running sums, hourly buckets of the readings
+    written in each hour (for last-N-hours windows) and histograms for
+    pollution and temperature. No query ever rescans the corridors.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._overall = RunningMeans()
+        self._groups: Dict[str, Dict[str, RunningMeans]] = {group: {} for group in CORRIDOR_GROUPS}
+        self._hours: Dict[int, RunningMeans] = {}
+        self._sketches = {
+            "pollution": Histogram(0, 101, 1),
+            "temperature": Histogram(-10, 80, 0.5),
+        }
+
+    @property
+    def watched_fields(self) -> List[str]:
+        return list(CORRIDOR_METRICS.values()) + list(CORRIDOR_GROUPS)
+
+    def on_change(self, old: Optional[dict], new: Optional[dict]) -> None:
+        with self._lock:
+            if old is not None:
+                self._apply(old, -1)
+            if new is not None:
+                self._apply(new, 1)
+                self._record_reading(new)
+
+    def average(self) -> Dict[str, float]:
+        with self._lock:
+            return self._overall.means()
+
+    def totals(self) -> RunningMeans:
+        """A copy of the overall running sums, for merging with other sites' metrics."""
+        totals = RunningMeans()
+        with self._lock:
+            totals.merge(self._overall)
+        return totals
+
+    def average_by(self, group: str) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {value: means.means() for value, means in self._groups[group].items()}
+
+    def average_window(self, hours: int, now: Optional[float] = None) -> dict:
+        current_hour = int((now or time.time()) // 3600)
+        window = RunningMeans()
+        with self._lock:
+            for hour in range(current_hour - hours + 1, current_hour + 1):
+                bucket = self._hours.get(hour)
+                if bucket is not None:
+                    window.merge(bucket)
+        return {"hours": hours, "readings": window.count, "averages": window.means()}
+
+    def distribution(self) -> Dict[str, Dict[str, Optional[float]]]:
+        with self._lock:
+            return {field: sketch.summary() for field, sketch in self._sketches.items()}
+
+    def _apply(self, record: dict, sign: int) -> None:
+        self._overall.add(record, sign)
+        for group, buckets in self._groups.items():
+            key = record[group]
+            means = buckets.get(key)
+            if means is None:
+                means = buckets[key] = RunningMeans()
+            means.add(record, sign)
+            if means.count <= 0:
+                del buckets[key]
+        for field, sketch in self._sketches.items():
+            sketch.add(record[field], sign)
+
+    def _record_reading(self, record: dict) -> None:
+        hour = int(time.time() // 3600)
+        bucket = self._hours.get(hour)
+        if bucket is None:
+            bucket = self._hours[hour] = RunningMeans()
+            for stale in [h for h in self._hours if h <= hour - WINDOW_RETENTION_HOURS]:
+                del self._hours[stale]
+        bucket.add(record)
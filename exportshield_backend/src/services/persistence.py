@@ -0,0 +1,279 @@
+import json
+import mmap
+import os
+import threading
+from contextlib import ExitStack
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.services.store import EntityStore, consistent_read
+
+
+# Durability is opt-in: without a data directory the stores stay purely
+# in-memory and every restart falls back to the seeded demo data.
+DATA_DIR = os.getenv("MININGMITRA_DATA_DIR")
+FSYNC_INTERVAL = float(os.getenv("MININGMITRA_FSYNC_INTERVAL", "0.05"))
+FSYNC_BATCH = int(os.getenv("MININGMITRA_FSYNC_BATCH", "512"))
+SNAPSHOT_INTERVAL = float(os.getenv("MININGMITRA_SNAPSHOT_INTERVAL", "300"))
+SNAPSHOT_MIN_ENTRIES = int(os.getenv("MININGMITRA_SNAPSHOT_MIN_ENTRIES", "10000"))
+
+_WAL_PREFIX = "wal-"
+_SNAPSHOT_PREFIX = "snapshot-"
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode() + b"\n"
+
+
+def _sequence(filename: str, prefix: str) -> int:
+    return int(filename[len(prefix):].split(".", 1)[0])
+
+
+def _listing(directory: str, prefix: str) -> List[Tuple[int, str]]:
+    return sorted(
+        (_sequence(name, prefix), os.path.join(directory, name))
+        for name in os.listdir(directory)
+        if name.startswith(prefix) and not name.endswith(".tmp")
+    )
+
+
+class WriteAheadLog:
+    """
+    Append-only mutation log split into segments.
+
+    Each line is ``{"lsn", "store", "op", "id", "record"}``. Appends go to
+    the OS buffer immediately; ``fsync`` is batched, either once
+    ``FSYNC_BATCH`` entries are pending or every ``FSYNC_INTERVAL`` seconds
+    from a background thread, so a crash loses at most that window.
+    """
+
+    def __init__(self, directory: str, next_lsn: int = 1):
+        self.directory = directory
+        self.lsn = next_lsn - 1
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._entries_since_rotate = 0
+        self._file = self._open_segment(next_lsn)
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="wal-fsync", daemon=True)
+        self._flusher.start()
+
+    @property
+    def entries_since_rotate(self) -> int:
+        return self._entries_since_rotate
+
+    def append(self, store: str, op: str, record_id: str, record: Optional[dict]) -> int:
+        with self._lock:
+            self.lsn += 1
+            self._file.write(_dumps({"lsn": self.lsn, "store": store, "op": op, "id": record_id, "record": record}))
+            self._pending += 1
+            self._entries_since_rotate += 1
+            if self._pending >= FSYNC_BATCH:
+                self._sync()
+            return self.lsn
+
+    def flush(self) -> None:
+        with self._lock:
+            self._sync()
+
+    def rotate(self) -> int:
+        """Seal the current segment and start a new one; returns the last sealed LSN."""
+        with self._lock:
+            self._sync()
+            self._file.close()
+            self._file = self._open_segment(self.lsn + 1)
+            self._entries_since_rotate = 0
+            return self.lsn
+
+    def close(self) -> None:
+        self._stop.set()
+        self._flusher.join()
+        with self._lock:
+            self._sync()
+            self._file.close()
+
+    def _open_segment(self, first_lsn: int):
+        path = os.path.join(self.directory, f"{_WAL_PREFIX}{first_lsn:020d}.log")
+        return open(path, "ab")
+
+    def _sync(self) -> None:
+        if self._pending:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending = 0
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(FSYNC_INTERVAL):
+            self.flush()
+
+
+def write_snapshot(directory: str, lsn: int, contents: Dict[str, List[dict]]) -> str:
+    """
+    Write a compact snapshot covering every mutation up to ``lsn``.
+
+    The file is a header line followed by one ``[store, record]`` line per
+    record, written to a temporary name and renamed into place once synced.
+    """
+    path = os.path.join(directory, f"{_SNAPSHOT_PREFIX}{lsn:020d}.ndjson")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(_dumps({"lsn": lsn, "counts": {name: len(records) for name, records in contents.items()}}))
+        for name, records in contents.items():
+            for record in records:
+                handle.write(_dumps([name, record]))
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_snapshot(path: str) -> Tuple[int, Dict[str, List[dict]]]:
+    """Load a snapshot by memory-mapping it and decoding it line by line."""
+    contents: Dict[str, List[dict]] = {}
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        header = json.loads(view.readline())
+        for name in header["counts"]:
+            contents[name] = []
+        for line in iter(view.readline, b""):
+            name, record = json.loads(line)
+            contents[name].append(record)
+    return header["lsn"], contents
+
+
+def read_log(path: str, after_lsn: int) -> Iterator[dict]:
+    """
+    Yield logged mutations newer than ``after_lsn``.
+
+    A line cut short by a crash can only be the last one written; the
+    segment is truncated back to the last complete entry so later appends
+    start on a clean line.
+    """
+    with open(path, "r+b") as handle:
+        offset = 0
+        for line in handle:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                entry = None
+            if entry is None or not line.endswith(b"\n"):
+                handle.truncate(offset)
+                return
+            offset += len(line)
+            if entry["lsn"] > after_lsn:
+                yield entry
+
+
+class Persistence:
+    """
+    Makes the registered stores durable with a WAL plus periodic snapshots.
+
+    Startup loads the newest snapshot and replays only the log segments
+    written after it. A background thread snapshots once enough entries
+    have accumulated, then drops the segments the snapshot covers.
+    """
+
+    def __init__(self, directory: str, stores: Dict[str, EntityStore]):
+        self.directory = directory
+        self.stores = stores
+        self.wal: Optional[WriteAheadLog] = None
+        self._snapshot_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._snapshotter: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        last_lsn, restored = self.restore()
+        self.wal = WriteAheadLog(self.directory, next_lsn=last_lsn + 1)
+        for store in self.stores.values():
+            store.attach_log(self.wal.append)
+        if not restored:
+            # First boot: persist the seed so later restarts do not re-seed.
+            self.snapshot()
+        self._snapshotter = threading.Thread(target=self._snapshot_loop, name="snapshotter", daemon=True)
+        self._snapshotter.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._snapshotter is not None:
+            self._snapshotter.join()
+        for store in self.stores.values():
+            store.attach_log(None)
+        if self.wal is not None:
+            self.wal.close()
+
+    def restore(self) -> Tuple[int, bool]:
+        """Load the latest snapshot and replay the log tail; returns (last LSN, restored?)."""
+        snapshots = _listing(self.directory, _SNAPSHOT_PREFIX)
+        segments = _listing(self.directory, _WAL_PREFIX)
+        if not snapshots and not segments:
+            return 0, False
+
+        last_lsn = 0
+        if snapshots:
+            last_lsn, contents = read_snapshot(snapshots[-1][1])
+            for name, store in self.stores.items():
+                store.load(contents.get(name, []))
+
+        for index, (first_lsn, path) in enumerate(segments):
+            following = segments[index + 1][0] if index + 1 < len(segments) else None
+            if following is not None and following <= last_lsn + 1:
+                continue  # entirely covered by the snapshot
+            for entry in read_log(path, last_lsn):
+                store = self.stores.get(entry["store"])
+                if store is not None:
+                    store.apply(entry["op"], entry["id"], entry["record"])
+                last_lsn = entry["lsn"]
+        return last_lsn, True
+
+    def snapshot(self) -> str:
+        """Take a consistent cut of every store, persist it and prune old files."""
+        with self._snapshot_lock:
+            # Writers are held off only while the log is rotated and a read
+            # snapshot is noted at the same point; the records are read after.
+            with ExitStack() as reading:
+                with ExitStack() as stack:
+                    for name in sorted(self.stores):
+                        stack.enter_context(self.stores[name].frozen())
+                    lsn = self.wal.rotate()
+                    cut = reading.enter_context(consistent_read())
+                contents = {name: cut.records(store) for name, store in self.stores.items()}
+            path = write_snapshot(self.directory, lsn, contents)
+            self._prune(lsn)
+            return path
+
+    def _prune(self, lsn: int) -> None:
+        for seq, path in _listing(self.directory, _SNAPSHOT_PREFIX)[:-1]:
+            os.remove(path)
+        for first_lsn, path in _listing(self.directory, _WAL_PREFIX):
+            if first_lsn <= lsn:
+                os.remove(path)
+
+    def _snapshot_loop(self) -> None:
+        while not self._stop.wait(SNAPSHOT_INTERVAL):
+            if self.wal.entries_since_rotate >= SNAPSHOT_MIN_ENTRIES:
+                self.snapshot()
+
+
+_persistence: Optional[Persistence] = None
+
+
+def saved_state_exists() -> bool:
+    """Whether startup will restore stores from ``MININGMITRA_DATA_DIR`` rather than keep their seed."""
+    if not DATA_DIR or not os.path.isdir(DATA_DIR):
+        return False
+    return bool(_listing(DATA_DIR, _SNAPSHOT_PREFIX) or _listing(DATA_DIR, _WAL_PREFIX))
+
+
+def start_persistence(stores: Dict[str, EntityStore]) -> Optional[Persistence]:
+    """Enable durability for ``stores`` when ``MININGMITRA_DATA_DIR`` is set."""
+    global _persistence
+    if DATA_DIR and _persistence is None:
+        _persistence = Persistence(DATA_DIR, stores)
+        _persistence.start()
+    return _persistence
+
+
+def stop_persistence() -> None:
+    global _persistence
+    if _persistence is not None:
+        _persistence.stop()
+        _persistence = None
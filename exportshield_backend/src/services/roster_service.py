@@ -0,0 +1,174 @@
+import threading
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.services.incident_timeline import SortedTimes, format_timestamp, parse_timestamp
+from src.services.store import EntityStore
+
+
+HOUR = 3600
+DAY = 24 * HOUR
+# Longest shift accepted; also bounds the scan for who is on shift at a moment.
+MAX_SHIFT_HOURS = 16
+DIMENSIONS = ("zone", "shift", "role")
+# Rollup key covering every shift, for totals across a dimension
+ALL = "all"
+
+Interval = Tuple[int, int]
+
+
+def shift_intervals(record: dict) -> Tuple[List[Interval], List[Interval]]:
+    """A shift's on-duty and break intervals in epoch seconds; duty is the shift minus its breaks."""
+    start, end = int(parse_timestamp(record["start"])), int(parse_timestamp(record["end"]))
+    breaks = sorted((int(parse_timestamp(b["start"])), int(parse_timestamp(b["end"]))) for b in record.get("breaks") or ())
+    duty, cursor = [], start
+    for break_start, break_end in breaks:
+        if break_start > cursor:
+            duty.append((cursor, break_start))
+        cursor = max(cursor, break_end)
+    if cursor < end:
+        duty.append((cursor, end))
+    return duty, breaks
+
+
+def _spread(start: int, end: int, size: int) -> Iterator[Tuple[int, int]]:
+    """``(bucket, seconds)`` for each ``size``-second bucket the interval overlaps."""
+    bucket = start // size
+    while start < end:
+        boundary = (bucket + 1) * size
+        yield bucket, min(end, boundary) - start
+        start = boundary
+        bucket += 1
+
+
+class _Shift:
+    __slots__ = ("start", "end", "breaks", "worker_id", "keys")
+
+    def __init__(self, record: dict, breaks: List[Interval]):
+        self.start = int(parse_timestamp(record["start"]))
+        self.end = int(parse_timestamp(record["end"]))
+        self.breaks = breaks
+        self.worker_id = record["worker_id"]
+        self.keys = {dimension: record[dimension] for dimension in DIMENSIONS}
+
+
+class RosterRollups:
+    """
+    Headcount rollups of a shift roster, maintained from change events.
+
+    Every shift adds its on-duty seconds to hourly and daily buckets per
+    zone, shift and role (and overall), and its shift count and break
+    seconds to the day it starts on; an edit or delete takes the old
+    contribution back out first. Seconds are whole, so removals are exact.
+    A 30-day series or total therefore reads at most 720 hourly or 30
+    daily buckets, however many shifts the period holds. Shift start
+    times are also indexed, so who is on shift at a moment only looks at
+    shifts that started within MAX_SHIFT_HOURS of it.
+    """
+
+    def __init__(self, shifts: EntityStore):
+        self._lock = threading.Lock()
+        self._hours: Dict[int, Counter] = {}
+        self._days: Dict[int, Counter] = {}
+        self._shift_counts: Dict[int, Counter] = {}
+        self._break_seconds: Dict[int, Counter] = {}
+        self._shifts: Dict[str, _Shift] = {}
+        self._starts = SortedTimes()
+        shifts.subscribe(self.on_change, fields=("worker_id", "start", "end", "breaks") + DIMENSIONS)
+
+    def on_change(self, old: Optional[dict], new: Optional[dict]) -> None:
+        with self._lock:
+            if old is not None:
+                self._apply(old, -1)
+            if new is not None:
+                self._apply(new, 1)
+
+    def headcount(self, by: str, interval: str, start: float, end: float) -> List[dict]:
+        """
+        Average number on duty per ``hour`` or ``day`` bucket in ``[start, end)``, per value of ``by``.
+
+        Buckets are aligned to UTC hours or days; the average over a bucket
+        is its person-seconds on duty divided by its length.
+        """
+        size = HOUR if interval == "hour" else DAY
+        source = self._hours if interval == "hour" else self._days
+        series = []
+        with self._lock:
+            for bucket in range(int(start) // size, -(-int(end) // size)):
+                seconds = source.get(bucket, {})
+                series.append({
+                    "start": format_timestamp(bucket * size),
+                    "headcount": {
+                        key: round(value / size, 2)
+                        for (dimension, key), value in sorted(seconds.items())
+                        if dimension == by and value
+                    },
+                })
+        return series
+
+    def totals(self, by: str, start: float, end: float) -> Dict[str, dict]:
+        """Shifts, person-hours and break hours per value of ``by`` over the UTC days covering ``[start, end)``."""
+        first, last = int(start) // DAY, -(-int(end) // DAY)
+        duty, shifts, breaks = Counter(), Counter(), Counter()
+        with self._lock:
+            for day in range(first, last):
+                duty.update(self._days.get(day, {}))
+                shifts.update(self._shift_counts.get(day, {}))
+                breaks.update(self._break_seconds.get(day, {}))
+        span_hours = (last - first) * DAY / HOUR
+        return {
+            key: {
+                "shifts": shifts[(dimension, key)],
+                "person_hours": round(duty[(dimension, key)] / HOUR, 2),
+                "break_hours": round(breaks[(dimension, key)] / HOUR, 2),
+                "average_headcount": round(duty[(dimension, key)] / HOUR / span_hours, 2) if span_hours else 0.0,
+            }
+            for dimension, key in sorted(set(duty) | set(shifts))
+            if dimension == by
+        }
+
+    def on_shift_at(self, moment: float) -> List[dict]:
+        """Shifts in progress at ``moment``, each with whether its worker is on a break then."""
+        with self._lock:
+            found = []
+            for started, shift_id in self._starts.between(moment - MAX_SHIFT_HOURS * HOUR, moment + 1):
+                shift = self._shifts[shift_id]
+                if started <= moment < shift.end:
+                    found.append({
+                        "shift_id": shift_id,
+                        "worker_id": shift.worker_id,
+                        **shift.keys,
+                        "on_break": any(start <= moment < end for start, end in shift.breaks),
+                    })
+        return found
+
+    def _apply(self, record: dict, sign: int) -> None:
+        duty, breaks = shift_intervals(record)
+        keys = [(dimension, record[dimension]) for dimension in DIMENSIONS] + [(ALL, ALL)]
+        for start, end in duty:
+            for source, size in ((self._hours, HOUR), (self._days, DAY)):
+                for bucket, seconds in _spread(start, end, size):
+                    self._add(source, bucket, keys, sign * seconds)
+        first_day = int(parse_timestamp(record["start"])) // DAY
+        self._add(self._shift_counts, first_day, keys, sign)
+        for start, end in breaks:
+            self._add(self._break_seconds, first_day, keys, sign * (end - start))
+        if sign > 0:
+            shift = self._shifts[record["id"]] = _Shift(record, breaks)
+            self._starts.add(shift.start, record["id"])
+        else:
+            shift = self._shifts.pop(record["id"], None)
+            if shift is not None:
+                self._starts.remove(shift.start, record["id"])
+
+    @staticmethod
+    def _add(source: Dict[int, Counter], bucket: int, keys: List[Tuple[str, str]], amount: int) -> None:
+        counts = source.get(bucket)
+        if counts is None:
+            counts = source[bucket] = Counter()
+        for key in keys:
+            counts[key] += amount
+            if not counts[key]:
+                del counts[key]
+        if not counts:
+            del source[bucket]
@@ -0,0 +1,140 @@
+import heapq
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+# Fields of a corridor that affect the graph; other writes never reach it.
+CORRIDOR_ROUTE_FIELDS = (
+    "from_location", "to_location", "risk_level", "pollution", "temperature", "traffic",
+)
+
+RISK_LEVEL_PENALTY = {"low": 0.0, "medium": 1.0, "high": 3.0, "critical": 6.0}
+ACTIVE_INCIDENT_PENALTY = 5.0
+
+
+def zone_key(location: str) -> str:
+    """Normalise "Zone A - Deep Excavation" and "Zone A" to the same node key."""
+    return location.split(" - ", 1)[0].strip()
+
+
+def corridor_risk(corridor: dict) -> float:
+    """
+    Risk of travelling one corridor, ignoring incidents.
+
+    Formula: 1 + pollution / 100 + max(temperature - 25, 0) / 10
+             + traffic / 100 + risk level penalty
+    """
+    return (
+        1.0
+        + float(corridor["pollution"]) / 100
+        + max(float(corridor["temperature"]) - 25, 0) / 10
+        + float(corridor["traffic"]) / 100
+        + RISK_LEVEL_PENALTY.get(corridor["risk_level"], 1.0)
+    )
+
+
+class CorridorGraph:
+    """
+    Undirected corridor network for lowest-risk route queries.
+
+    Kept as an adjacency map updated from corridor and incident change
+    events. Each active incident in a zone adds a penalty to every corridor
+    touching it. Shortest-path trees are cached per source and dropped
+    whenever the graph or the incident penalties change, so repeated
+    queries from the same zone during an emergency are answered from cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._edges: Dict[str, Tuple[str, str, float]] = {}
+        self._adjacency: Dict[str, Dict[str, str]] = {}
+        self._names: Dict[str, str] = {}
+        self._active_incidents: Dict[str, int] = {}
+        self._trees: Dict[str, Tuple[Dict[str, float], Dict[str, Tuple[str, str]]]] = {}
+
+    def on_corridor_change(self, old: Optional[dict], new: Optional[dict]) -> None:
+        with self._lock:
+            if old is not None:
+                self._remove_edge(old["id"])
+            if new is not None:
+                self._add_edge(new)
+            self._trees.clear()
+
+    def on_incident_change(self, old: Optional[dict], new: Optional[dict]) -> None:
+        with self._lock:
+            touched = False
+            if old is not None and old["status"] == "active":
+                zone = zone_key(old["zone"])
+                self._active_incidents[zone] = self._active_incidents.get(zone, 0) - 1
+                touched |= zone in self._adjacency
+            if new is not None and new["status"] == "active":
+                zone = zone_key(new["zone"])
+                self._active_incidents[zone] = self._active_incidents.get(zone, 0) + 1
+                touched |= zone in self._adjacency
+            if touched:
+                self._trees.clear()
+
+    def route(self, source: str, target: str) -> Optional[Tuple[float, List[str], List[str]]]:
+        """
+        Lowest-risk path as (total risk, location names, corridor ids).
+
+        Returns None when either end is unknown or unreachable.
+        """
+        source_key, target_key = zone_key(source), zone_key(target)
+        with self._lock:
+            if source_key not in self._adjacency or target_key not in self._adjacency:
+                return None
+            tree = self._trees.get(source_key)
+            if tree is None:
+                tree = self._trees[source_key] = self._shortest_paths(source_key)
+            distances, previous = tree
+            if target_key not in distances:
+                return None
+            nodes, corridors = [target_key], []
+            while nodes[-1] != source_key:
+                node, corridor_id = previous[nodes[-1]]
+                nodes.append(node)
+                corridors.append(corridor_id)
+            names = [self._names[node] for node in reversed(nodes)]
+            return distances[target_key], names, corridors[::-1]
+
+    def _edge_weight(self, corridor_id: str) -> float:
+        a, b, base = self._edges[corridor_id]
+        incidents = self._active_incidents.get(a, 0) + (self._active_incidents.get(b, 0) if b != a else 0)
+        return base + ACTIVE_INCIDENT_PENALTY * incidents
+
+    def _shortest_paths(self, source: str):
+        distances = {source: 0.0}
+        previous: Dict[str, Tuple[str, str]] = {}
+        heap = [(0.0, source)]
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if distance > distances[node]:
+                continue
+            for corridor_id, neighbour in self._adjacency[node].items():
+                candidate = distance + self._edge_weight(corridor_id)
+                if candidate < distances.get(neighbour, float("inf")):
+                    distances[neighbour] = candidate
+                    previous[neighbour] = (node, corridor_id)
+                    heapq.heappush(heap, (candidate, neighbour))
+        return distances, previous
+
+    def _add_edge(self, corridor: dict) -> None:
+        a, b = zone_key(corridor["from_location"]), zone_key(corridor["to_location"])
+        self._names.setdefault(a, corridor["from_location"])
+        self._names.setdefault(b, corridor["to_location"])
+        self._edges[corridor["id"]] = (a, b, corridor_risk(corridor))
+        self._adjacency.setdefault(a, {})[corridor["id"]] = b
+        self._adjacency.setdefault(b, {})[corridor["id"]] = a
+
+    def _remove_edge(self, corridor_id: str) -> None:
+        edge = self._edges.pop(corridor_id, None)
+        if edge is None:
+            return
+        for node in edge[:2]:
+            links = self._adjacency.get(node)
+            if links is not None:
+                links.pop(corridor_id, None)
+                if not links:
+                    del self._adjacency[node]
+                    self._names.pop(node, None)
@@ -0,0 +1,135 @@
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from heapq import nlargest
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.services.store import EntityStore
+
+
+_TOKEN = re.compile(r"[0-9a-z]+")
+
+# (store name, record id)
+DocKey = Tuple[str, str]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased alphanumeric runs, so ``RD-2500`` yields ``rd`` and ``2500``."""
+    return _TOKEN.findall(text.lower())
+
+
+def parse_query(query: str) -> List[Tuple[str, bool]]:
+    """``(term, is_prefix)`` pairs; a trailing ``*`` on a word makes it a prefix query."""
+    terms = []
+    for word in query.split():
+        prefix = word.endswith("*")
+        tokens = tokenize(word)
+        terms.extend((token, False) for token in tokens[:-1])
+        if tokens:
+            terms.append((tokens[-1], prefix))
+    return terms
+
+
+class SearchIndex:
+    """
+    Inverted index over chosen text fields of several stores.
+
+    Each term maps to the documents containing it with a field-weighted
+    term frequency, and the vocabulary is kept sorted so a prefix expands
+    by binary search. Queries match documents containing every term (AND),
+    starting from the rarest, and rank them by the sum of weight x IDF.
+    Change events replace a document's postings, so CRUD keeps it current
+    without a rebuild.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[DocKey, float]] = {}
+        self._vocabulary: List[str] = []
+        self._documents: Dict[DocKey, Dict[str, float]] = {}
+        self._stores: Dict[str, EntityStore] = {}
+
+    def track(self, store: EntityStore, fields: Dict[str, float], kind: Optional[str] = None) -> None:
+        """Index ``fields`` (name -> weight) of every record in ``store``, reported as ``kind`` (default: store name)."""
+        kind = kind or store.name
+        self._stores[kind] = store
+
+        def on_change(old: Optional[dict], new: Optional[dict]) -> None:
+            key = (kind, (old or new)["id"])
+            terms: Dict[str, float] = {}
+            if new is not None:
+                for field, weight in fields.items():
+                    for token in tokenize(str(new.get(field) or "")):
+                        terms[token] = terms.get(token, 0.0) + weight
+            with self._lock:
+                self._replace(key, terms)
+
+        store.subscribe(on_change, fields=fields)
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def search(self, query: str, stores: Optional[Iterable[str]] = None, limit: int = 20) -> dict:
+        terms = parse_query(query)
+        wanted = set(stores) if stores is not None else None
+        with self._lock:
+            total_docs = max(len(self._documents), 1)
+            matches = [self._matches(term, prefix) for term, prefix in terms]
+            if not matches:
+                return {"total": 0, "results": []}
+            matches.sort(key=len)
+            idfs = [math.log(1 + total_docs / max(len(postings), 1)) for postings in matches]
+            rarest, idf = matches[0], idfs[0]
+            scores = {key: weight * idf for key, weight in rarest.items() if wanted is None or key[0] in wanted}
+            for postings, idf in zip(matches[1:], idfs[1:]):
+                scores = {key: score + postings[key] * idf for key, score in scores.items() if key in postings}
+                if not scores:
+                    break
+        # Equal scores keep index order inside nlargest; the page is then ordered by id.
+        top = sorted(
+            nlargest(limit, scores.items(), key=itemgetter(1)),
+            key=lambda item: (-item[1], item[0][0], len(item[0][1]), item[0][1]),
+        )
+        results = []
+        for (store_name, record_id), score in top:
+            record = self._stores[store_name].get(record_id)
+            if record is not None:
+                results.append({
+                    "type": store_name,
+                    "id": record_id,
+                    "score": round(score, 4),
+                    "record": record,
+                })
+        return {"total": len(scores), "results": results}
+
+    def _matches(self, term: str, prefix: bool) -> Dict[DocKey, float]:
+        """Postings for ``term``; for a prefix, each document's best expansion."""
+        if not prefix:
+            return self._postings.get(term, {})
+        merged: Dict[DocKey, float] = {}
+        index = bisect_left(self._vocabulary, term)
+        while index < len(self._vocabulary) and self._vocabulary[index].startswith(term):
+            for key, weight in self._postings[self._vocabulary[index]].items():
+                if weight > merged.get(key, 0.0):
+                    merged[key] = weight
+            index += 1
+        return merged
+
+    def _replace(self, key: DocKey, terms: Dict[str, float]) -> None:
+        previous = self._documents.pop(key, {})
+        for term in previous.keys() - terms.keys():
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+                del self._vocabulary[bisect_left(self._vocabulary, term)]
+        for term, weight in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._vocabulary, term)
+            postings[key] = weight
+        if terms:
+            self._documents[key] = terms
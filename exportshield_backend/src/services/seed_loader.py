@@ -0,0 +1,261 @@
+import csv
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from src.services.sites import DEFAULT_SITE, site_seed
+from src.services.store import EntityStore
+
+
+# Directory of seed files, read once at startup. ``<kind>.<ext>`` seeds the
+# default site and ``<site>/<kind>.<ext>`` any site; a store without a file
+# keeps the inline demo records (default site) or starts empty.
+SEED_DIR = os.getenv("MININGMITRA_SEED_DIR")
+# Rows validated and inserted at a time; memory stays bounded by this, not by the file size.
+SEED_BATCH = int(os.getenv("MININGMITRA_SEED_BATCH", "1000"))
+SEED_FORMATS = (".ndjson", ".jsonl", ".json", ".csv")
+READ_CHUNK = 1 << 16
+# Invalid rows quoted in a SeedError before the rest are only counted
+MAX_REPORTED_ERRORS = 5
+
+logger = logging.getLogger("miningmitra.seed")
+
+# (validated row, id, created_at) -> stored record, as the router's POST handler builds it
+Build = Callable[[BaseModel, str, str], dict]
+
+
+class SeedError(ValueError):
+    """A seed file that cannot be read or holds rows that fail validation."""
+
+
+class SeedSource(NamedTuple):
+    path: str
+    store: EntityStore
+    model: Type[BaseModel]
+    build: Build
+
+
+# Stores waiting for their seed file, in registration order, so stores
+# whose records depend on another's (incidents on workers) load after it.
+_sources: List[SeedSource] = []
+_reports: List[dict] = []
+_lock = threading.Lock()
+
+
+def seed_file(site: str, kind: str) -> Optional[str]:
+    """The seed file configured for a site's store, if any."""
+    if not SEED_DIR:
+        return None
+    directories = [os.path.join(SEED_DIR, site)]
+    if site == DEFAULT_SITE:
+        directories.append(SEED_DIR)
+    for directory in directories:
+        for extension in SEED_FORMATS:
+            path = os.path.join(directory, kind + extension)
+            if os.path.isfile(path):
+                return path
+    return None
+
+
+def fallback_seed(site: str, kind: str, records: List[dict]) -> List[dict]:
+    """The inline demo records for a store, unless a seed file will fill it at startup."""
+    return [] if seed_file(site, kind) else site_seed(site, records)
+
+
+def register_seed(site: str, kind: str, store: EntityStore, model: Type[BaseModel], build: Build) -> None:
+    """Have ``load_seeds`` fill ``store`` from its seed file, if one exists."""
+    path = seed_file(site, kind)
+    if path is not None:
+        with _lock:
+            _sources.append(SeedSource(path, store, model, build))
+
+
+def _read_ndjson(stream) -> Iterator[Tuple[int, dict]]:
+    for line_number, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as error:
+                raise SeedError(f"line {line_number}: {error.msg}")
+
+
+def _read_json(stream) -> Iterator[Tuple[int, dict]]:
+    """
+    Elements of a top-level JSON array, decoded one at a time.
+
+    The file is read in READ_CHUNK pieces and each element is decoded from
+    the buffer as soon as it is complete, so only the element being decoded
+    (and what is left of the current chunk) is ever held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, number = "", 0, 0
+    expected = "["
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n":
+            position += 1
+        if position == len(buffer):
+            chunk = stream.read(READ_CHUNK)
+            if not chunk:
+                raise SeedError("unexpected end of file; a JSON seed file is one array of records")
+            buffer, position = chunk, 0
+            continue
+        character = buffer[position]
+        if expected == "[":
+            if character != "[":
+                raise SeedError("a JSON seed file is one array of records")
+            position += 1
+            expected = "record"
+            continue
+        if character == "]" and expected in ("record", ","):
+            return
+        if expected == ",":
+            if character != ",":
+                raise SeedError(f"record {number}: expected ',' or ']' after it")
+            position += 1
+            expected = "record"
+            continue
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as error:
+            chunk = stream.read(READ_CHUNK)
+            if not chunk:
+                raise SeedError(f"record {number + 1}: {error.msg}")
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        number += 1
+        yield number, value
+        position = end
+        expected = ","
+        if position > READ_CHUNK:
+            buffer, position = buffer[position:], 0
+
+
+def _read_csv(stream) -> Iterator[Tuple[int, dict]]:
+    """Rows keyed by the header line; empty cells count as absent, so model defaults apply."""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, {field: value for field, value in row.items() if field and value not in ("", None)}
+
+
+# Extension -> (reader, what its position numbers count)
+READERS = {
+    ".ndjson": (_read_ndjson, "line"),
+    ".jsonl": (_read_ndjson, "line"),
+    ".json": (_read_json, "record"),
+    ".csv": (_read_csv, "line"),
+}
+
+
+def read_rows(path: str) -> Iterator[Tuple[str, dict]]:
+    """``(position, row)`` for every row of a seed file, streamed in file order."""
+    reader, unit = READERS[os.path.splitext(path)[1].lower()]
+    with open(path, encoding="utf-8-sig", newline="") as stream:
+        try:
+            for number, row in reader(stream):
+                yield f"{unit} {number}", row
+        except SeedError as error:
+            raise SeedError(f"{path}: {error}")
+
+
+def _batches(rows: Iterator[Tuple[str, dict]], size: int) -> Iterator[List[Tuple[str, dict]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _describe(error: dict) -> str:
+    field = ".".join(str(part) for part in error["loc"][1:])
+    return f"{field}: {error['msg']}" if field else error["msg"]
+
+
+def load_file(path: str, store: EntityStore, model: Type[BaseModel], build: Build, batch_size: int = SEED_BATCH) -> dict:
+    """
+    Stream one seed file into ``store``; returns a throughput report.
+
+    Each batch of rows is validated against ``model`` in one pass, turned
+    into records by ``build`` and added with a single ``insert_many``.
+    Rows may carry their ``id`` and ``created_at``/``updated_at``, so a
+    file exported from the list endpoints loads back as-is; other fields
+    the model does not know are ignored. Any invalid row, or an id already
+    taken, raises SeedError naming its position; batches before it stay
+    loaded.
+    """
+    adapter = TypeAdapter(List[model])
+    loaded_at = datetime.utcnow().isoformat() + "Z"
+    seen = set()
+    started = time.perf_counter()
+    count = 0
+    for batch in _batches(read_rows(path), batch_size):
+        rows = [row for _, row in batch]
+        problems = []
+        try:
+            validated = adapter.validate_python(rows)
+        except ValidationError as error:
+            validated = None
+            problems = [f"{batch[issue['loc'][0]][0]}: {_describe(issue)}" for issue in error.errors()]
+        records = []
+        for index, (position, row) in enumerate(batch):
+            record_id = row.get("id") if isinstance(row, dict) else None
+            if record_id is not None:
+                record_id = str(record_id)
+                if record_id in seen or store.get(record_id) is not None:
+                    problems.append(f"{position}: id {record_id} is already taken")
+                    continue
+                seen.add(record_id)
+            if problems or validated is None:
+                continue
+            if record_id is None:
+                record_id = store.new_id()
+                # An explicit id earlier in the file may have claimed it
+                while record_id in seen or store.get(record_id) is not None:
+                    record_id = store.new_id()
+                seen.add(record_id)
+            record = build(validated[index], record_id, row.get("created_at") or loaded_at)
+            if row.get("updated_at"):
+                record["updated_at"] = row["updated_at"]
+            records.append(record)
+        if problems:
+            shown = "; ".join(problems[:MAX_REPORTED_ERRORS])
+            more = len(problems) - MAX_REPORTED_ERRORS
+            raise SeedError(f"{path}: {shown}" + (f" (and {more} more)" if more > 0 else ""))
+        count += store.insert_many(records)
+    seconds = time.perf_counter() - started
+    return {
+        "store": store.name,
+        "file": path,
+        "records": count,
+        "seconds": round(seconds, 3),
+        "records_per_second": round(count / seconds) if seconds > 0 else None,
+    }
+
+
+def load_seeds() -> List[dict]:
+    """Load every registered seed file once, logging and returning a report per store."""
+    with _lock:
+        sources, _sources[:] = list(_sources), []
+    for source in sources:
+        report = load_file(source.path, source.store, source.model, source.build)
+        logger.info(
+            "Seeded %s with %d records from %s in %.3fs (%s records/s)",
+            report["store"], report["records"], report["file"], report["seconds"], report["records_per_second"],
+        )
+        with _lock:
+            _reports.append(report)
+    return seed_reports()
+
+
+def seed_reports() -> List[dict]:
+    """Throughput of every seed file loaded so far."""
+    with _lock:
+        return list(_reports)
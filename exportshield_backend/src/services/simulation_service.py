@@ -0,0 +1,287 @@
+import itertools
+import json
+import math
+import operator
+import os
+import random
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.services.metrics_service import Histogram
+from src.services.pollution_service import calculate_pollution_index
+from src.services.safety_service import calculate_safety_score
+
+
+# Scenarios evaluated at a time; memory stays bounded by this, not by the request size.
+SIMULATION_CHUNK = int(os.getenv("MININGMITRA_SIMULATION_CHUNK", "50000"))
+# Most scenarios one request may evaluate, summed over its zones
+MAX_SCENARIOS = int(os.getenv("MININGMITRA_MAX_SCENARIOS", "1000000"))
+# Longest explicit ``values`` list one input may give; longer sweeps use start/stop/steps
+MAX_INPUT_VALUES = 10000
+# Distinct simulation results kept for identical requests
+SIMULATION_CACHE_SIZE = int(os.getenv("MININGMITRA_SIMULATION_CACHE", "64"))
+# Percentiles are exact to 1/HISTOGRAM_BUCKETS of the output's possible range.
+HISTOGRAM_BUCKETS = 4096
+# A normal input is taken to stay within this many standard deviations when
+# sizing the output histograms; the rare draw outside lands in an edge bucket.
+NORMAL_SPAN = 6.0
+
+INPUTS = ("depth", "explosives", "temperature", "vibration")
+# Output -> (formula, the inputs it takes, in argument order)
+OUTPUTS: Dict[str, Tuple[Callable[..., float], Tuple[str, ...]]] = {
+    "pollution_index": (calculate_pollution_index, ("depth", "explosives")),
+    "safety_score": (calculate_safety_score, ("temperature", "vibration")),
+}
+
+# A resolved input is one of
+#   {"fixed": v}                 the same value in every scenario
+#   {"values": [..]}             a grid axis, or an equally likely choice
+#   {"uniform": [low, high]}
+#   {"normal": [mean, std]}
+#   {"triangular": [low, mode, high]}
+Spec = Dict[str, object]
+
+
+def grid_points(spec: dict) -> int:
+    """Points a request's input spec adds to a grid axis, counted without building the axis."""
+    if spec.get("value") is not None:
+        return 1
+    if spec.get("values"):
+        return len(spec["values"])
+    if spec.get("start") is not None or spec.get("stop") is not None:
+        return spec.get("steps") or 2
+    return 1
+
+
+def resolve_input(name: str, spec: dict, mode: str) -> Spec:
+    """Normalise a request's input spec for ``mode``; ValueError explains what is wrong."""
+    if spec.get("value") is not None:
+        return {"fixed": float(spec["value"])}
+    if spec.get("values"):
+        return {"values": [float(value) for value in spec["values"]]}
+    if spec.get("start") is not None or spec.get("stop") is not None:
+        if mode != "grid":
+            raise ValueError(f"{name}: start/stop/steps describe a grid axis; use a distribution for monte_carlo")
+        start, stop, steps = spec.get("start"), spec.get("stop"), spec.get("steps") or 2
+        if start is None or stop is None or steps < 1:
+            raise ValueError(f"{name}: a grid axis needs start, stop and steps >= 1")
+        if steps == 1:
+            return {"values": [float(start)]}
+        return {"values": [start + (stop - start) * step / (steps - 1) for step in range(steps)]}
+    distribution = spec.get("distribution")
+    if distribution is None:
+        raise ValueError(f"{name}: give a value, values, a start/stop grid axis or a distribution")
+    if mode != "monte_carlo":
+        raise ValueError(f"{name}: distributions are sampled in monte_carlo mode; use values or start/stop for a grid")
+    required = {"uniform": ("low", "high"), "normal": ("mean", "std"), "triangular": ("low", "mode", "high")}[distribution]
+    missing = [field for field in required if spec.get(field) is None]
+    if missing:
+        raise ValueError(f"{name}: a {distribution} distribution needs {', '.join(missing)}")
+    params = [float(spec[field]) for field in required]
+    if distribution == "normal" and params[1] < 0:
+        raise ValueError(f"{name}: std must not be negative")
+    if distribution != "normal" and not params[0] <= params[-1]:
+        raise ValueError(f"{name}: low must not exceed high")
+    if distribution == "triangular" and not params[0] <= params[1] <= params[2]:
+        raise ValueError(f"{name}: mode must lie between low and high")
+    return {distribution: params}
+
+
+def observed_input(readings: Sequence[float], mode: str) -> Optional[Spec]:
+    """An input spec from live readings: the readings themselves for a grid, their normal fit otherwise."""
+    if not readings:
+        return None
+    if mode == "grid":
+        return {"values": sorted(set(float(reading) for reading in readings))}
+    mean = sum(readings) / len(readings)
+    std = math.sqrt(sum((reading - mean) ** 2 for reading in readings) / len(readings))
+    return {"normal": [round(mean, 4), round(std, 4)]} if std > 0 else {"fixed": mean}
+
+
+def _bounds(spec: Spec) -> Tuple[float, float]:
+    (kind, params), = spec.items()
+    if kind == "fixed":
+        return params, params
+    if kind == "values":
+        return min(params), max(params)
+    if kind == "normal":
+        mean, std = params
+        return mean - NORMAL_SPAN * std, mean + NORMAL_SPAN * std
+    return params[0], params[-1]
+
+
+def _normals(rng: random.Random, mean: float, std: float, n: int) -> List[float]:
+    """``n`` normal draws by Box-Muller, two per pair of uniforms; several times faster than ``gauss``."""
+    pairs = (n + 1) // 2
+    radii = [std * math.sqrt(-2.0 * math.log(1.0 - rng.random())) for _ in range(pairs)]
+    angles = [math.tau * rng.random() for _ in range(pairs)]
+    draws = [mean + radius * math.cos(angle) for radius, angle in zip(radii, angles)]
+    draws += [mean + radius * math.sin(angle) for radius, angle in zip(radii, angles)]
+    return draws[:n]
+
+
+def _sampler(spec: Spec, rng: random.Random) -> Callable[[int], List[float]]:
+    """Draws ``n`` values of one input."""
+    (kind, params), = spec.items()
+    if kind == "fixed":
+        return lambda n: [params] * n
+    if kind == "values":
+        return lambda n: rng.choices(params, k=n)
+    if kind == "uniform":
+        low, high = params
+        return lambda n: [rng.uniform(low, high) for _ in range(n)]
+    if kind == "normal":
+        mean, std = params
+        return lambda n: _normals(rng, mean, std, n)
+    low, mode, high = params
+    return lambda n: [rng.triangular(low, high, mode) for _ in range(n)]
+
+
+def scenario_count(mode: str, specs: Dict[str, Spec], samples: int) -> int:
+    if mode == "monte_carlo":
+        return samples
+    return math.prod(len(spec["values"]) if "values" in spec else 1 for spec in specs.values())
+
+
+def _scenarios(mode: str, specs: Dict[str, Spec], samples: int, rng: random.Random) -> Iterator[Dict[str, Sequence[float]]]:
+    """Chunks of scenarios as ``{input: column}``, at most SIMULATION_CHUNK long."""
+    if mode == "grid":
+        axes = [spec["values"] if "values" in spec else [spec["fixed"]] for spec in specs.values()]
+        product = itertools.product(*axes)
+        while True:
+            rows = list(itertools.islice(product, SIMULATION_CHUNK))
+            if not rows:
+                return
+            yield dict(zip(specs, zip(*rows)))
+    samplers = {name: _sampler(spec, rng) for name, spec in specs.items()}
+    for start in range(0, samples, SIMULATION_CHUNK):
+        n = min(SIMULATION_CHUNK, samples - start)
+        yield {name: draw(n) for name, draw in samplers.items()}
+
+
+class _Summary:
+    """Count, moments, extremes and a histogram of one output, built chunk by chunk."""
+
+    def __init__(self, low: float, high: float):
+        if high - low < 1e-9:
+            high = low + 1.0
+        self.histogram = Histogram(low, high, (high - low) / HISTOGRAM_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.squares = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add_many(self, values: List[float]) -> None:
+        if not values:
+            return
+        self.count += len(values)
+        self.total += math.fsum(values)
+        self.squares += math.fsum(map(operator.mul, values, values))
+        self.min = min(self.min, min(values))
+        self.max = max(self.max, max(values))
+        self.histogram.add_many(values)
+
+    def merge(self, other: "_Summary") -> None:
+        self.count += other.count
+        self.total += other.total
+        self.squares += other.squares
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.histogram.merge(other.histogram)
+
+    def describe(self, percentiles: Iterable[float]) -> dict:
+        if not self.count:
+            return {"count": 0}
+        mean = self.total / self.count
+        width = self.histogram.width
+        described = {
+            "count": self.count,
+            "mean": round(mean, 4),
+            "std": round(math.sqrt(max(self.squares / self.count - mean * mean, 0.0)), 4),
+            "min": round(self.min, 4),
+            "max": round(self.max, 4),
+        }
+        for percentile in percentiles:
+            # Middle of the bucket the percentile falls in, kept within the observed range
+            value = self.histogram.quantile(percentile / 100) + width / 2
+            described[f"p{percentile:g}"] = round(min(max(value, self.min), self.max), 4)
+        return described
+
+
+def _output_bounds(formula: Callable[..., float], inputs: Sequence[Spec]) -> Tuple[float, float]:
+    """Range of a formula over the input box; exact for the linear formulas here, via its corners."""
+    corners = [formula(*corner) for corner in itertools.product(*(_bounds(spec) for spec in inputs))]
+    return min(corners), max(corners)
+
+
+def simulate(mode: str, zones: Dict[str, Dict[str, Spec]], samples: int, seed: int, percentiles: List[float]) -> dict:
+    """
+    Evaluate the pollution and safety formulas over every zone's scenarios.
+
+    ``zones`` maps a zone to its resolved inputs. Monte Carlo draws come
+    from a generator seeded with ``seed`` and the zone, so a request is
+    reproducible. Scenarios are generated and evaluated SIMULATION_CHUNK
+    at a time and reduced to running moments and histograms, so memory
+    does not grow with the number of scenarios.
+    """
+    # One histogram range per output across all zones, so zones merge into the overall figures
+    bounds = {}
+    for output, (formula, names) in OUTPUTS.items():
+        ranges = [_output_bounds(formula, [specs[name] for name in names]) for specs in zones.values()]
+        bounds[output] = (min(low for low, _ in ranges), max(high for _, high in ranges))
+    overall = {output: _Summary(*bounds[output]) for output in OUTPUTS}
+    results = {}
+    for zone, specs in zones.items():
+        summaries = {output: _Summary(*bounds[output]) for output in OUTPUTS}
+        rng = random.Random(f"{seed}:{zone}")
+        for columns in _scenarios(mode, specs, samples, rng):
+            for output, (formula, names) in OUTPUTS.items():
+                summaries[output].add_many(list(map(formula, *(columns[name] for name in names))))
+        for output, summary in summaries.items():
+            overall[output].merge(summary)
+        results[zone] = {
+            "scenarios": scenario_count(mode, specs, samples),
+            "inputs": specs,
+            **{output: summary.describe(percentiles) for output, summary in summaries.items()},
+        }
+    return {
+        "mode": mode,
+        "seed": seed,
+        "scenarios": sum(result["scenarios"] for result in results.values()),
+        "zones": results,
+        "overall": {output: summary.describe(percentiles) for output, summary in overall.items()},
+    }
+
+
+class SimulationCache:
+    """
+    Least-recently-used results keyed on the fully resolved request.
+
+    Keys include the inputs each zone was resolved to, so a request whose
+    defaults come from live machinery readings misses once those change.
+    """
+
+    def __init__(self, size: int = SIMULATION_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._results: "OrderedDict[str, dict]" = OrderedDict()
+        self.size = size
+
+    @staticmethod
+    def key(*parts) -> str:
+        return json.dumps(parts, sort_keys=True, separators=(",", ":"))
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+            return result
+
+    def put(self, key: str, result: dict) -> None:
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.size:
+                self._results.popitem(last=False)
@@ -0,0 +1,65 @@
+import os
+from contextvars import ContextVar
+from typing import Callable, Dict, Generic, Iterator, List, Tuple, TypeVar
+
+
+def _parse_sites(value: str) -> Dict[str, str]:
+    """``id=Display Name`` pairs, comma-separated; a bare id is its own name."""
+    sites = {}
+    for entry in value.split(","):
+        site_id, _, name = entry.partition("=")
+        if site_id.strip():
+            sites[site_id.strip()] = name.strip() or site_id.strip()
+    return sites
+
+
+# Every mine served by this process, in configuration order. The first is
+# the default for requests that name no site, and keeps the demo seed data.
+SITES = _parse_sites(os.getenv("MININGMITRA_SITES", "demo=MiningMitra Demo Site"))
+DEFAULT_SITE = next(iter(SITES))
+
+# Site of the request being handled; set by SiteMiddleware and copied into
+# the threadpool that runs sync handlers.
+current_site: ContextVar[str] = ContextVar("current_site", default=DEFAULT_SITE)
+
+T = TypeVar("T")
+
+
+def store_name(site: str, kind: str) -> str:
+    """Registry name of a site's store; the default site keeps the plain names."""
+    return kind if site == DEFAULT_SITE else f"{site}:{kind}"
+
+
+def site_path(path: str) -> str:
+    """An ``/api/...`` path as addressed to the current site; the default site keeps the plain path."""
+    site = current_site.get()
+    return path if site == DEFAULT_SITE else f"/api/sites/{site}/{path[len('/api/'):]}"
+
+
+def site_seed(site: str, records: List[dict]) -> List[dict]:
+    """The demo seed tagged with its site, for the default site only; other sites start empty."""
+    return [{**record, "site": site} for record in records] if site == DEFAULT_SITE else []
+
+
+class SiteShards(Generic[T]):
+    """
+    One independent copy of some state per site.
+
+    ``build(site)`` runs once for every configured site, so each site has
+    its own stores (and with them their own locks), indexes and caches; a
+    write burst at one mine never contends with, or invalidates anything
+    of, another.
+    """
+
+    def __init__(self, build: Callable[[str], T]):
+        self._shards: Dict[str, T] = {site: build(site) for site in SITES}
+
+    def current(self) -> T:
+        """The shard of the site the current request is for."""
+        return self._shards[current_site.get()]
+
+    def get(self, site: str) -> T:
+        return self._shards[site]
+
+    def items(self) -> Iterator[Tuple[str, T]]:
+        return iter(self._shards.items())
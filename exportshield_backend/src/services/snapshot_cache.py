@@ -0,0 +1,101 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Callable, NamedTuple, Optional
+
+
+logger = logging.getLogger("miningmitra.snapshot_cache")
+
+# Same encoding as FastAPI's JSONResponse, so cached bodies are byte-identical.
+def _encode(payload: dict) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class Snapshot(NamedTuple):
+    body: bytes
+    etag: str
+    built_at: float
+
+
+class SnapshotCache:
+    """
+    A payload rebuilt in the background and served as pre-encoded bytes.
+
+    ``invalidate()`` (wired to store change events) and reads of a snapshot
+    older than ``max_age`` wake a single refresher thread; readers never
+    wait for it and keep getting the previous snapshot until the new one
+    is swapped in (stale-while-revalidate). Bursts of changes within
+    ``debounce`` seconds collapse into one rebuild, so the cost is bounded
+    by the rebuild rate rather than the number of readers or writes. Only
+    the very first read builds inline, so async callers should check
+    ``built`` and make that read from a worker thread. The ETag is a hash of the encoded
+    body, so it stays valid across restarts and replicas exactly when the
+    content does.
+    """
+
+    def __init__(self, name: str, build: Callable[[], dict], max_age: float, debounce: float = 0.05):
+        self.name = name
+        self._build = build
+        self.max_age = max_age
+        self.debounce = debounce
+        self._snapshot: Optional[Snapshot] = None
+        self._build_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def built(self) -> bool:
+        """Whether a snapshot exists, i.e. ``get()`` returns without building."""
+        return self._snapshot is not None
+
+    def get(self) -> Snapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self._build_first()
+        if time.monotonic() - snapshot.built_at > self.max_age:
+            self._request_refresh()
+        return snapshot
+
+    def invalidate(self, *_) -> None:
+        """Mark the snapshot stale; accepts and ignores store listener arguments."""
+        if self._snapshot is not None:
+            self._request_refresh()
+
+    def refresh(self) -> Snapshot:
+        """Rebuild now and swap the new snapshot in."""
+        with self._build_lock:
+            body = _encode(self._build())
+            digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+            self._snapshot = Snapshot(body, f'"{self.name}-{digest}"', time.monotonic())
+            return self._snapshot
+
+    def _build_first(self) -> Snapshot:
+        # Concurrent first readers wait for one build instead of each running their own
+        with self._build_lock:
+            if self._snapshot is not None:
+                return self._snapshot
+        return self.refresh()
+
+    def _request_refresh(self) -> None:
+        if self._refresher is None:
+            with self._start_lock:
+                if self._refresher is None:
+                    self._refresher = threading.Thread(
+                        target=self._refresh_loop, name=f"{self.name}-refresh", daemon=True
+                    )
+                    self._refresher.start()
+        self._wake.set()
+
+    def _refresh_loop(self) -> None:
+        while True:
+            self._wake.wait()
+            time.sleep(self.debounce)
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the last good snapshot; the next change retries.
+                logger.exception("Rebuilding snapshot %s failed", self.name)
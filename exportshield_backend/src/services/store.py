@@ -0,0 +1,464 @@
+import itertools
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+# Every store created in the process, keyed by name. Persistence and
+# snapshotting walk this registry instead of importing each router.
+STORES: Dict[str, "EntityStore"] = {}
+
+# Writers lock one stripe chosen by record id, so updates to different
+# records proceed in parallel and only writers of the same record contend.
+LOCK_STRIPES = 64
+
+# Fields every write touches; they never count as a change worth reacting to.
+BOOKKEEPING_FIELDS = frozenset({"updated_at", "version"})
+
+Listener = Callable[[Optional[dict], Optional[dict]], None]
+
+_deferred = threading.local()
+
+# Read snapshots open right now. Only changed while every store's clock is
+# held, so a writer reading it under its own store's clock sees a snapshot
+# either opened before its write or not at all.
+_open_snapshots = 0
+# Opening or closing a snapshot; keeps two of them from taking store clocks in different orders
+_snapshot_lock = threading.Lock()
+# Stores holding superseded versions for the open snapshots
+_versioned: Set["EntityStore"] = set()
+
+
+def defer(callback: Callable[[], None]) -> None:
+    """
+    Run ``callback`` once the current write has released its locks.
+
+    Listeners run under a stripe lock, so one that needs to write to a
+    store (its own or another) must defer that write; writing directly
+    could deadlock against snapshotting, which locks every store at once.
+    Outside a write the callback runs immediately.
+    """
+    pending = getattr(_deferred, "callbacks", None)
+    if pending is None:
+        callback()
+    else:
+        pending.append(callback)
+
+
+@contextmanager
+def _writing(locked):
+    """Enter ``locked``; on leaving the outermost write, run deferred callbacks."""
+    outermost = getattr(_deferred, "callbacks", None) is None
+    if outermost:
+        _deferred.callbacks = []
+    try:
+        with locked:
+            yield
+    finally:
+        if outermost:
+            callbacks, _deferred.callbacks = _deferred.callbacks, None
+            for callback in callbacks:
+                callback()
+
+
+class VersionConflict(Exception):
+    """Raised when a compare-and-swap sees a version other than the expected one."""
+
+    def __init__(self, record_id: str, current_version: int):
+        super().__init__(f"{record_id} is at version {current_version}")
+        self.record_id = record_id
+        self.current_version = current_version
+
+
+class EntityStore:
+    """
+    In-memory collection of records keyed by id.
+
+    Records are plain dicts (the shape the routers already return) kept in
+    insertion order. Each carries a ``version`` that increases on every
+    write. Records are never mutated in place: every write swaps in a new
+    dict, so a reader holding a reference always sees a complete record.
+
+    Derived state (indexes, aggregates, caches) subscribes to changes and
+    can name the fields it depends on, so a write that only touches other
+    fields never reaches it.
+
+    Every write is stamped with the store's next commit number, and while
+    a ReadSnapshot is open the version it replaces is kept, so the
+    snapshot can still read the store as it was. Each store keeps its own
+    clock, so writers to different stores or sites never wait on each
+    other; only opening and closing a snapshot takes every clock.
+    """
+
+    def __init__(self, name: str, seed: Iterable[dict] = ()):
+        self.name = name
+        self._records: Dict[str, dict] = {}
+        # Commit number that installed each current record
+        self._stamps: Dict[str, int] = {}
+        # id -> [(commit that replaced it, previous version or None)], oldest first
+        self._history: Dict[str, List[Tuple[int, Optional[dict]]]] = {}
+        # id -> writes installed whose listeners have not all run yet
+        self._unsettled: Dict[str, int] = {}
+        # Covers only taking a commit number and installing the record, never listeners
+        self._clock_lock = threading.Lock()
+        self._last_commit = 0
+        self._stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._ids = itertools.count(1)
+        self._max_id = 0
+        self._log: Optional[Callable[[str, str, str, Optional[dict]], None]] = None
+        self._listeners: List[Tuple[Listener, Optional[FrozenSet[str]]]] = []
+        for record in seed:
+            self._put(record)
+        self._ids = itertools.count(self._max_id + 1)
+        STORES[name] = self
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def all(self) -> List[dict]:
+        return list(self._records.values())
+
+    def get(self, record_id: str) -> Optional[dict]:
+        return self._records.get(record_id)
+
+    def new_id(self) -> str:
+        return str(next(self._ids))
+
+    def insert(self, record: dict) -> dict:
+        record = {**record, "version": 1}
+        with _writing(self._stripe(record["id"])):
+            self._install(record["id"], record)
+            self._write_log("put", record["id"], record)
+            self._notify(None, record)
+        return record
+
+    def insert_many(self, records: Iterable[dict]) -> int:
+        """
+        Insert a batch under one acquisition of every stripe.
+
+        Each record is logged and announced like a single insert; only the
+        per-record locking is saved. Numeric ids given in the batch are
+        skipped by later ``new_id`` calls. Returns the number inserted.
+        """
+        count = 0
+        highest = self._max_id
+        with _writing(self.frozen()):
+            for record in records:
+                record = {**record, "version": 1}
+                record_id = record["id"]
+                self._install(record_id, record)
+                self._write_log("put", record_id, record)
+                self._notify(None, record)
+                if record_id.isdigit():
+                    highest = max(highest, int(record_id))
+                count += 1
+            if highest > self._max_id:
+                self._max_id = highest
+                self._ids = itertools.count(max(next(self._ids), highest + 1))
+        return count
+
+    def compare_and_swap(self, record_id: str, expected_version: int, record: dict) -> dict:
+        """
+        Replace a record only if it is still at ``expected_version``.
+
+        Raises KeyError if the record is gone and VersionConflict if someone
+        else wrote it first.
+        """
+        with _writing(self._stripe(record_id)):
+            current = self._records.get(record_id)
+            if current is None:
+                raise KeyError(record_id)
+            if current["version"] != expected_version:
+                raise VersionConflict(record_id, current["version"])
+            record = {**record, "version": expected_version + 1}
+            self._install(record_id, record)
+            self._write_log("put", record_id, record)
+            self._notify(current, record)
+        return record
+
+    def update(
+        self,
+        record_id: str,
+        change: Callable[[dict], dict],
+        expected_version: Optional[int] = None,
+    ) -> dict:
+        """
+        Optimistically apply ``change(current) -> new record``.
+
+        ``change`` runs without any lock held. With an ``expected_version``
+        a concurrent write surfaces as VersionConflict; without one the
+        change is simply retried against the newer record.
+        """
+        while True:
+            current = self._records.get(record_id)
+            if current is None:
+                raise KeyError(record_id)
+            if expected_version is not None and current["version"] != expected_version:
+                raise VersionConflict(record_id, current["version"])
+            try:
+                return self.compare_and_swap(record_id, current["version"], change(current))
+            except VersionConflict:
+                if expected_version is not None:
+                    raise
+
+    def patch(self, record_id: str, changes: dict, expected_version: Optional[int] = None) -> dict:
+        """
+        Apply a partial update of only the given fields.
+
+        Fields whose value is unchanged are dropped; if nothing is left the
+        current record is returned as-is, without a new version or log entry.
+        """
+        while True:
+            current = self._records.get(record_id)
+            if current is None:
+                raise KeyError(record_id)
+            if expected_version is not None and current["version"] != expected_version:
+                raise VersionConflict(record_id, current["version"])
+            effective = {
+                field: value for field, value in changes.items()
+                if field in BOOKKEEPING_FIELDS or current.get(field) != value
+            }
+            if not effective.keys() - BOOKKEEPING_FIELDS:
+                return current
+            try:
+                return self.compare_and_swap(record_id, current["version"], {**current, **effective})
+            except VersionConflict:
+                if expected_version is not None:
+                    raise
+
+    def delete(self, record_id: str, expected_version: Optional[int] = None) -> dict:
+        """Remove a record, raising KeyError if it is gone or VersionConflict on a stale version."""
+        with _writing(self._stripe(record_id)):
+            current = self._records.get(record_id)
+            if current is None:
+                raise KeyError(record_id)
+            if expected_version is not None and current["version"] != expected_version:
+                raise VersionConflict(record_id, current["version"])
+            self._install(record_id, None)
+            self._write_log("delete", record_id, None)
+            self._notify(current, None)
+        return current
+
+    def subscribe(self, listener: Listener, fields: Optional[Iterable[str]] = None, replay: bool = True) -> None:
+        """
+        Call ``listener(old, new)`` after every write.
+
+        ``old`` is None for inserts and ``new`` is None for deletes. With
+        ``fields``, updates that leave all of them untouched are skipped.
+        Existing records are replayed as inserts first so the subscriber
+        starts in sync, unless ``replay`` is False. Listeners run while the
+        record's stripe lock is held, so they must be quick and safe to call
+        from several threads.
+        """
+        watched = frozenset(fields) if fields is not None else None
+        with _writing(self.frozen()):
+            if replay:
+                for record in self._records.values():
+                    listener(None, record)
+            self._listeners.append((listener, watched))
+
+    # -- persistence hooks -------------------------------------------------
+
+    def attach_log(self, log: Optional[Callable[[str, str, str, Optional[dict]], None]]) -> None:
+        """Route every subsequent mutation through ``log(store, op, id, record)``."""
+        self._log = log
+
+    @contextmanager
+    def frozen(self):
+        """Hold off writers while a consistent copy is taken."""
+        with ExitStack() as stack:
+            for lock in self._stripes:
+                stack.enter_context(lock)
+            yield
+
+    def load(self, records: Iterable[dict]) -> None:
+        """Replace the whole contents without logging (snapshot restore)."""
+        with _writing(self.frozen()):
+            for record in list(self._records.values()):
+                self._install(record["id"], None)
+                self._notify(record, None)
+            self._max_id = 0
+            for record in records:
+                self._put(record)
+                self._notify(None, self._records[record["id"]])
+            self._ids = itertools.count(self._max_id + 1)
+
+    def apply(self, op: str, record_id: str, record: Optional[dict]) -> None:
+        """Re-apply a logged mutation without logging it again (log replay)."""
+        with _writing(self._stripe(record_id)):
+            current = self._records.get(record_id)
+            if op == "put":
+                self._put(record)
+                self._notify(current, self._records[record_id])
+            elif op == "delete" and current is not None:
+                self._install(record_id, None)
+                self._notify(current, None)
+        self._ids = itertools.count(self._max_id + 1)
+
+    def _stripe(self, record_id: str) -> threading.Lock:
+        return self._stripes[hash(record_id) % LOCK_STRIPES]
+
+    def _put(self, record: dict) -> None:
+        if "version" not in record:
+            record = {**record, "version": 1}
+        record_id = record["id"]
+        self._install(record_id, record)
+        if record_id.isdigit():
+            self._max_id = max(self._max_id, int(record_id))
+
+    def _install(self, record_id: str, record: Optional[dict]) -> None:
+        """
+        Make ``record`` the current version (None removes it) under the next commit number.
+
+        The replaced version is filed first, then the stamp, then the
+        record, while readers look at the record, then the stamp, then the
+        history; whichever step a reader lands between, it finds the
+        version its snapshot should see.
+        """
+        with self._clock_lock:
+            self._last_commit += 1
+            if _open_snapshots:
+                replaced = (self._last_commit, self._records.get(record_id))
+                versions = self._history.get(record_id)
+                # Readers never see an empty list
+                if versions is None:
+                    self._history[record_id] = [replaced]
+                else:
+                    versions.append(replaced)
+                _versioned.add(self)
+            if self._listeners:
+                self._unsettled[record_id] = self._unsettled.get(record_id, 0) + 1
+            if record is None:
+                self._stamps.pop(record_id, None)
+                self._records.pop(record_id, None)
+            else:
+                self._stamps[record_id] = self._last_commit
+                self._records[record_id] = record
+
+    def _version_at(self, record_id: str, commit: int, record: Optional[dict]) -> Optional[dict]:
+        """The version of a record as of ``commit``, given what ``_records`` held for it just now."""
+        if record is not None and self._stamps.get(record_id, 0) <= commit:
+            return record
+        for replaced_at, previous in self._history.get(record_id, ()):
+            if replaced_at > commit:
+                return previous
+        return None
+
+    def _records_at(self, commit: int) -> List[dict]:
+        current = dict(self._records)
+        # A write files the version it replaces before installing its own,
+        # so every record written since the snapshot is in the history by now
+        # and everything else in ``current`` is already as of the snapshot.
+        for record_id, versions in list(self._history.items()):
+            if versions[-1][0] > commit:
+                version = self._version_at(record_id, commit, None)
+                if version is None:
+                    current.pop(record_id, None)
+                else:
+                    # Kept in place if still present; deleted ones go last
+                    current[record_id] = version
+        return list(current.values())
+
+    def _write_log(self, op: str, record_id: str, record: Optional[dict]) -> None:
+        if self._log is not None:
+            self._log(self.name, op, record_id, record)
+
+    def _notify(self, old: Optional[dict], new: Optional[dict]) -> None:
+        if not self._listeners:
+            return
+        changed = None
+        if old is not None and new is not None:
+            changed = {field for field, value in new.items() if old.get(field) != value}
+        try:
+            for listener, watched in self._listeners:
+                if changed is None or watched is None or not watched.isdisjoint(changed):
+                    listener(old, new)
+        finally:
+            # Same stripe as the install, so no other write to this id interleaves
+            record_id = (new or old)["id"]
+            remaining = self._unsettled.get(record_id, 0) - 1
+            if remaining > 0:
+                self._unsettled[record_id] = remaining
+            else:
+                self._unsettled.pop(record_id, None)
+
+
+class ReadSnapshot:
+    """
+    Every store as of one moment, read without holding up writers.
+
+    Taking a snapshot notes each store's last commit number, so it costs
+    the same however many records there are. Reads through it see every
+    write committed before it and none after, across all stores, so
+    figures computed from several stores agree with each other. Writers
+    keep the versions they replace only while a snapshot is open; they
+    are dropped when the last one closes, so a long-lived snapshot holds
+    on to every version written during its lifetime. A store created
+    after the snapshot reads as empty through it.
+    """
+
+    def __init__(self, commits: Dict[EntityStore, int]):
+        self._commits = commits
+        self._records: Dict[str, List[dict]] = {}
+
+    def commit(self, store: EntityStore) -> int:
+        """The store's last commit number as of the snapshot."""
+        return self._commits.get(store, 0)
+
+    def get(self, store: EntityStore, record_id: str) -> Optional[dict]:
+        return store._version_at(record_id, self.commit(store), store._records.get(record_id))
+
+    def changed(self, store: EntityStore) -> Dict[str, Optional[dict]]:
+        """
+        Records an index of ``store`` may hold differently from the snapshot, with their version as of it.
+
+        These are the records written since the snapshot, plus those whose
+        listeners were still running when it was taken. An index that calls
+        this while holding the lock its listener takes, and swaps its own
+        entry for each of these records for the snapshot version, answers as
+        of the snapshot after work proportional to the writes since it.
+        """
+        commit = self.commit(store)
+        changed = {
+            record_id: store._version_at(record_id, commit, store._records.get(record_id))
+            for record_id in list(store._unsettled)
+        }
+        for record_id, versions in list(store._history.items()):
+            if versions[-1][0] > commit:
+                changed[record_id] = store._version_at(record_id, commit, None)
+        return changed
+
+    def records(self, store: EntityStore) -> List[dict]:
+        """The store's records as of the snapshot; read once, then reused for the snapshot's lifetime."""
+        records = self._records.get(store.name)
+        if records is None:
+            records = self._records[store.name] = store._records_at(self.commit(store))
+        return records
+
+
+@contextmanager
+def _all_clocks() -> Iterator[List[EntityStore]]:
+    """Hold every store's clock, so no write is part-way installed anywhere; yields the stores."""
+    with _snapshot_lock, ExitStack() as stack:
+        stores = list(STORES.values())
+        for store in stores:
+            stack.enter_context(store._clock_lock)
+        yield stores
+
+
+@contextmanager
+def consistent_read() -> Iterator[ReadSnapshot]:
+    """Open a ReadSnapshot of the current state; it must not be used after the block exits."""
+    global _open_snapshots
+    with _all_clocks() as stores:
+        commits = {store: store._last_commit for store in stores}
+        _open_snapshots += 1
+    try:
+        yield ReadSnapshot(commits)
+    finally:
+        with _all_clocks():
+            _open_snapshots -= 1
+            if not _open_snapshots:
+                for store in _versioned:
+                    store._history = {}
+                _versioned.clear()